@@ -1,23 +1,19 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+import os
+import sys
 
-# === LER ARQUIVO ===
-df = pd.read_excel('jornada_medicos_trimestral.xlsx')
-df['TRIMESTRE'] = df['TRIMESTRE'].astype(str)
-df['CATEGORIA'] = df['CATEGORIA'].astype(str)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.cobertura import CuboCobertura
 
-# === CALCULA % COBERTURA ===
-cobertura = (
-    df.groupby(['TRIMESTRE', 'CATEGORIA'])['NO_PAINEL']
-    .apply(lambda x: (x == 'Sim').sum() / len(x) * 100)
-    .reset_index(name='PERCENTUAL_COBERTURA')
-)
+# === CUBO DE COBERTURA [categoria, trimestre] GRAVADO PELO PIPELINE (recalculado se estiver velho) ===
+cubo = CuboCobertura.da_planilha('jornada_medicos_trimestral.xlsx')
 
 # === PLOT ===
 plt.figure(figsize=(12, 6))
-for categoria in cobertura['CATEGORIA'].unique():
-    dados = cobertura[cobertura['CATEGORIA'] == categoria]
-    plt.plot(dados['TRIMESTRE'], dados['PERCENTUAL_COBERTURA'], label=f'CAT {categoria}', marker='o')
+for codigo, categoria in enumerate(cubo.categorias):
+    presentes = cubo.linhas[codigo] > 0
+    trimestres = [t for t, p in zip(cubo.trimestres, presentes) if p]
+    plt.plot(trimestres, cubo.percentual[codigo][presentes], label=f'CAT {categoria}', marker='o')
 
 plt.title('% Cobertura da Força de Vendas por Categoria e Trimestre')
 plt.xlabel('Trimestre')
@@ -1,33 +1,18 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+import os
+import sys
 
-# === LER A BASE GERADA ===
-df = pd.read_excel('jornada_medicos_trimestral.xlsx')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.cobertura import CuboCobertura
 
-# === AJUSTE DE FORMATO DE TRIMESTRE (caso necessário) ===
-df['TRIMESTRE'] = df['TRIMESTRE'].astype(str)
-
-# === AJUSTE PARA EVITAR ERRO DE MISTURA DE TIPOS ===
-df['CATEGORIA'] = df['CATEGORIA'].astype(str)
-
-# === LISTA DE CATEGORIAS (como string) ===
-categorias = sorted(df['CATEGORIA'].unique())
+# === CUBO DE COBERTURA GRAVADO PELO PIPELINE (médicos distintos por categoria e trimestre) ===
+cubo = CuboCobertura.da_planilha('jornada_medicos_trimestral.xlsx')
+trimestres = cubo.trimestres
 
 # === GERAR UM GRÁFICO PARA CADA CATEGORIA ===
-for cat in categorias:
-    df_cat = df[df['CATEGORIA'] == cat]
-
-    # Total de médicos no mercado por trimestre
-    total_mercado = df_cat.groupby('TRIMESTRE')['CRM LINK'].nunique()
-
-    # Total de médicos NO PAINEL por trimestre
-    df_painel = df_cat[df_cat['NO_PAINEL'] == 'Sim']
-    total_painel = df_painel.groupby('TRIMESTRE')['CRM LINK'].nunique()
-
-    # Garante alinhamento dos índices
-    trimestres = sorted(df['TRIMESTRE'].unique())
-    total_mercado = total_mercado.reindex(trimestres, fill_value=0)
-    total_painel = total_painel.reindex(trimestres, fill_value=0)
+for codigo, cat in enumerate(cubo.categorias):
+    total_mercado = cubo.medicos[codigo]
+    total_painel = cubo.medicos_painel[codigo]
 
     # === PLOTAR ===
     plt.figure(figsize=(10, 5))
@@ -1,8 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 import plotly.graph_objects as go
 import dash
 from dash import dcc, html, Input, Output, State, ctx # Removido ALL, importado ctx
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.carregador import ler_planilha
+from src.esquema import chave_de_ordenacao, codificar_jornada
+from src.matriz_jornada import MatrizJornada
+from src.transicoes import calcular_transicoes
+
 print("--- Preparando a Aplicação Dash (Versão com Correção Final) ---")
 
 # --- 1. PREPARAÇÃO DOS DADOS ---
@@ -12,40 +21,19 @@ CORES_CATEGORIAS = {
     'SEM CAT': '#7f7f7f', 'default': '#cccccc'
 }
 
-def limpar_e_padronizar_categoria(cat):
-    if pd.isna(cat) or str(cat).strip() == '': return 'SEM CAT'
-    try: return str(int(float(str(cat))))
-    except (ValueError, TypeError): return str(cat).strip()
-
 def preparar_dados_sankey():
     try:
-        df = pd.read_excel(ARQUIVO_ENTRADA)
+        df = ler_planilha(ARQUIVO_ENTRADA)
         print(f" Arquivo '{ARQUIVO_ENTRADA}' carregado com sucesso.")
     except FileNotFoundError:
         print(f" ERRO: Arquivo '{ARQUIVO_ENTRADA}' não encontrado."); exit()
-        
-    df['CATEGORIA'] = df['CATEGORIA'].apply(limpar_e_padronizar_categoria)
-    df['TRIMESTRE'] = df['TRIMESTRE'].astype(str).str.strip()
-    
-    trimestres = sorted(df['TRIMESTRE'].unique())
-    all_transitions = []
-    for i in range(len(trimestres) - 1):
-        t1, t2 = trimestres[i], trimestres[i+1]
-        df_t1 = df[df['TRIMESTRE'] == t1]; df_t2 = df[df['TRIMESTRE'] == t2]
-        df_merged = pd.merge(df_t1, df_t2, on='CRM LINK', suffixes=(f'_{t1}', f'_{t2}'))
-        transitions = df_merged.groupby([f'CATEGORIA_{t1}', f'CATEGORIA_{t2}', f'NO_PAINEL_{t2}']).size().reset_index(name='value')
-        transitions = transitions.rename(columns={f'CATEGORIA_{t1}': 'cat_source', f'CATEGORIA_{t2}': 'cat_target', f'NO_PAINEL_{t2}': 'no_painel'})
-        transitions['trimestre_source'] = t1; transitions['trimestre_target'] = t2
-        all_transitions.append(transitions)
-        
-    if not all_transitions: print(" ERRO: Nenhuma transição encontrada."); exit()
-    return pd.concat(all_transitions, ignore_index=True), trimestres
 
-df_sankey_data, trimestres = preparar_dados_sankey()
+    # Matriz médicos x trimestres (src/matriz_jornada.py) + cubo de transições em uma passada
+    df_transicoes, trimestres = calcular_transicoes(MatrizJornada.de_tabela(codificar_jornada(df)))
+    if df_transicoes.empty: print(" ERRO: Nenhuma transição encontrada."); exit()
+    return df_transicoes, trimestres
 
-def chave_de_ordenacao(categoria):
-    try: return (0, int(categoria))
-    except ValueError: return (1, categoria)
+df_sankey_data, trimestres = preparar_dados_sankey()
 
 all_cats = pd.unique(df_sankey_data[['cat_source', 'cat_target']].values.ravel('K'))
 categorias_ordenadas = sorted(all_cats, key=chave_de_ordenacao)
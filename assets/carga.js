@@ -0,0 +1,12 @@
+// Enquanto não há versão publicada o dash mostra só o aviso de carga; quando o
+// servidor avisa que a versão saiu, a página recarrega e monta o layout completo.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    carga: {
+        recarregar_quando_pronto: function (pronta) {
+            if (pronta) {
+                window.location.reload();
+            }
+            return window.dash_clientside.no_update;
+        }
+    }
+});
@@ -0,0 +1,36 @@
+// Realce de categoria feito no navegador: a figura do Sankey traz em layout.meta
+// a categoria de origem/destino de cada link, então trocar o foco é só recalcular
+// o array link.color da figura que já está na tela.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    foco: {
+        guardar_foco: function (n_clicks) {
+            const contexto = window.dash_clientside.callback_context;
+            if (!contexto.triggered.length || !contexto.triggered[0].value) {
+                return window.dash_clientside.no_update;
+            }
+            const prop_id = contexto.triggered[0].prop_id;
+            const id = JSON.parse(prop_id.slice(0, prop_id.lastIndexOf('.')));
+            return id.index;
+        },
+
+        realcar_categoria: function (foco, figura) {
+            if (!figura || !figura.data || !figura.data.length || !figura.layout || !figura.layout.meta) {
+                return window.dash_clientside.no_update;
+            }
+            const meta = figura.layout.meta;
+            const indice_foco = (foco && foco !== 'geral') ? meta.categorias.indexOf(foco) : -1;
+            const cores = meta.link_src.map(function (src, i) {
+                const tgt = meta.link_tgt[i];
+                if (indice_foco < 0 || src === indice_foco || tgt === indice_foco) {
+                    return meta.cores_links[src];
+                }
+                return meta.cor_apagado;
+            });
+
+            const sankey = Object.assign({}, figura.data[0], {
+                link: Object.assign({}, figura.data[0].link, {color: cores})
+            });
+            return Object.assign({}, figura, {data: [sankey].concat(figura.data.slice(1))});
+        }
+    }
+});
@@ -1,81 +1,378 @@
-import pandas as pd
-import plotly.graph_objects as go
+import time
+
+# Marco zero da subida do worker (exposto em jornada_inicializacao_segundos)
+INICIO = time.perf_counter()
+
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 import dash
-from dash import dcc, html, Input, Output, State, ctx
+import plotly.graph_objects as go
+from dash import dcc, html, Input, Output, State, ClientsideFunction
+from flask import g, has_request_context, jsonify, request
+
+from src.api_agregados import VERSAO_API, cobertura_compacta, escolher_codificacao, etag, sankey_compacto, serializar
+from src.cache_figuras import CacheFiguras
+from src.caminhos import AnaliseCaminhos, ler_prefixo
+from src.cobertura import CuboCobertura
+from src.dados_compartilhados import RepositorioDados, publicar_matriz
+from src.figura_sankey import CORES_CATEGORIAS, ConstrutorSankey, figura_vazia
+from src.indice_medicos import COLUNAS_CRMS, COLUNAS_EPISODIOS, IndiceMedicos
+from src.matriz_jornada import CAMINHO_MATRIZ, GRANULARIDADES, MatrizJornada
+from src import tarefas
+from src.metricas import BUCKETS_BYTES, Amostrador, Registro, memoria_residente
+from src.pipeline import estagios_padrao
+
+if TYPE_CHECKING:
+    from src.transicoes import CuboTransicoes
 
-print("--- Preparando a Aplicação Dash (Versão com Lógica de Insight Corrigida) ---")
+# Importar este módulo não lê dados nem importa o pandas: o layout sai do meta.json
+# da versão publicada e os arrays são abertos na primeira requisição que precisar
+# deles (ou logo na subida, em segundo plano, com JORNADA_PRECARREGAR=1). Sem versão
+# publicada a página mostra um aviso de carga enquanto os dados são preparados numa
+# thread, e recarrega sozinha quando a versão sai.
+# Carregador, esquema, painel e transições (que trazem o pandas) ficam adiados
+# para dentro das funções de carga.
 
 # --- 1. PREPARAÇÃO DOS DADOS ---
 ARQUIVO_ENTRADA = 'jornada_medicos_trimestral.xlsx'
-CORES_CATEGORIAS = {
-    '1': '#1f77b4', '2': '#2ca02c', '3': '#ff7f0e', '4': '#d62728', '5': '#9467bd', 
-    'SEM CAT': '#7f7f7f', 'default': '#cccccc'
-}
+ARQUIVO_PAINEL = 'PAINEL_FV_GERAL.xlsx'
+TOKEN_ADMIN = os.environ.get('JORNADA_TOKEN_ADMIN')
+LIMITE_LOTE = int(os.environ.get('JORNADA_LIMITE_LOTE', 20000))
+API_MAX_AGE = int(os.environ.get('JORNADA_API_MAX_AGE', 60))
+# Trimestres na janela inicial do Sankey (o slider permite ampliar)
+JANELA_SANKEY = int(os.environ.get('JORNADA_JANELA_SANKEY', 8))
+# Perfil por amostragem sob demanda (cabeçalho X-Perfil: 1) só quando habilitado
+PERFIL_HABILITADO = os.environ.get('JORNADA_PERFIL') == '1'
+# Envio de planilhas pelo dash (reprocessamento em segundo plano) só quando habilitado
+UPLOAD_HABILITADO = os.environ.get('JORNADA_UPLOAD') == '1'
+# Abre os dados numa thread logo na subida, em vez de esperar a primeira requisição
+PRECARREGAR = os.environ.get('JORNADA_PRECARREGAR') == '1'
 
-def limpar_e_padronizar_categoria(cat):
-    if pd.isna(cat) or str(cat).strip() == '': return 'SEM CAT'
-    try: return str(int(float(str(cat))))
-    except (ValueError, TypeError): return str(cat).strip()
+# Métricas deste worker, expostas em /metrics no formato do Prometheus
+registro = Registro({'worker': os.getpid()})
+latencia_callbacks = registro.histograma('jornada_callback_segundos', 'Latência dos callbacks do dash no servidor')
+payload_callbacks = registro.histograma('jornada_callback_payload_bytes', 'Tamanho das respostas dos callbacks', BUCKETS_BYTES)
+carga_dados = registro.gauge('jornada_carga_segundos', 'Duração de cada etapa da última carga de dados')
 
-def preparar_dados_sankey():
-    try:
-        df = pd.read_excel(ARQUIVO_ENTRADA)
-        print(f" Arquivo '{ARQUIVO_ENTRADA}' carregado com sucesso.")
-    except FileNotFoundError:
-        print(f" ERRO: Arquivo '{ARQUIVO_ENTRADA}' não encontrado."); exit()
-        
-    df['CATEGORIA'] = df['CATEGORIA'].apply(limpar_e_padronizar_categoria)
-    df['TRIMESTRE'] = df['TRIMESTRE'].astype(str).str.strip()
-    
-    trimestres = sorted(df['TRIMESTRE'].unique())
-    all_transitions = []
-    for i in range(len(trimestres) - 1):
-        t1, t2 = trimestres[i], trimestres[i+1]
-        df_t1 = df[df['TRIMESTRE'] == t1]; df_t2 = df[df['TRIMESTRE'] == t2]
-        df_merged = pd.merge(df_t1, df_t2, on='CRM LINK', suffixes=(f'_{t1}', f'_{t2}'))
-        transitions = df_merged.groupby([f'CATEGORIA_{t1}', f'CATEGORIA_{t2}', f'NO_PAINEL_{t2}']).size().reset_index(name='value')
-        transitions = transitions.rename(columns={f'CATEGORIA_{t1}': 'cat_source', f'CATEGORIA_{t2}': 'cat_target', f'NO_PAINEL_{t2}': 'no_painel'})
-        transitions['trimestre_source'] = t1; transitions['trimestre_target'] = t2
-        all_transitions.append(transitions)
-        
-    if not all_transitions: print(" ERRO: Nenhuma transição encontrada."); exit()
-    return pd.concat(all_transitions, ignore_index=True), trimestres
-
-df_sankey_data, trimestres = preparar_dados_sankey()
-
-def chave_de_ordenacao(categoria):
-    try: return (0, int(categoria))
-    except ValueError: return (1, categoria)
-
-all_cats = pd.unique(df_sankey_data[['cat_source', 'cat_target']].values.ravel('K'))
-categorias_ordenadas = sorted(all_cats, key=chave_de_ordenacao)
-print(f"Ordem hierárquica final das categorias: {categorias_ordenadas}")
+def carregar_matriz():
+    # A matriz da jornada é gerada pelo pipeline (ou pelo modo incremental);
+    # só é reconstruída aqui se não existir ou estiver mais velha que a planilha.
+    planilha_mais_nova = os.path.exists(ARQUIVO_ENTRADA) and (
+        not os.path.exists(CAMINHO_MATRIZ) or os.path.getmtime(ARQUIVO_ENTRADA) > os.path.getmtime(CAMINHO_MATRIZ))
+    if os.path.exists(CAMINHO_MATRIZ) and not planilha_mais_nova:
+        matriz = MatrizJornada.carregar(CAMINHO_MATRIZ)
+        print(f" Matriz da jornada '{CAMINHO_MATRIZ}' carregada com sucesso.")
+    else:
+        from src.carregador import ler_planilha
+        from src.esquema import codificar_jornada
+
+        try:
+            df = ler_planilha(ARQUIVO_ENTRADA)
+            print(f" Arquivo '{ARQUIVO_ENTRADA}' carregado com sucesso.")
+        except FileNotFoundError:
+            print(f" ERRO: Arquivo '{ARQUIVO_ENTRADA}' não encontrado."); return None
+        matriz = MatrizJornada.de_tabela(codificar_jornada(df))
+        matriz.salvar(CAMINHO_MATRIZ)
+
+    if not matriz.transicoes().any(): print(" ERRO: Nenhuma transição encontrada."); return None
+    return matriz
+
+def publicar_dados_locais():
+    # Sem versão publicada (ou por gatilho administrativo): publica a partir da matriz local
+    with carga_dados.cronometrar(etapa='matriz_local'):
+        matriz = carregar_matriz()
+    if matriz is None:
+        return None
+    episodios = None
+    if os.path.exists(ARQUIVO_PAINEL):
+        from src.indice_medicos import indexar_episodios
+        from src.tabelona_cat_trim_inclusao import ler_painel
+
+        with carga_dados.cronometrar(etapa='episodios_painel'):
+            episodios = indexar_episodios(ler_painel(ARQUIVO_PAINEL), matriz.crms)
+    with carga_dados.cronometrar(etapa='publicar'):
+        return publicar_matriz(matriz, episodios)
+
+# Figuras já serializadas, por estado normalizado dos controles (por processo)
+cache_figuras = CacheFiguras.do_ambiente()
+# Sankeys de outras janelas/granularidades já montados (nós, cores e hover pré-calculados)
+cache_sankeys = CacheFiguras(tamanho=16)
+
+@dataclass(frozen=True)
+class DadosDashboard:
+    versao: str
+    matriz: MatrizJornada
+    sankey: ConstrutorSankey
+    indice: IndiceMedicos = None
+    cobertura: CuboCobertura = None
+    cubo: 'CuboTransicoes' = None
+
+    @property
+    def categorias(self):
+        return self.sankey.categorias
+
+    @property
+    def trimestres(self):
+        return self.sankey.trimestres
+
+    @property
+    def ufs(self):
+        return self.sankey.ufs or []
+
+def montar_dados(arrays, meta):
+    # Tudo sai do artefato da matriz da jornada: o cubo do Sankey vem publicado junto
+    # e nós, cores e textos de hover ficam pré-calculados; o callback só aplica máscaras
+    from src.transicoes import CuboTransicoes, construir_cubo
+
+    matriz = MatrizJornada.de_artefato(arrays, meta)
+    with carga_dados.cronometrar(etapa='cubo'):
+        # Versões publicadas antes do cubo entrar no artefato: recontado a partir da matriz
+        cubo = CuboTransicoes.de_artefato(arrays, meta) if 'cubo_valores' in arrays else construir_cubo(matriz)
+    with carga_dados.cronometrar(etapa='sankey'):
+        sankey = ConstrutorSankey(cubo)
+    # Índice CRM -> linha (busca binária no artefato) e offsets dos episódios do painel
+    with carga_dados.cronometrar(etapa='indice_medicos'):
+        episodios = {nome: arrays[nome] for nome in COLUNAS_EPISODIOS} if 'ep_offsets' in arrays else None
+        crms = {nome: arrays[nome] for nome in COLUNAS_CRMS} if 'crms_ordenados' in arrays else None
+        indice = IndiceMedicos(matriz, episodios, crms) if matriz.crms is not None else None
+    with carga_dados.cronometrar(etapa='cobertura'):
+        # Cubo gravado pelo pipeline quando publicado junto; senão sai da matriz
+        if 'cob_linhas' in arrays:
+            cobertura = CuboCobertura.de_artefato(arrays, meta)
+        else:
+            cobertura = CuboCobertura.de_matriz(matriz)
+    dados = DadosDashboard(versao=meta['versao'], matriz=matriz, sankey=sankey, indice=indice, cobertura=cobertura, cubo=cubo)
+    print(f"Ordem hierárquica final das categorias: {dados.categorias}")
+
+    cache_figuras.limpar()
+    cache_sankeys.limpar()
+    if os.environ.get('JORNADA_CACHE_AQUECER') == '1':
+        # Estados mais comuns: janela inicial, todas as categorias, visão geral e cada foco, nos dois universos
+        inicio, fim = janela_padrao(dados.trimestres)
+        estados = [(dados.versao, universo, tuple(sorted(dados.categorias)), foco, inicio, fim, 'trimestre')
+                   for universo in ('mercado', 'painel') for foco in ['geral', *dados.categorias]]
+        with carga_dados.cronometrar(etapa='aquecer_cache'):
+            cache_figuras.aquecer(estados, lambda versao, *estado: gerar_figura_json(dados, *estado))
+        print(f" Cache de figuras aquecido com {len(estados)} estados.")
+    return dados
+
+repositorio = RepositorioDados(montar_dados, inicializar=publicar_dados_locais)
+
+def janela_padrao(trimestres):
+    return max(len(trimestres) - JANELA_SANKEY, 0), max(len(trimestres) - 1, 0)
+
+def sankey_da_janela(dados, inicio=None, fim=None, granularidade='trimestre'):
+    # Só os links da janela, na resolução pedida: o tamanho da figura não cresce com o histórico
+    j = dados.matriz.janela(inicio, fim)
+    inicio, fim = j.start, j.stop - 1
+    if granularidade == 'trimestre' and (inicio, fim) == (0, len(dados.trimestres) - 1):
+        return dados.sankey
+    if granularidade == 'trimestre':
+        # Pares trimestrais vizinhos: basta fatiar o cubo já carregado
+        gerar = lambda: ConstrutorSankey(dados.cubo.recortar(inicio, fim))
+    else:
+        from src.transicoes import construir_cubo
+
+        gerar = lambda: ConstrutorSankey(construir_cubo(dados.matriz, inicio, fim, granularidade))
+    return cache_sankeys.obter((dados.versao, inicio, fim, granularidade), gerar)
+
+def gerar_figura_json(dados, universo, categorias_selecionadas, categoria_foco, inicio=None, fim=None,
+                      granularidade='trimestre', ufs=()):
+    sankey = sankey_da_janela(dados, inicio, fim, granularidade)
+    return sankey.figura(universo, categorias_selecionadas, categoria_foco, list(ufs)).to_json()
+
+def _mensagem(erro):
+    # Texto da exceção sem o repr que o KeyError põe em volta da mensagem
+    return str(erro.args[0]) if erro.args else type(erro).__name__
 
 app = dash.Dash(__name__)
 server = app.server
+# O layout muda entre o aviso de carga e o dashboard: os ids não estão todos sempre presentes
+app.config.suppress_callback_exceptions = True
+
+def construir_layout():
+    # Só o meta.json da versão: a primeira página não espera os arrays serem abertos
+    meta = repositorio.meta_atual()
+    if meta is None:
+        # Nada publicado: prepara os dados em segundo plano (não na avaliação feita na importação)
+        if has_request_context():
+            repositorio.carregar_em_segundo_plano()
+        return layout_carregando()
+    categorias_ordenadas, trimestres = meta.get('categorias', []), meta.get('trimestres', [])
+    return html.Div(style={'fontFamily': 'Arial, sans-serif'}, children=[
+        html.H1("Dashboard de Jornada de Categoria dos Médicos", style={'textAlign': 'center'}),
+        layout_ufs(meta.get('ufs', [])),
+        dcc.Tabs(id='abas', value='fluxos', children=[
+            dcc.Tab(label='Fluxos entre trimestres', value='fluxos', children=layout_fluxos(categorias_ordenadas, trimestres)),
+            dcc.Tab(label='Caminhos', value='caminhos', children=layout_caminhos(trimestres)),
+            dcc.Tab(label='Cobertura', value='cobertura', children=layout_cobertura(categorias_ordenadas)),
+            dcc.Tab(label='Médico', value='medico', children=layout_medico()),
+            dcc.Tab(label='Atualizar dados', value='atualizar', children=layout_atualizar()),
+        ]),
+    ])
+
+def layout_carregando():
+    return html.Div(style={'fontFamily': 'Arial, sans-serif', 'textAlign': 'center'}, children=[
+        html.H1("Dashboard de Jornada de Categoria dos Médicos"),
+        html.P("Preparando os dados... a página recarrega sozinha quando terminar.", id='carga-mensagem'),
+        dcc.Interval(id='carga-intervalo', interval=3000),
+        dcc.Store(id='carga-pronta'),
+        html.Div(id='carga-recarga', style={'display': 'none'}),
+    ])
+
+def layout_ufs(ufs):
+    # Filtro global de estado (UF do CRM): vale para Fluxos e Cobertura; vazio = Brasil todo
+    return html.Div(style={'width': '90%', 'margin': '0 auto 10px auto', 'display': 'flex', 'alignItems': 'center', 'gap': '10px'}, children=[
+        html.Label("Estados (UF do CRM):", style={'fontWeight': 'bold'}),
+        dcc.Dropdown(id='uf-filtro', options=[{'label': uf, 'value': uf} for uf in ufs], value=[], multi=True,
+                     placeholder='Todos os estados', disabled=not ufs, style={'flex': 1}),
+    ])
 
-app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif'}, children=[
-    html.H1("Dashboard de Jornada de Categoria dos Médicos", style={'textAlign': 'center'}),
-    html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
-        html.Div(style={'display': 'flex', 'gap': '40px'}, children=[
-            html.Div(style={'flex': 1}, children=[
-                html.Label("Analisar Universo:", style={'fontWeight': 'bold'}),
-                dcc.RadioItems(id='universo-radio', options=[{'label': ' Mercado Total', 'value': 'mercado'}, {'label': ' No Painel FV', 'value': 'painel'}], value='mercado', labelStyle={'display': 'inline-block', 'margin-right': '10px'})
+def layout_fluxos(categorias_ordenadas, trimestres):
+    inicio, fim = janela_padrao(trimestres)
+    # Marcas só no começo de cada ano para o slider não virar uma parede de rótulos
+    marcas = {i: t for i, t in enumerate(trimestres) if t.endswith('Q1') or i in (0, len(trimestres) - 1)}
+    return [
+        html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
+            html.Div(style={'display': 'flex', 'gap': '40px'}, children=[
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Analisar Universo:", style={'fontWeight': 'bold'}),
+                    dcc.RadioItems(id='universo-radio', options=[{'label': ' Mercado Total', 'value': 'mercado'}, {'label': ' No Painel FV', 'value': 'painel'}], value='mercado', labelStyle={'display': 'inline-block', 'margin-right': '10px'})
+                ]),
+                html.Div(style={'flex': 3}, children=[
+                    html.Label("Filtro de Categorias:", style={'fontWeight': 'bold'}),
+                    dcc.Checklist(id='categoria-slicer', options=[{'label': f' Cat. {cat}', 'value': cat} for cat in categorias_ordenadas], value=categorias_ordenadas, inline=True)
+                ]),
             ]),
-            html.Div(style={'flex': 3}, children=[
-                html.Label("Filtro de Categorias:", style={'fontWeight': 'bold'}),
-                dcc.Checklist(id='categoria-slicer', options=[{'label': f' Cat. {cat}', 'value': cat} for cat in categorias_ordenadas], value=categorias_ordenadas, inline=True)
+            html.Div(style={'display': 'flex', 'gap': '40px', 'marginTop': '10px'}, children=[
+                html.Div(style={'flex': 3}, children=[
+                    html.Label("Janela de Trimestres:", style={'fontWeight': 'bold'}),
+                    dcc.RangeSlider(id='janela-slider', min=0, max=max(len(trimestres) - 1, 0), step=1, value=[inicio, fim],
+                                    marks=marcas, allowCross=False, updatemode='mouseup'),
+                ]),
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Granularidade:", style={'fontWeight': 'bold'}),
+                    dcc.RadioItems(id='granularidade-radio', options=[{'label': f' {g.title()}', 'value': g} for g in GRANULARIDADES],
+                                   value='trimestre', labelStyle={'display': 'inline-block', 'margin-right': '10px'}),
+                ]),
             ]),
+            html.Hr(),
+            html.Div(children=[
+                html.Label("Painel de Foco (Realçar Categoria):", style={'fontWeight': 'bold'}),
+                html.Div(id='focus-buttons-container', style={'marginTop': '10px'})
+            ]),
+        ]),
+        dcc.Graph(id='sankey-graph', style={'height': '75vh'}),
+        dcc.Store(id='focus-category-store')
+    ]
+
+def layout_caminhos(trimestres):
+    opcoes = [{'label': t, 'value': t} for t in trimestres]
+    # Janela padrão: o último ano (5 trimestres, 4 movimentos)
+    inicio = trimestres[max(len(trimestres) - 5, 0)] if trimestres else None
+    fim = trimestres[-1] if trimestres else None
+    return [
+        html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
+            html.Div(style={'display': 'flex', 'gap': '40px'}, children=[
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Janela:", style={'fontWeight': 'bold'}),
+                    html.Div(style={'display': 'flex', 'gap': '10px'}, children=[
+                        dcc.Dropdown(id='caminho-inicio', options=opcoes, value=inicio, clearable=False, style={'flex': 1}),
+                        dcc.Dropdown(id='caminho-fim', options=opcoes, value=fim, clearable=False, style={'flex': 1}),
+                    ]),
+                ]),
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Analisar Universo:", style={'fontWeight': 'bold'}),
+                    dcc.RadioItems(id='caminho-universo', options=[{'label': ' Mercado Total', 'value': 'mercado'}, {'label': ' Sempre no Painel FV', 'value': 'painel'}], value='mercado', labelStyle={'display': 'inline-block', 'margin-right': '10px'}),
+                    dcc.Checklist(id='caminho-completos', options=[{'label': ' Só médicos presentes em todos os trimestres', 'value': 'completos'}], value=[]),
+                ]),
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Começa com (ex.: 4 > 3):", style={'fontWeight': 'bold'}),
+                    dcc.Input(id='caminho-prefixo', type='text', debounce=True, placeholder='4 > 3', style={'width': '100%'}),
+                    html.Label("Quantidade de jornadas:", style={'fontWeight': 'bold'}),
+                    dcc.Slider(id='caminho-top', min=5, max=50, step=5, value=15),
+                ]),
+            ]),
+            html.Div(id='caminho-resumo', style={'marginTop': '10px'}),
         ]),
-        html.Hr(),
-        html.Div(children=[
-            html.Label("Painel de Foco (Realçar Categoria):", style={'fontWeight': 'bold'}),
-            html.Div(id='focus-buttons-container', style={'marginTop': '10px'})
+        dcc.Graph(id='caminho-graph', style={'height': '70vh'}),
+    ]
+
+def layout_cobertura(categorias_ordenadas):
+    return [
+        html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
+            html.Div(style={'display': 'flex', 'gap': '40px'}, children=[
+                html.Div(style={'flex': 3}, children=[
+                    html.Label("Categorias na Cobertura:", style={'fontWeight': 'bold'}),
+                    dcc.Checklist(id='cobertura-categorias', options=[{'label': f' Cat. {cat}', 'value': cat} for cat in categorias_ordenadas], value=categorias_ordenadas, inline=True)
+                ]),
+                html.Div(style={'flex': 1}, children=[
+                    html.Label("Evolução Mercado x Painel da Categoria:", style={'fontWeight': 'bold'}),
+                    dcc.Dropdown(id='cobertura-categoria', options=[{'label': f'Cat. {cat}', 'value': cat} for cat in categorias_ordenadas],
+                                 value=categorias_ordenadas[0] if categorias_ordenadas else None, clearable=False)
+                ]),
+            ]),
         ]),
-    ]),
-    dcc.Graph(id='sankey-graph', style={'height': '75vh'}),
-    dcc.Store(id='focus-category-store')
-])
+        dcc.Graph(id='cobertura-graph', style={'height': '45vh'}),
+        dcc.Graph(id='evolucao-graph', style={'height': '45vh'}),
+    ]
+
+def layout_medico():
+    return [
+        html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
+            html.Label("Buscar médico por CRM:", style={'fontWeight': 'bold'}),
+            dcc.Input(id='medico-busca', type='text', debounce=True, placeholder='ex.: AL1098', style={'marginLeft': '10px'}),
+        ]),
+        html.Div(id='medico-resultado', style={'width': '90%', 'margin': '20px auto'}),
+    ]
+
+def layout_atualizar():
+    def envio(id_componente, arquivo):
+        return dcc.Upload(id=id_componente, accept='.xlsx', disabled=not UPLOAD_HABILITADO, children=html.Div(
+            [f"Arraste ou selecione {arquivo}", html.Div(id=f'{id_componente}-nome', style={'color': '#2e7d32'})]),
+            style={'flex': 1, 'padding': '20px', 'border': '1px dashed #999', 'borderRadius': '5px', 'textAlign': 'center'})
+    aviso = [] if UPLOAD_HABILITADO else [html.P("Envio de planilhas desabilitado neste servidor (JORNADA_UPLOAD=1 habilita).",
+                                                 style={'color': '#c92a2a'})]
+    return [
+        html.Div(className='controls-container', style={'width': '90%', 'margin': 'auto', 'padding': '10px', 'border': '1px solid #ddd', 'borderRadius': '5px'}, children=[
+            *aviso,
+            html.Div(style={'display': 'flex', 'gap': '20px'}, children=[
+                envio('upload-mercado', tarefas.ENTRADAS_ACEITAS[0]),
+                envio('upload-painel', tarefas.ENTRADAS_ACEITAS[1]),
+            ]),
+            html.Button('Reprocessar', id='reprocessar-botao', n_clicks=0, disabled=not UPLOAD_HABILITADO, style={'marginTop': '10px'}),
+            html.Div(id='reprocessar-mensagem', style={'marginTop': '10px'}),
+        ]),
+        html.Div(id='tarefas-lista', style={'width': '90%', 'margin': '20px auto'}),
+        dcc.Interval(id='tarefas-intervalo', interval=3000, disabled=not UPLOAD_HABILITADO),
+    ]
+
+app.layout = construir_layout
+
+@app.callback(
+    [Output('carga-pronta', 'data'),
+     Output('carga-mensagem', 'children')],
+    Input('carga-intervalo', 'n_intervals')
+)
+def acompanhar_carga(_):
+    if repositorio.meta_atual() is not None:
+        return True, "Dados prontos, recarregando..."
+    estado = repositorio.estado()
+    if estado['estado'] == 'erro':
+        return False, f"Não foi possível preparar os dados: {estado['erro']}"
+    repositorio.carregar_em_segundo_plano()
+    return False, "Preparando os dados... a página recarrega sozinha quando terminar."
+
+app.clientside_callback(
+    ClientsideFunction(namespace='carga', function_name='recarregar_quando_pronto'),
+    Output('carga-recarga', 'children'),
+    Input('carga-pronta', 'data'),
+    prevent_initial_call=True
+)
 
 @app.callback(
     Output('focus-buttons-container', 'children'),
@@ -83,119 +380,367 @@ app.layout = html.Div(style={'fontFamily': 'Arial, sans-serif'}, children=[
 )
 def update_focus_buttons(categorias_selecionadas):
     buttons = [html.Button('Visão Geral', id={'type': 'focus-button', 'index': 'geral'}, n_clicks=0, style={'marginRight': '5px'})]
-    if categorias_selecionadas:
-        for cat in categorias_ordenadas:
+    dados = repositorio.atual()
+    if categorias_selecionadas and dados:
+        for cat in dados.categorias:
             if cat in categorias_selecionadas:
                 buttons.append(html.Button(f'Focar em Cat. {cat}', id={'type': 'focus-button', 'index': cat}, n_clicks=0, style={'marginRight': '5px'}))
     return buttons
 
-@app.callback(
+# Foco é resolvido no navegador (assets/foco.js): o clique só troca as cores dos
+# links da figura já carregada, sem passar pelo servidor.
+app.clientside_callback(
+    ClientsideFunction(namespace='foco', function_name='guardar_foco'),
     Output('focus-category-store', 'data'),
     Input({'type': 'focus-button', 'index': dash.dependencies.ALL}, 'n_clicks'),
     prevent_initial_call=True
 )
-def store_focus_category(n_clicks):
-    return ctx.triggered_id['index'] if ctx.triggered_id else 'geral'
+
+app.clientside_callback(
+    ClientsideFunction(namespace='foco', function_name='realcar_categoria'),
+    Output('sankey-graph', 'figure', allow_duplicate=True),
+    Input('focus-category-store', 'data'),
+    State('sankey-graph', 'figure'),
+    prevent_initial_call=True
+)
 
 @app.callback(
     Output('sankey-graph', 'figure'),
     [Input('universo-radio', 'value'),
      Input('categoria-slicer', 'value'),
-     Input('focus-category-store', 'data')]
+     Input('janela-slider', 'value'),
+     Input('granularidade-radio', 'value'),
+     Input('uf-filtro', 'value')],
+    State('focus-category-store', 'data')
 )
-def update_graph(universo, categorias_selecionadas, categoria_foco):
-    if not categorias_selecionadas:
-        return go.Figure().update_layout(title_text="Selecione ao menos uma categoria no filtro")
+def update_graph(universo, categorias_selecionadas, janela, granularidade, ufs, categoria_foco):
+    dados = repositorio.atual()
+    if dados is None:
+        return figura_vazia(f"Dados indisponíveis: gere '{ARQUIVO_ENTRADA}' ou publique uma versão pelo pipeline")
+    inicio, fim = janela or janela_padrao(dados.trimestres)
+    # Sem UF a chave é a mesma do aquecimento do cache
+    partes = (dados.versao, universo, categorias_selecionadas or [], categoria_foco or 'geral', inicio, fim, granularidade)
+    chave = CacheFiguras.chave(*partes, ufs) if ufs else CacheFiguras.chave(*partes)
+    try:
+        return json.loads(cache_figuras.obter(chave, lambda: gerar_figura_json(dados, *chave[1:])))
+    except (KeyError, IndexError, ValueError) as erro:
+        return figura_vazia(_mensagem(erro))
 
-    if universo == 'painel':
-        data = df_sankey_data[df_sankey_data['no_painel'] == 'Sim']
-    else:
-        data = df_sankey_data.groupby(['cat_source', 'cat_target', 'trimestre_source', 'trimestre_target']).agg(value=('value', 'sum')).reset_index()
-
-    data = data[data['cat_source'].isin(categorias_selecionadas) & data['cat_target'].isin(categorias_selecionadas)]
-    
-    if data.empty:
-        return go.Figure().update_layout(title_text="Nenhuma transição encontrada")
-
-    current_cats_ordered = [cat for cat in categorias_ordenadas if cat in pd.unique(data[['cat_source', 'cat_target']].values.ravel('K'))]
-    labels, node_map, node_custom_data = [], {}, []
-    
-    total_por_trimestre = data.groupby('trimestre_source')['value'].sum()
-    
-    for i, trimestre in enumerate(trimestres):
-        cats_no_trimestre = pd.unique(data[data['trimestre_source'] == trimestre]['cat_source'])
-        total_trimestre_atual = total_por_trimestre.get(trimestre, 0)
-        
-        for j, categoria in enumerate(current_cats_ordered):
-            if categoria in cats_no_trimestre:
-                label_text = f"Cat. {categoria}<br>({trimestre})"
-                labels.append(label_text)
-                node_map[f"{trimestre}: Cat {categoria}"] = len(labels) - 1
-                
-                total_cat = data[(data['trimestre_source'] == trimestre) & (data['cat_source'] == categoria)]['value'].sum()
-                percentual = (total_cat / total_trimestre_atual) * 100 if total_trimestre_atual > 0 else 0
-                node_custom_data.append(f"Total: {total_cat} médicos<br>Representatividade: {percentual:.1f}% neste trimestre")
-
-    link_source, link_target, link_value, link_color, link_cat_source, link_cat_target, link_custom_data = [], [], [], [], [], [], []
-    for _, row in data.iterrows():
-        source_key, target_key = f"{row['trimestre_source']}: Cat {row['cat_source']}", f"{row['trimestre_target']}: Cat {row['cat_target']}"
-        if source_key in node_map and target_key in node_map:
-            link_source.append(node_map[source_key]); link_target.append(node_map[target_key])
-            link_value.append(row['value'])
-            source_color_hex = CORES_CATEGORIAS.get(row['cat_source'], CORES_CATEGORIAS['default'])
-            link_color.append(f'rgba({int(source_color_hex[1:3], 16)}, {int(source_color_hex[3:5], 16)}, {int(source_color_hex[5:7], 16)}, 0.6)')
-            link_cat_source.append(row['cat_source']); link_cat_target.append(row['cat_target'])
-            
-            # ##########################################################################
-            # ## CORREÇÃO: Lógica de Insight aprimorada para "SEM CAT" ##
-            # ##########################################################################
-            insight = ""
-            source_cat = row['cat_source']
-            target_cat = row['cat_target']
-
-            if source_cat == target_cat:
-                insight = "<b>Insight:</b> Médicos que <b>mantiveram</b> a categoria."
-            elif source_cat == 'SEM CAT': # Qualquer saída de "SEM CAT" é melhora
-                insight = "<b>Insight:</b> Este fluxo representa uma <b>melhora</b> (entrada em categoria)."
-            elif target_cat == 'SEM CAT': # Qualquer entrada em "SEM CAT" é regressão
-                insight = "<b>Insight:</b> Este fluxo representa uma <b>regressão</b> (saída de categoria)."
-            else: # Lógica para categorias numéricas
-                if int(target_cat) < int(source_cat):
-                    insight = "<b>Insight:</b> Este fluxo representa uma <b>melhora</b> de categoria."
-                else: # int(target_cat) > int(source_cat)
-                    insight = "<b>Insight:</b> Este fluxo representa uma <b>regressão</b> de categoria."
-            
-            link_custom_data.append(f"<b>Movimento:</b> {row['value']} médicos<br><b>De:</b> Cat.{row['cat_source']} ({row['trimestre_source']})<br><b>Para:</b> Cat.{row['cat_target']} ({row['trimestre_target']})<br>{insight}")
-
-    cor_link_final = link_color
-    if categoria_foco and categoria_foco != 'geral':
-        cores_foco = []
-        for i in range(len(link_cat_source)):
-            if link_cat_source[i] == categoria_foco or link_cat_target[i] == categoria_foco:
-                cores_foco.append(link_color[i])
-            else:
-                cores_foco.append('rgba(230, 230, 230, 0.05)')
-        cor_link_final = cores_foco
-        
-    fig = go.Figure(go.Sankey(
-        arrangement='snap',
-        node={
-            'pad': 25, 'thickness': 20, 'line': {'color': 'black', 'width': 0.5},
-            'label': labels,
-            'color': [CORES_CATEGORIAS.get(cat.split('<br>')[0].replace('Cat. ', ''), CORES_CATEGORIAS['default']) for cat in labels],
-            'customdata': node_custom_data,
-            'hovertemplate': '<b>%{label}</b><br>%{customdata}<extra></extra>'
-        },
-        link={
-            'source': link_source, 'target': link_target, 'value': link_value, 'color': cor_link_final,
-            'customdata': link_custom_data,
-            'hovertemplate': '%{customdata}<extra></extra>'
-        }
+def figura_caminhos(dados, inicio, fim, universo, completos, prefixo, k):
+    caminhos = AnaliseCaminhos(dados.matriz, inicio, fim, universo=universo, completos=completos)
+    unicas, contagens = caminhos.contar(prefixo)
+    resumo = f"{int(contagens.sum())} médicos na seleção, {len(unicas)} caminhos distintos."
+    # Barras horizontais: a jornada mais frequente fica no topo
+    unicas, contagens = unicas[:k][::-1], contagens[:k][::-1]
+    rotulos = [caminhos.rotulo(c) for c in unicas.tolist()]
+    fig = go.Figure(go.Bar(
+        x=contagens.tolist(), y=rotulos, orientation='h', marker_color='#1f77b4',
+        hovertemplate='<b>%{y}</b><br>%{x} médicos<extra></extra>'
     ))
-    fig.update_layout(title_text=f"Jornada de Médicos - {universo.replace('_', ' ').title()}", transition_duration=250)
-    return fig
+    fig.update_layout(
+        title_text=f"Jornadas mais frequentes - {' → '.join(caminhos.trimestres)}",
+        xaxis_title='Médicos', yaxis={'automargin': True}, margin={'l': 20},
+    )
+    return fig.to_json(), resumo
+
+@app.callback(
+    [Output('caminho-graph', 'figure'),
+     Output('caminho-resumo', 'children')],
+    [Input('caminho-inicio', 'value'),
+     Input('caminho-fim', 'value'),
+     Input('caminho-universo', 'value'),
+     Input('caminho-completos', 'value'),
+     Input('caminho-prefixo', 'value'),
+     Input('caminho-top', 'value')]
+)
+def update_caminhos(inicio, fim, universo, completos, texto_prefixo, k):
+    dados = repositorio.atual()
+    if dados is None:
+        return figura_vazia("Dados indisponíveis"), ""
+    try:
+        prefixo = ler_prefixo(texto_prefixo)
+        chave = ('caminhos', dados.versao, inicio, fim, universo, bool(completos), json.dumps(prefixo), k)
+        figura, resumo = cache_figuras.obter(chave, lambda: figura_caminhos(dados, inicio, fim, universo, bool(completos), prefixo, k))
+    except (KeyError, ValueError) as erro:
+        return figura_vazia(_mensagem(erro)), ""
+    return json.loads(figura), resumo
+
+def figuras_cobertura(dados, categorias_selecionadas, categoria_evolucao, ufs=()):
+    # Recorte por UF: soma das fatias pré-calculadas, sem voltar à matriz
+    cubo = dados.cobertura.recorte_uf(list(ufs))
+    cobertura = go.Figure()
+    for codigo, cat in enumerate(cubo.categorias):
+        if cat not in categorias_selecionadas:
+            continue
+        presentes = cubo.medicos[codigo] > 0
+        cobertura.add_trace(go.Scatter(
+            x=[t for t, p in zip(cubo.trimestres, presentes) if p], y=cubo.percentual[codigo][presentes].round(1).tolist(),
+            mode='lines+markers', name=f'Cat. {cat}', line={'color': CORES_CATEGORIAS.get(cat, CORES_CATEGORIAS['default'])},
+            hovertemplate=f'Cat. {cat}<br>%{{x}}: %{{y}}% no painel<extra></extra>'))
+    cobertura.update_layout(title_text='% Cobertura da Força de Vendas por Categoria e Trimestre',
+                            yaxis_title='% de Médicos no Painel', yaxis={'rangemode': 'tozero'})
+
+    evolucao = go.Figure()
+    if categoria_evolucao in cubo.categorias:
+        serie = cubo.serie(categoria_evolucao)
+        evolucao.add_trace(go.Scatter(x=cubo.trimestres, y=serie['medicos'].tolist(), mode='lines+markers', name='Total no Mercado'))
+        evolucao.add_trace(go.Scatter(x=cubo.trimestres, y=serie['medicos_painel'].tolist(), mode='lines+markers', name='No Painel (ativos)'))
+        evolucao.update_layout(title_text=f'Evolução - Categoria {categoria_evolucao}', yaxis_title='Número de Médicos')
+    return cobertura.to_json(), evolucao.to_json()
+
+@app.callback(
+    [Output('cobertura-graph', 'figure'),
+     Output('evolucao-graph', 'figure')],
+    [Input('cobertura-categorias', 'value'),
+     Input('cobertura-categoria', 'value'),
+     Input('uf-filtro', 'value')]
+)
+def update_cobertura(categorias_selecionadas, categoria_evolucao, ufs):
+    dados = repositorio.atual()
+    if dados is None:
+        return figura_vazia("Dados indisponíveis"), figura_vazia("")
+    chave = CacheFiguras.chave('cobertura', dados.versao, categorias_selecionadas or [], categoria_evolucao, ufs or [])
+    cobertura, evolucao = cache_figuras.obter(
+        chave, lambda: figuras_cobertura(dados, categorias_selecionadas or [], categoria_evolucao, chave[-1]))
+    return json.loads(cobertura), json.loads(evolucao)
+
+def tabela_medico(resultado):
+    celula = {'border': '1px solid #ddd', 'padding': '4px 10px', 'textAlign': 'center'}
+    linhas = [html.Tr([html.Th(x, style=celula) for x in ('Trimestre', 'Categoria', 'No Painel')])]
+    for item in resultado['trimestres']:
+        categoria = f"Cat. {item['categoria']}" if item['categoria'] is not None else 'fora do mercado'
+        linhas.append(html.Tr([html.Td(item['trimestre'], style=celula), html.Td(categoria, style=celula),
+                               html.Td('Sim' if item['no_painel'] else 'Não', style=celula)]))
+    episodios = [html.Li(f"Inclusão {ep['inclusao']} - inativação {ep['inativacao'] or 'em aberto'}")
+                 for ep in resultado['episodios']] or [html.Li("Sem episódios no painel.")]
+    return [html.H3(f"CRM {resultado['crm']}"), html.Table(linhas, style={'borderCollapse': 'collapse'}),
+            html.H4("Episódios no Painel FV"), html.Ul(episodios)]
+
+@app.callback(
+    Output('medico-resultado', 'children'),
+    Input('medico-busca', 'value')
+)
+def update_medico(crm):
+    if not crm or not crm.strip():
+        return ""
+    dados = repositorio.atual()
+    if dados is None or dados.indice is None:
+        return "Índice de médicos indisponível: republique os dados pelo pipeline."
+    resultado = dados.indice.consultar(crm)
+    if resultado is None:
+        return f"CRM '{crm.strip()}' não encontrado."
+    return tabela_medico(resultado)
+
+@app.callback(
+    [Output('upload-mercado-nome', 'children'),
+     Output('upload-painel-nome', 'children')],
+    [Input('upload-mercado', 'filename'),
+     Input('upload-painel', 'filename')]
+)
+def update_nomes_upload(mercado, painel):
+    return mercado or '', painel or ''
+
+@app.callback(
+    Output('reprocessar-mensagem', 'children'),
+    Input('reprocessar-botao', 'n_clicks'),
+    [State('upload-mercado', 'contents'),
+     State('upload-painel', 'contents')],
+    prevent_initial_call=True
+)
+def reprocessar(n_clicks, mercado, painel):
+    # O worker só grava as planilhas e dispara o executor; o pipeline roda em outro processo
+    if not UPLOAD_HABILITADO:
+        return "Envio de planilhas desabilitado neste servidor."
+    arquivos = {nome: base64.b64decode(conteudo.split(',', 1)[1])
+                for nome, conteudo in zip(tarefas.ENTRADAS_ACEITAS, (mercado, painel)) if conteudo}
+    try:
+        id_tarefa = tarefas.enfileirar(arquivos)
+    except (OSError, ValueError) as erro:
+        return f"Não foi possível enfileirar: {erro}"
+    return f"Tarefa {id_tarefa} na fila. O dash troca de versão sozinho quando ela terminar."
+
+@app.callback(
+    Output('tarefas-lista', 'children'),
+    Input('tarefas-intervalo', 'n_intervals')
+)
+def update_tarefas(_):
+    lista = tarefas.listar()
+    if not lista:
+        return html.P("Nenhuma tarefa de reprocessamento.")
+    total = len(estagios_padrao())
+    celula = {'border': '1px solid #ddd', 'padding': '4px 10px'}
+    linhas = [html.Tr([html.Th(c, style=celula) for c in ('Tarefa', 'Planilhas', 'Situação', 'Progresso', 'Detalhe')])]
+    for estado in lista:
+        rodando = [nome for nome, situacao in estado['estagios'].items() if situacao == 'rodando']
+        detalhe = estado['erro'] or (f"estágio {rodando[-1]}" if rodando else '')
+        linhas.append(html.Tr([
+            html.Td(estado['id'], style=celula), html.Td(', '.join(estado['arquivos']) or 'republicação', style=celula),
+            html.Td(estado['situacao'].replace('_', ' '), style=celula),
+            html.Td(html.Progress(value=str(tarefas.progresso(estado, total)), max='1'), style=celula),
+            html.Td(detalhe, style=celula),
+        ]))
+    return html.Table(linhas, style={'borderCollapse': 'collapse'})
+
+def _indice_ou_erro():
+    dados = repositorio.atual()
+    if dados is None or dados.indice is None:
+        return None, (jsonify({'erro': 'índice de médicos indisponível'}), 503)
+    return dados.indice, None
+
+@server.route('/api/medico/<path:crm>')
+def api_medico(crm):
+    indice, erro = _indice_ou_erro()
+    if erro:
+        return erro
+    resultado = indice.consultar(crm)
+    if resultado is None:
+        return jsonify({'erro': f"CRM '{crm}' não encontrado"}), 404
+    return jsonify(resultado)
+
+@server.route('/api/medicos', methods=['GET', 'POST'])
+def api_medicos():
+    # Lote: POST {"crms": [...]} ou GET ?crms=A,B,C (exportações de listas de CRM)
+    indice, erro = _indice_ou_erro()
+    if erro:
+        return erro
+    if request.method == 'POST':
+        crms = (request.get_json(silent=True) or {}).get('crms')
+    else:
+        crms = [c for c in request.args.get('crms', '').split(',') if c.strip()]
+    if not isinstance(crms, list):
+        return jsonify({'erro': "informe 'crms' como lista"}), 400
+    if len(crms) > LIMITE_LOTE:
+        return jsonify({'erro': f'no máximo {LIMITE_LOTE} CRMs por requisição'}), 413
+    encontrados, faltando = indice.consultar_lote(crms)
+    return jsonify({'medicos': encontrados, 'nao_encontrados': faltando})
+
+# Corpos já serializados e comprimidos, pelo ETag (que inclui versão e codificação)
+cache_respostas = CacheFiguras(tamanho=64)
+
+def responder_agregado(recurso, gerar, **parametros):
+    dados = repositorio.atual()
+    if dados is None:
+        return jsonify({'erro': 'dados indisponíveis'}), 503
+    codificacao = escolher_codificacao(request.accept_encodings)
+    tag = etag(dados.versao, recurso, parametros, codificacao)
+    if request.if_none_match.contains(tag):
+        corpo = b''
+    else:
+        try:
+            corpo = cache_respostas.obter(tag, lambda: serializar(gerar(dados), codificacao))
+        except (KeyError, ValueError) as erro:
+            return jsonify({'erro': _mensagem(erro)}), 400
+    resposta = server.response_class(corpo, mimetype='application/json')
+    if codificacao != 'identity':
+        resposta.headers['Content-Encoding'] = codificacao
+    resposta.vary.add('Accept-Encoding')
+    resposta.set_etag(tag)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = API_MAX_AGE
+    # 304 sem corpo quando o If-None-Match bate com o ETag
+    return resposta.make_conditional(request)
+
+@server.route(f'/api/{VERSAO_API}/sankey')
+def api_sankey():
+    # ?uf=SP&uf=RJ restringe aos médicos desses estados; inicio/fim/granularidade, à janela
+    ufs = sorted(set(request.args.getlist('uf')))
+    inicio, fim = request.args.get('inicio'), request.args.get('fim')
+    granularidade = request.args.get('granularidade', 'trimestre')
+    return responder_agregado(
+        'sankey', lambda dados: sankey_compacto(sankey_da_janela(dados, inicio, fim, granularidade), dados.versao, ufs),
+        uf=ufs, inicio=inicio, fim=fim, granularidade=granularidade)
+
+@server.route(f'/api/{VERSAO_API}/cobertura')
+def api_cobertura():
+    inicio, fim = request.args.get('inicio'), request.args.get('fim')
+    return responder_agregado('cobertura', lambda dados: cobertura_compacta(dados.matriz, dados.versao, inicio, fim),
+                              inicio=inicio, fim=fim)
+
+# --- Instrumentação: latência e tamanho das respostas de cada callback ---
+def _estatisticas_caches():
+    valores = {}
+    for nome, cache in (('figuras', cache_figuras), ('sankeys', cache_sankeys), ('respostas', cache_respostas)):
+        for campo, valor in cache.estatisticas().items():
+            if campo != 'politica':
+                valores[(('cache', nome), ('campo', campo))] = valor
+    return valores
+
+registro.gauge('jornada_cache', 'Acertos, falhas, descartes, itens e taxa de acerto dos caches', _estatisticas_caches)
+registro.gauge('process_resident_memory_bytes', 'Memória residente (RSS) do worker', lambda: {(): memoria_residente()})
+registro.gauge('jornada_versao_dados', 'Versão de dados em uso por este worker',
+               lambda: {(('versao', repositorio.versao),): 1} if repositorio.versao else {})
+
+def _nome_callback(saida):
+    funcao = app.callback_map.get(saida, {}).get('callback')
+    return getattr(funcao, '__name__', saida)
+
+@server.before_request
+def iniciar_medicao():
+    if request.path != '/_dash-update-component':
+        return
+    g.inicio_callback = time.perf_counter()
+    g.amostrador = None
+    if PERFIL_HABILITADO and request.headers.get('X-Perfil') == '1' and (
+            not TOKEN_ADMIN or request.headers.get('X-Token-Admin') == TOKEN_ADMIN):
+        g.amostrador = Amostrador().iniciar()
+
+@server.after_request
+def registrar_medicao(resposta):
+    inicio = g.pop('inicio_callback', None)
+    if inicio is None:
+        return resposta
+    nome = _nome_callback((request.get_json(silent=True) or {}).get('output', ''))
+    latencia_callbacks.observar(time.perf_counter() - inicio, callback=nome)
+    payload_callbacks.observar(resposta.calculate_content_length() or 0, callback=nome)
+    amostrador = g.pop('amostrador', None)
+    if amostrador is not None:
+        amostrador.parar()
+        resposta.headers['X-Perfil-Arquivo'] = amostrador.salvar(nome)
+    return resposta
+
+@server.route('/metrics')
+def metrics():
+    return server.response_class(registro.renderizar(), mimetype='text/plain; version=0.0.4')
+
+@server.route('/saude')
+def saude():
+    # Vivacidade: responde sem tocar nos dados
+    return jsonify({'pid': os.getpid(), 'no_ar_segundos': round(time.perf_counter() - INICIO, 3)})
+
+@server.route('/pronto')
+def pronto():
+    # Prontidão: 200 só com os dados abertos; senão dispara a carga e responde 503
+    estado = repositorio.estado()
+    if estado['estado'] != 'pronto':
+        repositorio.carregar_em_segundo_plano()
+        return jsonify(repositorio.estado()), 503
+    return jsonify(estado)
+
+@server.route('/admin/recarregar', methods=['POST'])
+def recarregar_dados():
+    # Gatilho administrativo: ?republicar=1 enfileira a republicação (src/tarefas.py),
+    # que roda em outro processo; os workers trocam de versão ao ver o ponteiro mudar.
+    # Sem JORNADA_TOKEN_ADMIN configurado a rota fica fechada.
+    if not TOKEN_ADMIN or request.headers.get('X-Token-Admin') != TOKEN_ADMIN:
+        return jsonify({'erro': 'não autorizado'}), 403
+    if request.args.get('republicar') == '1':
+        try:
+            id_tarefa = tarefas.enfileirar_republicacao()
+        except OSError as erro:
+            return jsonify({'erro': f'não foi possível enfileirar: {erro}'}), 500
+        return jsonify({'tarefa': id_tarefa, 'versao': repositorio.versao}), 202
+    dados = repositorio.recarregar()
+    return jsonify({'versao': dados.versao if dados else None, 'erro': repositorio.erro})
+
+if PRECARREGAR:
+    repositorio.carregar_em_segundo_plano()
+
+inicializacao = time.perf_counter() - INICIO
+registro.gauge('jornada_inicializacao_segundos', 'Tempo de importação do app até ficar pronto para atender',
+               lambda: {(): inicializacao})
 
 if __name__ == '__main__':
+    print(f"--- Aplicação Dash importada em {inicializacao:.2f}s ---")
     print("\n--- Aplicação pronta! Acesse o endereço abaixo no seu navegador. ---")
     print("Use CTRL+C no terminal para encerrar o servidor.")
-    app.run(debug=False)
\ No newline at end of file
+    app.run(debug=False)
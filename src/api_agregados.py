@@ -0,0 +1,91 @@
+"""Respostas JSON compactas dos agregados (Sankey e cobertura) para a API versionada.
+
+Em vez da figura do plotly, com o HTML de hover repetido em cada link, as
+respostas trazem índices inteiros em arrays paralelos, os dicionários (trimestres,
+categorias, textos de insight) uma única vez e o hover como um template que o
+cliente preenche; os totais e percentuais dos nós vêm em ``nos`` por universo,
+como matrizes [trimestre][categoria] (0 onde o nó não existe).
+
+Cada corpo é identificado por um ETag forte derivado da versão dos dados, do
+recurso e dos parâmetros (mais a codificação), então navegadores e proxies podem
+guardá-lo e revalidar com ``If-None-Match`` (304). A compressão usa brotli quando
+o pacote estiver instalado e o cliente aceitar, senão gzip.
+"""
+import gzip
+import hashlib
+import json
+
+import numpy as np
+
+from src.figura_sankey import CORES_CATEGORIAS, texto_insight
+
+try:
+    import brotli
+    BROTLI_DISPONIVEL = True
+except ImportError:
+    BROTLI_DISPONIVEL = False
+
+VERSAO_API = 'v1'
+TEMPLATE_HOVER_SANKEY = ("<b>Movimento:</b> {valor} médicos<br><b>De:</b> Cat.{cat_source} ({trimestre_source})"
+                         "<br><b>Para:</b> Cat.{cat_target} ({trimestre_target})<br>{insight}")
+TEMPLATE_HOVER_NO = "Total: {total} médicos<br>Representatividade: {percentual}% neste trimestre"
+
+
+def sankey_compacto(sankey, versao, ufs=None):
+    """Links do Sankey como arrays paralelos, com os valores dos dois universos (restritos a ``ufs``)."""
+    mercado, painel = sankey.valores_universo('mercado', ufs), sankey.valores_universo('painel', ufs)
+    par, src, tgt = np.nonzero(mercado)
+    # Cada texto de insight vai uma vez; os links guardam só o índice
+    textos = [texto_insight(sankey.categorias[s], sankey.categorias[t]) for s, t in zip(src.tolist(), tgt.tolist())]
+    insights = list(dict.fromkeys(textos))
+    indice_insight = {texto: i for i, texto in enumerate(insights)}
+    nos = {}
+    for universo, valores in (('mercado', mercado), ('painel', painel)):
+        totais, percentuais = sankey.totais_nos(valores)
+        nos[universo] = {'total': totais.tolist(), 'percentual': np.round(percentuais, 1).tolist()}
+    return {
+        'versao': versao,
+        'ufs': sorted(ufs) if ufs else [],
+        'trimestres': sankey.trimestres,
+        'categorias': sankey.categorias,
+        'cores': [CORES_CATEGORIAS.get(c, CORES_CATEGORIAS['default']) for c in sankey.categorias],
+        'insights': insights,
+        'links': {
+            'par': par.tolist(), 'source': src.tolist(), 'target': tgt.tolist(),
+            'mercado': mercado[par, src, tgt].tolist(), 'painel': painel[par, src, tgt].tolist(),
+            'insight': [indice_insight[texto] for texto in textos],
+        },
+        'nos': nos,
+        'templates': {'link': TEMPLATE_HOVER_SANKEY, 'no': TEMPLATE_HOVER_NO},
+    }
+
+
+def cobertura_compacta(matriz, versao, inicio=None, fim=None):
+    """Médicos no mercado e no painel por [categoria][trimestre] da janela."""
+    return {
+        'versao': versao,
+        'trimestres': matriz.trimestres_janela(inicio, fim),
+        'categorias': matriz.categorias,
+        'mercado': matriz.contagens(inicio, fim, 'mercado').tolist(),
+        'painel': matriz.contagens(inicio, fim, 'painel').tolist(),
+    }
+
+
+def etag(versao, recurso, parametros, codificacao):
+    assinatura = json.dumps([VERSAO_API, versao, recurso, sorted(parametros.items()), codificacao])
+    return hashlib.sha256(assinatura.encode('utf-8')).hexdigest()[:24]
+
+
+def escolher_codificacao(aceitas):
+    """Melhor codificação aceita pelo cliente (``request.accept_encodings``)."""
+    opcoes = ['br', 'gzip', 'identity'] if BROTLI_DISPONIVEL else ['gzip', 'identity']
+    return aceitas.best_match(opcoes, default='identity')
+
+
+def serializar(conteudo, codificacao):
+    corpo = json.dumps(conteudo, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if codificacao == 'br':
+        return brotli.compress(corpo)
+    if codificacao == 'gzip':
+        return gzip.compress(corpo, compresslevel=6)
+    return corpo
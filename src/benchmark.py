@@ -0,0 +1,184 @@
+"""Benchmark por estágio sobre dados sintéticos (src/sintetico.py).
+
+Mede tempo (melhor de ``--repeticoes``) e pico de memória alocada (tracemalloc)
+de cada estágio do caminho crítico:
+
+    melt        planilha wide -> formato longo (para_formato_longo)
+    normalizar  datas em lote e união dos episódios do painel (normalizar_painel)
+    painel      marcação NO_PAINEL pela junção de intervalos (marcar_presenca_no_painel)
+    transicoes  esquema compacto + matriz + cubo (o que alimenta o Sankey)
+    figura      figura do Sankey serializada, como no update_graph
+    graficos    contagens e cobertura por categoria x trimestre dos scripts de análise
+
+O resultado vai para ``PASTA_BENCHMARKS/<commit>.json``. Com ``--base`` o
+resultado é comparado a um JSON anterior e qualquer estágio acima dos limites
+(razão de tempo ou de memória) é apontado como regressão, com código de saída 1.
+A base é lida antes da medição; se o resultado fosse gravado por cima dela (mesmo
+commit, ou fora do git), ele ganha um nome com data e hora.
+
+    python -m src.benchmark --medicos 100000 --trimestres 20
+    python -m src.benchmark --base benchmarks/abc1234.json --limite-tempo 1.2
+
+``--partida`` mede também a importação a frio do dash (processo novo, sem dados
+abertos) e acusa regressão se passar de ``LIMITE_PARTIDA`` segundos.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+PASTA_BENCHMARKS = os.environ.get("JORNADA_BENCHMARKS", "benchmarks")
+HOJE = pd.Timestamp("2025-01-01")  # data fixa: episódios em aberto fecham sempre no mesmo dia
+LIMITE_PARTIDA = 1.0  # segundos para importar o dash a frio
+
+
+def medir(funcao, repeticoes=3):
+    """(resultado, melhor tempo em s, pico de memória em MB)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    try:
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return resultado, min(tempos), pico / 2**20
+
+
+def estagios(mercado, painel):
+    """Estágios encadeados: cada um recebe a saída do anterior."""
+    from src.esquema import codificar_jornada
+    from src.figura_sankey import ConstrutorSankey
+    from src.jornada_mercado_327 import para_formato_longo
+    from src.matriz_jornada import MatrizJornada
+    from src.painel import normalizar_painel
+    from src.tabelona_cat_trim_inclusao import marcar_presenca_no_painel
+    from src.transicoes import construir_cubo
+
+    yield "melt", lambda: para_formato_longo(mercado)
+    longo = para_formato_longo(mercado)
+    longo["TRIMESTRE"] = longo["TRIMESTRE"].dt.to_period("Q").astype(str)
+
+    yield "normalizar", lambda: normalizar_painel(painel)
+    painel, _ = normalizar_painel(painel)
+
+    yield "painel", lambda: marcar_presenca_no_painel(longo, painel, hoje=HOJE)
+    jornada = marcar_presenca_no_painel(longo, painel, hoje=HOJE)
+
+    yield "transicoes", lambda: construir_cubo(MatrizJornada.de_tabela(codificar_jornada(jornada)))
+    matriz = MatrizJornada.de_tabela(codificar_jornada(jornada))
+    sankey = ConstrutorSankey(construir_cubo(matriz))
+
+    yield "figura", lambda: sankey.figura("mercado", sankey.categorias).to_json()
+    yield "graficos", lambda: (matriz.contagens(), matriz.contagens(universo="painel"), matriz.cobertura())
+
+
+def executar(medicos, trimestres, semente=0, repeticoes=3, anomalias=None):
+    from src.sintetico import TAXA_ANOMALIAS, gerar_mercado, gerar_painel
+
+    anomalias = TAXA_ANOMALIAS if anomalias is None else anomalias
+    mercado = gerar_mercado(medicos, trimestres, semente)
+    painel = gerar_painel(mercado, semente, anomalias=anomalias)
+    resultados = {}
+    for nome, funcao in estagios(mercado, painel):
+        _, tempo, pico = medir(funcao, repeticoes)
+        resultados[nome] = {"tempo_s": round(tempo, 4), "pico_mb": round(pico, 2)}
+        print(f" [{nome:<10}] {tempo:8.3f}s  {pico:9.1f} MB")
+    return {
+        "commit": _commit(),
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "escala": {"medicos": medicos, "trimestres": trimestres, "semente": semente, "anomalias": anomalias,
+                   "episodios": len(painel)},
+        "estagios": resultados,
+    }
+
+
+def medir_partida(repeticoes=3):
+    """Melhor tempo (s) de ``import migracao_medica_dash`` num interpretador novo."""
+    codigo = "import time; t = time.perf_counter(); import migracao_medica_dash; print(time.perf_counter() - t)"
+    tempos = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                               env={**os.environ, "JORNADA_PRECARREGAR": "0"})
+        tempos.append(float(saida.stdout.strip().splitlines()[-1]))
+    return min(tempos)
+
+
+def comparar(atual, base, limite_tempo=1.25, limite_memoria=1.25):
+    """Lista de regressões (estágio, métrica, razão) entre dois resultados da mesma escala."""
+    if atual["escala"] != base["escala"]:
+        raise ValueError(f"Escalas diferentes: {atual['escala']} x {base['escala']}")
+    regressoes = []
+    for nome, medidas in atual["estagios"].items():
+        anterior = base["estagios"].get(nome)
+        if anterior is None:
+            continue
+        for metrica, limite in (("tempo_s", limite_tempo), ("pico_mb", limite_memoria)):
+            if anterior[metrica] > 0 and medidas[metrica] / anterior[metrica] > limite:
+                regressoes.append((nome, metrica, medidas[metrica] / anterior[metrica]))
+    return regressoes
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede tempo e memória de cada estágio com dados sintéticos.")
+    parser.add_argument("--medicos", type=int, default=100000)
+    parser.add_argument("--trimestres", type=int, default=12)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--base", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--limite-tempo", type=float, default=1.25, help="razão máxima de tempo antes de acusar regressão")
+    parser.add_argument("--limite-memoria", type=float, default=1.25, help="razão máxima de memória antes de acusar regressão")
+    parser.add_argument("--partida", action="store_true", help="mede também a importação a frio do dash")
+    parser.add_argument("--anomalias", type=float, help="fração de episódios do painel com defeito")
+    args = parser.parse_args()
+
+    base = None
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+
+    resultado = executar(args.medicos, args.trimestres, args.semente, args.repeticoes, args.anomalias)
+    lenta = False
+    if args.partida:
+        partida = medir_partida(args.repeticoes)
+        resultado["partida_s"] = round(partida, 4)
+        lenta = partida > LIMITE_PARTIDA
+        print(f" [{'partida':<10}] {partida:8.3f}s{'  ACIMA DO LIMITE de %.1fs' % LIMITE_PARTIDA if lenta else ''}")
+    os.makedirs(PASTA_BENCHMARKS, exist_ok=True)
+    caminho = os.path.join(PASTA_BENCHMARKS, f"{resultado['commit']}.json")
+    if args.base and os.path.abspath(caminho) == os.path.abspath(args.base):
+        # Não sobrescreve a base com a própria medição
+        caminho = os.path.join(PASTA_BENCHMARKS, f"{resultado['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f" Resultado gravado em '{caminho}'.")
+
+    if base is not None:
+        regressoes = comparar(resultado, base, args.limite_tempo, args.limite_memoria)
+        for nome, metrica, razao in regressoes:
+            print(f" REGRESSÃO [{nome}] {metrica}: {razao:.2f}x em relação a {base['commit']}")
+        if regressoes:
+            raise SystemExit(1)
+        print(f" Sem regressões em relação a {base['commit']}.")
+    if lenta:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Cache limitado de figuras serializadas (JSON) para os callbacks do dash.
+
+O espaço de estados dos controles é pequeno (universo x subconjunto de categorias
+x foco), então a mesma figura é pedida muitas vezes. A chave é o estado
+normalizado: ``(universo, tupla ordenada de categorias, foco)``.
+
+Configuração por variáveis de ambiente:
+
+    JORNADA_CACHE_FIGURAS   número máximo de figuras (padrão 256; 0 desliga)
+    JORNADA_CACHE_POLITICA  'lru' (padrão) ou 'fifo'
+    JORNADA_CACHE_AQUECER   '1' para pré-gerar os estados mais comuns na subida
+"""
+import os
+import threading
+from collections import OrderedDict
+
+POLITICAS = ('lru', 'fifo')
+
+
+class CacheFiguras:
+    def __init__(self, tamanho=256, politica='lru'):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de cache inválida: {politica!r} (use {', '.join(POLITICAS)})")
+        self.tamanho = tamanho
+        self.politica = politica
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+
+    @classmethod
+    def do_ambiente(cls):
+        return cls(tamanho=int(os.environ.get('JORNADA_CACHE_FIGURAS', 256)),
+                   politica=os.environ.get('JORNADA_CACHE_POLITICA', 'lru'))
+
+    @staticmethod
+    def chave(*partes):
+        """Normaliza o estado: listas viram tuplas ordenadas e sem repetição."""
+        normalizada = []
+        for parte in partes:
+            if isinstance(parte, (list, tuple, set)):
+                parte = tuple(sorted(set(parte)))
+            normalizada.append(parte)
+        return tuple(normalizada)
+
+    def obter(self, chave, gerar):
+        """Devolve o JSON em cache para ``chave`` ou chama ``gerar()`` e guarda o resultado."""
+        with self._trava:
+            if chave in self._itens:
+                self.acertos += 1
+                if self.politica == 'lru':
+                    self._itens.move_to_end(chave)
+                return self._itens[chave]
+            self.falhas += 1
+
+        valor = gerar()
+        if self.tamanho <= 0:
+            return valor
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+                self.descartes += 1
+        return valor
+
+    def aquecer(self, chaves, gerar):
+        """Pré-gera as figuras das chaves informadas (``gerar(*chave)``)."""
+        for chave in chaves:
+            self.obter(chave, lambda chave=chave: gerar(*chave))
+
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            'itens': len(self._itens), 'tamanho': self.tamanho, 'politica': self.politica,
+            'acertos': self.acertos, 'falhas': self.falhas, 'descartes': self.descartes,
+            'taxa_acerto': self.acertos / total if total else 0.0,
+        }
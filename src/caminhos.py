@@ -0,0 +1,125 @@
+"""Análise de caminhos: a sequência de categorias de cada médico numa janela de trimestres.
+
+O Sankey só mostra pares de trimestres vizinhos. Aqui cada médico vira uma única
+chave inteira com a sua sequência completa na janela, em base ``n_categorias + 1``
+(o dígito 0 é "fora do mercado" e a categoria ``c`` é o dígito ``c + 1``), com o
+primeiro trimestre no dígito mais significativo. Assim:
+
+    - caminhos distintos e suas contagens saem de um ``np.unique`` sobre as chaves;
+    - um prefixo (ex.: começou na Cat. 4 em 2023Q3 e foi para a 3) é uma divisão
+      inteira da chave por ``base ** (largura - len(prefixo))``.
+
+Com 250 mil médicos e 20 trimestres tudo isso roda em dezenas de milissegundos.
+
+    caminhos = AnaliseCaminhos(matriz, '2023Q3', '2024Q2', universo='painel')
+    caminhos.top(10, prefixo=['4'])
+"""
+import numpy as np
+
+from src.matriz_jornada import AUSENTE
+
+SEPARADOR = ' → '
+ROTULO_AUSENTE = '—'
+UNIVERSOS = ('mercado', 'painel')
+
+
+class AnaliseCaminhos:
+    """Caminhos dos médicos da matriz na janela [inicio, fim].
+
+    ``universo='painel'`` restringe aos médicos no painel em todos os trimestres da
+    janela; ``completos=True`` descarta quem ficou fora do mercado em algum trimestre.
+    """
+
+    def __init__(self, matriz, inicio=None, fim=None, universo='mercado', completos=False, selecao=None):
+        if universo not in UNIVERSOS:
+            raise ValueError(f"Universo inválido: {universo!r} (use {', '.join(UNIVERSOS)})")
+        j = matriz.janela(inicio, fim)
+        self.categorias = matriz.categorias
+        self.trimestres = matriz.trimestres[j]
+        self.largura = j.stop - j.start
+        self.base = len(self.categorias) + 1
+        if self.base ** self.largura > np.iinfo(np.int64).max:
+            raise ValueError(f"Janela longa demais para chaves de 64 bits: {self.largura} trimestres "
+                             f"com {len(self.categorias)} categorias")
+
+        bloco = matriz.categoria[:, j]
+        mascara = (bloco != AUSENTE).any(axis=1)
+        if completos:
+            mascara &= (bloco != AUSENTE).all(axis=1)
+        if universo == 'painel':
+            mascara &= matriz.sempre_no_painel(inicio, fim)
+        if selecao is not None:
+            mascara &= selecao
+        self.medicos = np.flatnonzero(mascara)
+
+        # Dígitos: 0 = ausente, categoria c = c + 1; chave = polinômio em ``base``
+        digitos = bloco[self.medicos].astype(np.int64) + 1
+        pesos = self.base ** np.arange(self.largura - 1, -1, -1, dtype=np.int64)
+        self.chaves = digitos @ pesos
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def chave_prefixo(self, prefixo):
+        """Chave parcial dos primeiros ``len(prefixo)`` trimestres (categorias ou None = ausente)."""
+        if len(prefixo) > self.largura:
+            raise ValueError(f"Prefixo com {len(prefixo)} trimestres numa janela de {self.largura}")
+        chave = 0
+        for categoria in prefixo:
+            if categoria is None:
+                digito = 0
+            elif categoria in self.categorias:
+                digito = self.categorias.index(categoria) + 1
+            else:
+                raise KeyError(f"Categoria desconhecida: {categoria!r}")
+            chave = chave * self.base + digito
+        return chave
+
+    def mascara_prefixo(self, prefixo):
+        """Médicos (na ordem de ``self.medicos``) cujo caminho começa com ``prefixo``."""
+        if not prefixo:
+            return np.ones(len(self.chaves), dtype=bool)
+        divisor = self.base ** (self.largura - len(prefixo))
+        return self.chaves // divisor == self.chave_prefixo(prefixo)
+
+    def contar(self, prefixo=None):
+        """(chaves distintas, contagens), em ordem decrescente de contagem."""
+        chaves = self.chaves if not prefixo else self.chaves[self.mascara_prefixo(prefixo)]
+        unicas, contagens = np.unique(chaves, return_counts=True)
+        ordem = np.argsort(-contagens, kind='stable')
+        return unicas[ordem], contagens[ordem]
+
+    def decodificar(self, chave):
+        """Chave -> lista de categorias por trimestre (None = fora do mercado)."""
+        caminho = []
+        for _ in range(self.largura):
+            chave, digito = divmod(int(chave), self.base)
+            caminho.append(self.categorias[digito - 1] if digito else None)
+        return caminho[::-1]
+
+    def rotulo(self, chave):
+        return SEPARADOR.join(ROTULO_AUSENTE if c is None else c for c in self.decodificar(chave))
+
+    def top(self, k=10, prefixo=None):
+        """As ``k`` jornadas mais frequentes: lista de (caminho, médicos)."""
+        unicas, contagens = self.contar(prefixo)
+        return [(self.decodificar(c), int(n)) for c, n in zip(unicas[:k].tolist(), contagens[:k].tolist())]
+
+    def crms(self, crms, prefixo=None):
+        """CRMs dos médicos selecionados (``crms`` é o dicionário da matriz)."""
+        medicos = self.medicos if not prefixo else self.medicos[self.mascara_prefixo(prefixo)]
+        return np.asarray(crms)[medicos]
+
+
+def ler_prefixo(texto):
+    """'4 > 3 > -' -> ['4', '3', None]. Aceita '>', '→' ou ',' como separador."""
+    if not texto or not texto.strip():
+        return []
+    partes = texto.replace('→', '>').replace(',', '>').split('>')
+    prefixo = []
+    for parte in partes:
+        parte = parte.strip()
+        if parte.lower().startswith('cat.'):
+            parte = parte[4:].strip()
+        prefixo.append(None if parte in ('', '-', ROTULO_AUSENTE) else parte.upper() if parte.lower() == 'sem cat' else parte)
+    return prefixo
@@ -0,0 +1,238 @@
+"""Leitura compartilhada das planilhas com cache colunar em disco.
+
+Cada planilha lida por ``ler_planilha`` é convertida uma única vez para Parquet
+em ``PASTA_CACHE``. A chave do cache combina caminho, mtime, tamanho e os
+argumentos de leitura, então qualquer alteração no arquivo gera uma nova leitura
+do XLSX. As leituras seguintes vêm direto do Parquet, sem passar pelo openpyxl.
+
+``salvar_planilha`` já deixa no cache a tabela como o ``read_excel`` a leria de
+volta, e ``copiar_planilha``/``mover_planilha`` levam a entrada junto com o
+arquivo (a chave inclui o caminho), então nada disso obriga a reler o XLSX.
+
+Uso pela linha de comando (a partir da raiz do projeto):
+
+    python -m src.carregador --invalidar              # apaga todo o cache
+    python -m src.carregador --reconstruir a.xlsx ... # força nova leitura
+"""
+import argparse
+import glob
+import hashlib
+import json
+import math
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Absoluta: quem troca de pasta corrente (ex.: o executor de src/tarefas.py) usa o mesmo cache
+PASTA_CACHE = os.path.abspath(os.environ.get("JORNADA_CACHE_DIR", ".cache_planilhas"))
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+
+def _prefixo(caminho):
+    return hashlib.sha1(os.path.abspath(caminho).encode("utf-8")).hexdigest()[:16]
+
+
+def _chave(caminho, kwargs):
+    info = os.stat(caminho)
+    assinatura = json.dumps(
+        [os.path.abspath(caminho), info.st_mtime_ns, info.st_size, kwargs],
+        sort_keys=True, default=str,
+    )
+    return f"{_prefixo(caminho)}_{hashlib.sha1(assinatura.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _gravar_cache(df, chave, caminho):
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    # Remove versões antigas do mesmo arquivo antes de gravar a nova
+    for antigo in glob.glob(os.path.join(PASTA_CACHE, f"{_prefixo(caminho)}_*")):
+        os.remove(antigo)
+    destino = os.path.join(PASTA_CACHE, chave)
+    temporario = destino + ".tmp"
+    if PARQUET_DISPONIVEL:
+        try:
+            df.to_parquet(temporario, index=False)
+            os.replace(temporario, destino + ".parquet")
+            return
+        except Exception:
+            # Colunas com tipos misturados não viram Arrow; cai para pickle
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    with open(temporario, "wb") as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, destino + ".pkl")
+
+
+def _caminho_cache(chave):
+    base = os.path.join(PASTA_CACHE, chave)
+    for extensao in ((".parquet", ".pkl") if PARQUET_DISPONIVEL else (".pkl",)):
+        if os.path.exists(base + extensao):
+            return base + extensao
+    return None
+
+
+def _ler_cache(chave):
+    arquivo = _caminho_cache(chave)
+    if arquivo is None:
+        return None
+    if arquivo.endswith(".parquet"):
+        return pd.read_parquet(arquivo)
+    with open(arquivo, "rb") as f:
+        return pickle.load(f)
+
+
+def ler_planilha(caminho, **kwargs):
+    """Equivalente a ``pd.read_excel(caminho, **kwargs)`` servido pelo cache."""
+    chave = _chave(caminho, kwargs)
+    df = _ler_cache(chave)
+    if df is None:
+        df = pd.read_excel(caminho, **kwargs)
+        _gravar_cache(df, chave, caminho)
+    return df
+
+
+def linhas_em_blocos(caminho, tamanho_bloco=20000):
+    """``(cabeçalho, linhas)`` da planilha, até ``tamanho_bloco`` linhas por vez.
+
+    Usa o openpyxl em modo somente leitura, então só um bloco fica em memória.
+    Uma planilha só com o cabeçalho rende um único bloco vazio.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = wb.active
+        cabecalho = list(next(planilha.iter_rows(max_row=1, values_only=True), ()))
+        # Sem max_col, planilhas sem dimensão gravada (ex.: as do modo write-only,
+        # como as do salvar_planilha) devolvem linhas curtas quando o fim está vazio
+        linhas = planilha.iter_rows(min_row=2, max_col=len(cabecalho), values_only=True)
+        bloco, emitiu = [], False
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) >= tamanho_bloco:
+                yield cabecalho, bloco
+                bloco, emitiu = [], True
+        if bloco or not emitiu:
+            yield cabecalho, bloco
+    finally:
+        wb.close()
+
+
+def ler_planilha_em_blocos(caminho, tamanho_bloco=20000):
+    """DataFrames de até ``tamanho_bloco`` linhas, sem o cache (``linhas_em_blocos``)."""
+    for cabecalho, linhas in linhas_em_blocos(caminho, tamanho_bloco):
+        yield pd.DataFrame(linhas, columns=cabecalho)
+
+
+def _celula(valor):
+    # Mesma conversão do leitor openpyxl do pandas: vazio vira "" e número inteiro vira int
+    if valor is None or valor is pd.NaT or (isinstance(valor, float) and math.isnan(valor)):
+        return ""
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, float, np.integer, np.floating)):
+        return int(valor) if math.isfinite(valor) and int(valor) == valor else float(valor)
+    if isinstance(valor, pd.Timestamp):
+        return valor.to_pydatetime()
+    return valor
+
+
+def _como_lido(df):
+    """A tabela como ``pd.read_excel`` a devolveria depois de gravada em XLSX.
+
+    As células passam pela mesma conversão e pelo mesmo ``TextParser`` da leitura,
+    então os tipos do cache são os de uma leitura a frio (ex.: coluna com vazios
+    vira float, 'Int64' vira int64/float64, texto misto continua object).
+    """
+    from pandas.io.parsers import TextParser
+
+    linhas = [[_celula(v) for v in linha] for linha in df.astype(object).itertuples(index=False, name=None)]
+    while linhas and all(c == "" for c in linhas[-1]):
+        linhas.pop()  # o leitor descarta as linhas vazias do fim
+    return TextParser([list(df.columns), *linhas], header=0).read()
+
+
+def salvar_planilha(df, caminho, extras=()):
+    """Exporta para XLSX e já deixa o cache pronto para a próxima leitura.
+
+    A gravação é em blocos (src/saidas.py); ``extras`` são outros destinos
+    (.parquet, .csv.gz) preenchidos na mesma passada.
+    """
+    from src.saidas import em_blocos, exportar
+
+    exportar(em_blocos(df), [caminho, *extras])
+    _gravar_cache(_como_lido(df), _chave(caminho, {}), caminho)
+
+
+def _instalar_cache(arquivo, destino, mover=False):
+    # A entrada ``arquivo`` do cache passa a valer para ``destino`` (que já está no lugar)
+    for antigo in glob.glob(os.path.join(PASTA_CACHE, f"{_prefixo(destino)}_*")):
+        os.remove(antigo)
+    novo = os.path.join(PASTA_CACHE, _chave(destino, {})) + os.path.splitext(arquivo)[1]
+    if mover:
+        os.replace(arquivo, novo)
+    else:
+        shutil.copyfile(arquivo, novo + ".tmp")
+        os.replace(novo + ".tmp", novo)
+
+
+def copiar_planilha(origem, destino):
+    """Cópia atômica de uma planilha que leva junto a entrada do cache da origem."""
+    temporario = destino + ".tmp"
+    shutil.copyfile(origem, temporario)
+    os.replace(temporario, destino)
+    arquivo = _caminho_cache(_chave(origem, {}))
+    if arquivo is not None:
+        _instalar_cache(arquivo, destino)
+
+
+def mover_planilha(origem, destino):
+    """``os.replace`` de uma planilha, com a entrada do cache indo junto."""
+    arquivo = _caminho_cache(_chave(origem, {}))
+    os.replace(origem, destino)
+    if arquivo is not None:
+        _instalar_cache(arquivo, destino, mover=True)
+
+
+def invalidar_cache(caminhos=None):
+    """Apaga o cache inteiro ou apenas as entradas dos arquivos informados."""
+    if caminhos:
+        padroes = [os.path.join(PASTA_CACHE, f"{_prefixo(c)}_*") for c in caminhos]
+    else:
+        padroes = [os.path.join(PASTA_CACHE, "*")]
+    removidos = 0
+    for padrao in padroes:
+        for arquivo in glob.glob(padrao):
+            os.remove(arquivo)
+            removidos += 1
+    return removidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o cache colunar das planilhas.")
+    parser.add_argument("--invalidar", nargs="*", metavar="ARQUIVO",
+                        help="apaga o cache (todo, ou só dos arquivos informados)")
+    parser.add_argument("--reconstruir", nargs="+", metavar="ARQUIVO",
+                        help="relê os arquivos informados e regrava o cache")
+    args = parser.parse_args()
+
+    if args.invalidar is None and not args.reconstruir:
+        parser.print_help()
+        return
+    if args.invalidar is not None:
+        print(f" {invalidar_cache(args.invalidar)} arquivo(s) de cache removido(s).")
+    for caminho in args.reconstruir or []:
+        invalidar_cache([caminho])
+        df = ler_planilha(caminho)
+        print(f" Cache reconstruído para '{caminho}' ({len(df)} linhas).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Cubo de cobertura do painel: categoria x trimestre, calculado numa única passada.
+
+Para cada (categoria, trimestre) guarda:
+
+    linhas          linhas da tabela longa (médico-trimestre)
+    linhas_painel   dessas, quantas com NO_PAINEL
+    medicos         médicos distintos
+    medicos_painel  médicos distintos no painel
+
+e o percentual de cobertura (``linhas_painel / linhas``). Tudo sai de ``bincount``
+sobre uma chave inteira ``categoria * n_trimestres + trimestre`` da tabela
+codificada (src/esquema.py); os distintos vêm de um ``np.unique`` sobre a chave
+combinada com o CRM. É a base dos gráficos de ``analise/`` e da aba de cobertura
+do dash.
+
+Com a UF dos médicos, o cubo guarda também as fatias por estado
+(``linhas_uf``/``linhas_painel_uf``, [uf, categoria, trimestre]); ``recorte_uf``
+soma as fatias escolhidas em um novo cubo.
+
+O estágio ``cobertura`` do pipeline grava o cubo em ``CAMINHO_COBERTURA``; o
+estágio ``artefato`` o publica junto com a matriz (``arrays``/``de_artefato``), de
+onde o dash o abre mapeado, e os scripts de ``analise/`` o leem com
+``da_planilha`` em vez de recalcular a partir do XLSX.
+"""
+import os
+
+import numpy as np
+
+CAMINHO_COBERTURA = 'cobertura_cubo.npz'
+CAMPOS = ('linhas', 'linhas_painel', 'medicos', 'medicos_painel')
+CAMPOS_UF = ('linhas_uf', 'linhas_painel_uf')
+PLANILHA_JORNADA = 'jornada_medicos_trimestral.xlsx'
+
+
+class CuboCobertura:
+    def __init__(self, linhas, linhas_painel, medicos, medicos_painel, trimestres, categorias,
+                 linhas_uf=None, linhas_painel_uf=None, ufs=None):
+        self.linhas = linhas
+        self.linhas_painel = linhas_painel
+        self.medicos = medicos
+        self.medicos_painel = medicos_painel
+        self.trimestres = list(trimestres)
+        self.categorias = list(categorias)
+        self.linhas_uf = linhas_uf
+        self.linhas_painel_uf = linhas_painel_uf
+        self.ufs = list(ufs) if ufs is not None else None
+
+    @property
+    def percentual(self):
+        return np.divide(self.linhas_painel * 100, self.linhas, out=np.zeros(self.linhas.shape), where=self.linhas > 0)
+
+    @classmethod
+    def de_tabela(cls, tabela):
+        """Monta o cubo a partir da ``TabelaJornada``, com as categorias na ordem de exibição."""
+        from src.esquema import ordem_exibicao
+
+        n_tri, n_crm = len(tabela.trimestres), max(len(tabela.crms), 1)
+        presentes = np.zeros(len(tabela.categorias), dtype=bool)
+        presentes[tabela.categoria] = True
+        ordem = [i for i in ordem_exibicao(tabela.categorias) if presentes[i]]
+        posicao = np.full(len(tabela.categorias), -1, dtype=np.int64)
+        posicao[ordem] = np.arange(len(ordem))
+        n_cat = len(ordem)
+        tamanho = n_cat * n_tri
+
+        chave = posicao[tabela.categoria] * n_tri + tabela.trimestre
+        linhas = np.bincount(chave, minlength=tamanho)
+        linhas_painel = np.bincount(chave[tabela.no_painel], minlength=tamanho)
+
+        # Distintos: cada (célula, CRM) conta uma vez
+        distintos = np.unique(chave * n_crm + tabela.crm)
+        medicos = np.bincount(distintos // n_crm, minlength=tamanho)
+        distintos_painel = np.unique(chave[tabela.no_painel] * n_crm + tabela.crm[tabela.no_painel])
+        medicos_painel = np.bincount(distintos_painel // n_crm, minlength=tamanho)
+
+        forma = (n_cat, n_tri)
+        por_uf = {}
+        if tabela.uf is not None:
+            # Fatias por estado na mesma chave, com a UF do CRM como eixo inicial
+            n_uf = len(tabela.ufs)
+            chave_uf = tabela.uf[tabela.crm].astype(np.int64) * tamanho + chave
+            por_uf = {
+                'linhas_uf': np.bincount(chave_uf, minlength=n_uf * tamanho).reshape(n_uf, *forma),
+                'linhas_painel_uf': np.bincount(chave_uf[tabela.no_painel], minlength=n_uf * tamanho).reshape(n_uf, *forma),
+                'ufs': tabela.ufs,
+            }
+        return cls(linhas.reshape(forma), linhas_painel.reshape(forma), medicos.reshape(forma),
+                   medicos_painel.reshape(forma), tabela.trimestres, [tabela.categorias[i] for i in ordem], **por_uf)
+
+    @classmethod
+    def de_matriz(cls, matriz):
+        """Na matriz cada médico ocupa uma célula por trimestre: linhas e distintos coincidem."""
+        if matriz.uf is None:
+            mercado = matriz.contagens(universo='mercado')
+            painel = matriz.contagens(universo='painel')
+            return cls(mercado, painel, mercado, painel, matriz.trimestres, matriz.categorias)
+        mercado_uf = matriz.contagens(universo='mercado', por_uf=True)
+        painel_uf = matriz.contagens(universo='painel', por_uf=True)
+        mercado, painel = mercado_uf.sum(axis=0), painel_uf.sum(axis=0)
+        return cls(mercado, painel, mercado, painel, matriz.trimestres, matriz.categorias,
+                   mercado_uf, painel_uf, matriz.ufs)
+
+    def recorte_uf(self, ufs):
+        """Cubo só com os médicos das UFs pedidas (soma das fatias); vazio devolve o próprio cubo."""
+        if not ufs:
+            return self
+        if self.linhas_uf is None:
+            raise ValueError("O cubo de cobertura não traz a dimensão de UF")
+        codigos = [self.ufs.index(uf) for uf in ufs if uf in self.ufs]
+        mercado, painel = self.linhas_uf[codigos].sum(axis=0), self.linhas_painel_uf[codigos].sum(axis=0)
+        return CuboCobertura(mercado, painel, mercado, painel, self.trimestres, self.categorias)
+
+    def serie(self, categoria):
+        """Arrays por trimestre de uma categoria: {campo: array} mais 'percentual'."""
+        i = self.categorias.index(categoria)
+        return {**{campo: getattr(self, campo)[i] for campo in CAMPOS}, 'percentual': self.percentual[i]}
+
+    def _campos(self):
+        campos = {campo: getattr(self, campo) for campo in CAMPOS}
+        if self.linhas_uf is not None:
+            campos.update({campo: getattr(self, campo) for campo in CAMPOS_UF})
+        return campos
+
+    def salvar(self, caminho=CAMINHO_COBERTURA):
+        temporario = caminho + '.tmp.npz'
+        extras = {'ufs': np.array(self.ufs, dtype=str)} if self.linhas_uf is not None else {}
+        np.savez(temporario, **self._campos(), **extras,
+                 trimestres=np.array(self.trimestres, dtype=str), categorias=np.array(self.categorias, dtype=str))
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_COBERTURA):
+        with np.load(caminho) as dados:
+            por_uf = {campo: dados[campo] for campo in CAMPOS_UF if campo in dados.files}
+            if por_uf:
+                por_uf['ufs'] = dados['ufs'].tolist()
+            return cls(*(dados[campo] for campo in CAMPOS), dados['trimestres'].tolist(), dados['categorias'].tolist(),
+                       **por_uf)
+
+    @classmethod
+    def da_planilha(cls, planilha=PLANILHA_JORNADA, caminho=CAMINHO_COBERTURA):
+        """Cubo gravado pelo pipeline; recalculado (e regravado) se faltar ou for mais velho que a planilha."""
+        if os.path.exists(caminho) and (not os.path.exists(planilha)
+                                        or os.path.getmtime(caminho) >= os.path.getmtime(planilha)):
+            return cls.carregar(caminho)
+        from src.carregador import ler_planilha
+        from src.esquema import codificar_jornada
+
+        cubo = cls.de_tabela(codificar_jornada(ler_planilha(planilha)))
+        cubo.salvar(caminho)
+        return cubo
+
+    # --- Artefato compartilhado (src/dados_compartilhados.py) ---
+
+    def arrays(self):
+        return {f'cob_{campo}': valores for campo, valores in self._campos().items()}
+
+    def meta(self):
+        return {'cobertura_categorias': self.categorias}
+
+    @classmethod
+    def de_artefato(cls, arrays, meta):
+        """Cubo publicado junto com a matriz (mesmos trimestres e UFs)."""
+        por_uf = {campo: arrays[f'cob_{campo}'] for campo in CAMPOS_UF if f'cob_{campo}' in arrays}
+        if por_uf:
+            por_uf['ufs'] = meta.get('ufs')
+        return cls(*(arrays[f'cob_{campo}'] for campo in CAMPOS), meta['trimestres'], meta['cobertura_categorias'],
+                   **por_uf)
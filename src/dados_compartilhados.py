@@ -0,0 +1,231 @@
+"""Artefato de dados versionado, mapeado em memória e compartilhado entre workers.
+
+O pipeline publica os arrays preparados em ``artefatos/<versao>/`` (arquivos .npy +
+meta.json) e aponta ``artefatos/ATUAL`` para a nova versão com um ``os.replace``
+atômico. Cada worker do gunicorn abre os .npy com ``mmap_mode='r'``: as páginas
+vêm do cache do sistema operacional e são as mesmas para todos os processos, então
+subir mais workers não multiplica o uso de memória.
+
+``RepositorioDados.atual()`` confere o ponteiro no máximo uma vez por intervalo e
+troca de versão sem reiniciar o servidor. A troca é uma única atribuição de um
+objeto imutável, então uma requisição nunca mistura duas versões.
+
+Para a subida ser rápida nada é carregado na importação: ``meta_atual()`` lê só o
+meta.json da versão (categorias, trimestres, UFs), suficiente para montar o
+layout, e os arrays vêm na primeira requisição que precisar deles ou numa carga
+em segundo plano (``carregar_em_segundo_plano``). Sem versão publicada,
+``meta_atual()`` devolve None em vez de preparar os dados ali mesmo. ``estado()`` informa em que pé
+está a carga, para as rotas de prontidão.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+PASTA_ARTEFATOS = os.environ.get("JORNADA_ARTEFATOS", "artefatos")
+ARQUIVO_PONTEIRO = "ATUAL"
+VERSOES_MANTIDAS = 3
+
+
+def _versao(arrays, meta):
+    h = hashlib.sha256(json.dumps(meta, sort_keys=True).encode("utf-8"))
+    for nome in sorted(arrays):
+        h.update(nome.encode("utf-8"))
+        h.update(np.ascontiguousarray(arrays[nome]).tobytes())
+    return h.hexdigest()[:16]
+
+
+def publicar_artefato(arrays, meta, pasta=PASTA_ARTEFATOS):
+    """Grava uma nova versão e move o ponteiro para ela. Devolve o id da versão."""
+    versao = _versao(arrays, meta)
+    destino = os.path.join(pasta, versao)
+    if not os.path.exists(os.path.join(destino, "meta.json")):
+        temporario = f"{destino}.tmp{os.getpid()}"
+        os.makedirs(temporario, exist_ok=True)
+        for nome, array in arrays.items():
+            np.save(os.path.join(temporario, f"{nome}.npy"), np.ascontiguousarray(array))
+        with open(os.path.join(temporario, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "arrays": sorted(arrays), "versao": versao}, f, ensure_ascii=False)
+        try:
+            os.rename(temporario, destino)
+        except OSError:
+            # Outro processo publicou a mesma versão ao mesmo tempo
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    ponteiro = os.path.join(pasta, ARQUIVO_PONTEIRO)
+    with open(ponteiro + f".tmp{os.getpid()}", "w", encoding="utf-8") as f:
+        f.write(versao)
+    os.replace(ponteiro + f".tmp{os.getpid()}", ponteiro)
+    _limpar_versoes_antigas(pasta, versao)
+    return versao
+
+
+def _limpar_versoes_antigas(pasta, atual):
+    # Workers que ainda mapeiam uma versão apagada continuam lendo normalmente (POSIX)
+    versoes = [d for d in os.listdir(pasta)
+               if os.path.isfile(os.path.join(pasta, d, "meta.json")) and d != atual]
+    versoes.sort(key=lambda d: os.path.getmtime(os.path.join(pasta, d)), reverse=True)
+    for antiga in versoes[VERSOES_MANTIDAS - 1:]:
+        shutil.rmtree(os.path.join(pasta, antiga), ignore_errors=True)
+
+
+def versao_atual(pasta=PASTA_ARTEFATOS):
+    try:
+        with open(os.path.join(pasta, ARQUIVO_PONTEIRO), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def ler_meta(versao, pasta=PASTA_ARTEFATOS):
+    with open(os.path.join(pasta, versao, "meta.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_artefato(versao, pasta=PASTA_ARTEFATOS):
+    """Abre uma versão: ``(arrays mapeados somente-leitura, meta)``."""
+    base = os.path.join(pasta, versao)
+    meta = ler_meta(versao, pasta)
+    arrays = {nome: np.load(os.path.join(base, f"{nome}.npy"), mmap_mode="r") for nome in meta["arrays"]}
+    return arrays, meta
+
+
+def publicar_matriz(matriz, episodios=None, pasta=PASTA_ARTEFATOS, cobertura=None):
+    """Publica a matriz da jornada (src/matriz_jornada.py), de onde o dash deriva tudo.
+
+    ``episodios`` são os arrays de ``indexar_episodios`` (src/indice_medicos.py); o
+    índice ordenado de CRMs e o cubo de transições (src/transicoes.py) vão junto,
+    para a consulta por médico e o Sankey não montarem nada por worker.
+    ``cobertura`` é o cubo gravado pelo pipeline (src/cobertura.py); sem ele, o
+    dash calcula a cobertura a partir da matriz.
+    """
+    from src.indice_medicos import indexar_crms
+    from src.transicoes import construir_cubo
+
+    crms = indexar_crms(matriz.crms) if matriz.crms is not None else {}
+    arrays = {**matriz.arrays(), **crms, **construir_cubo(matriz).arrays(), **(episodios or {})}
+    meta = matriz.meta()
+    if cobertura is not None:
+        if cobertura.trimestres != matriz.trimestres:
+            raise ValueError("O cubo de cobertura não corresponde aos trimestres da matriz")
+        arrays.update(cobertura.arrays())
+        meta.update(cobertura.meta())
+    return publicar_artefato(arrays, meta, pasta)
+
+
+class RepositorioDados:
+    """Mantém a versão de dados em uso por este processo e troca quando o ponteiro muda.
+
+    ``montar(arrays, meta)`` transforma o artefato no objeto usado pelos callbacks;
+    ``inicializar()`` é chamado quando ainda não há nenhuma versão publicada e deve
+    publicar uma (ou devolver None se não houver dados).
+    """
+
+    def __init__(self, montar, inicializar=None, pasta=PASTA_ARTEFATOS, intervalo=2.0):
+        self.montar = montar
+        self.inicializar = inicializar
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.versao = None
+        self.dados = None
+        self.erro = None
+        self.carregando = False
+        self._meta = (None, None)
+        self._ultima_checagem = None
+        self._trava = threading.Lock()
+
+    def atual(self):
+        if self.dados is None and self.carregando:
+            # Primeira carga em andamento (outra requisição ou segundo plano): espera por ela
+            with self._trava:
+                pass
+        if self._ultima_checagem is None or time.monotonic() - self._ultima_checagem >= self.intervalo:
+            versao = versao_atual(self.pasta)
+            if versao is None and self.dados is None and self.inicializar is not None:
+                with self._trava:
+                    versao = versao_atual(self.pasta) or self._inicializar()
+            if versao is not None and versao != self.versao:
+                self._trocar(versao)
+            # Só depois da checagem: quem chega durante a carga não pula a espera
+            self._ultima_checagem = time.monotonic()
+        return self.dados
+
+    def recarregar(self):
+        """Força a leitura do ponteiro agora (gatilho administrativo)."""
+        self._ultima_checagem = None
+        return self.atual()
+
+    def meta_atual(self):
+        """meta.json da versão publicada, sem abrir os arrays (None se não houver versão).
+
+        Nunca dispara a carga: sem nada publicado quem chama decide quando
+        preparar os dados (``carregar_em_segundo_plano``).
+        """
+        versao = versao_atual(self.pasta) or self.versao
+        if versao is None:
+            return None
+        if self._meta[0] != versao:
+            try:
+                self._meta = (versao, ler_meta(versao, self.pasta))
+            except (OSError, ValueError) as erro:
+                self.erro = str(erro)
+                return None
+        return self._meta[1]
+
+    def carregar_em_segundo_plano(self):
+        """Dispara a carga numa thread, se ainda não houver dados nem carga em andamento."""
+        if self.dados is not None or self.carregando:
+            return
+        # Marca a carga antes da thread começar, para as requisições seguintes esperarem por ela
+        self.carregando = True
+        threading.Thread(target=self._carregar, daemon=True, name="carga-dados").start()
+
+    def _carregar(self):
+        try:
+            self._ultima_checagem = None
+            self.atual()
+        finally:
+            self.carregando = False
+
+    def estado(self):
+        """'pronto', 'carregando', 'erro' ou 'vazio', com a versão em uso."""
+        if self.dados is not None:
+            situacao = 'pronto'
+        elif self.carregando:
+            situacao = 'carregando'
+        else:
+            situacao = 'erro' if self.erro else 'vazio'
+        return {'estado': situacao, 'versao': self.versao, 'erro': self.erro}
+
+    def _inicializar(self):
+        self.carregando = True
+        try:
+            return self.inicializar()
+        except Exception as erro:
+            self.erro = str(erro)
+            print(f" ERRO ao preparar os dados: {erro}")
+            return None
+        finally:
+            self.carregando = False
+
+    def _trocar(self, versao):
+        with self._trava:
+            if versao == self.versao:
+                return
+            self.carregando = True
+            try:
+                arrays, meta = carregar_artefato(versao, self.pasta)
+                dados = self.montar(arrays, meta)
+            except Exception as erro:
+                # Mantém a versão anterior no ar se a nova não puder ser aberta
+                self.erro = str(erro)
+                print(f" ERRO ao abrir a versão de dados '{versao}': {erro}")
+                return
+            finally:
+                self.carregando = False
+            self.versao, self.dados, self.erro = versao, dados, None
+            print(f" Versão de dados '{versao}' carregada.")
@@ -0,0 +1,149 @@
+"""Esquema compacto das tabelas médico x trimestre.
+
+Em vez de carregar CRM, categoria, trimestre e flag de painel como strings Python,
+as tabelas da jornada são codificadas em arrays inteiros com dicionários:
+
+    crm        int32  índice em ``crms``        (codificação por dicionário)
+    categoria  int8   índice em ``categorias``  (0 é reservado para "SEM CAT")
+    trimestre  int16  índice em ``trimestres``  (períodos 'YYYYQn' em ordem)
+    no_painel  bool
+    uf         int8   por CRM, índice em ``ufs`` (UF emissora, prefixo do CRM LINK)
+
+Assim groupbys, merges e pivôs rodam sobre chaves inteiras e a memória cai em
+uma ordem de grandeza. ``para_dataframe()`` devolve o formato original.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+SEM_CAT = 'SEM CAT'
+CODIGO_SEM_CAT = 0
+UFS = ('AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE',
+       'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO')
+UF_DESCONHECIDA = 'ND'
+
+
+def limpar_e_padronizar_categoria(cat):
+    if pd.isna(cat) or str(cat).strip() == '': return SEM_CAT
+    try: return str(int(float(str(cat))))
+    except (ValueError, TypeError): return str(cat).strip()
+
+
+def chave_de_ordenacao(categoria):
+    try: return (0, int(categoria))
+    except ValueError: return (1, categoria)
+
+
+def padronizar_categorias(serie):
+    """Versão vetorizada de ``limpar_e_padronizar_categoria``.
+
+    A regra só é aplicada aos valores distintos (poucos) e o resultado é
+    espalhado pelas linhas com os códigos do ``factorize``.
+    """
+    codigos, unicos = pd.factorize(pd.Series(serie, copy=False), use_na_sentinel=True)
+    limpos = np.array([limpar_e_padronizar_categoria(v) for v in unicos] + [SEM_CAT], dtype=object)
+    return pd.Series(limpos[codigos], index=getattr(serie, 'index', None), name=getattr(serie, 'name', None))
+
+
+def normalizar_trimestres(serie):
+    """Trimestre como string 'YYYYQn', aceitando datas ou strings já no formato."""
+    serie = pd.Series(serie, copy=False)
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.dt.to_period('Q').astype(str)
+    return serie.astype(str).str.strip()
+
+
+def codificar_categorias(serie):
+    """(códigos int8, dicionário) com "SEM CAT" sempre no código 0."""
+    limpas = padronizar_categorias(serie)
+    codigos, unicos = pd.factorize(limpas)
+    outras = sorted((c for c in unicos if c != SEM_CAT), key=chave_de_ordenacao)
+    categorias = [SEM_CAT, *outras]
+    if len(categorias) > np.iinfo(np.int8).max:
+        raise ValueError(f"Categorias demais para int8: {len(categorias)}")
+    posicao = {c: i for i, c in enumerate(categorias)}
+    tabela = np.array([posicao[c] for c in unicos], dtype=np.int8)
+    return tabela[codigos], categorias
+
+
+def codificar_crm(serie):
+    codigos, crms = pd.factorize(pd.Series(serie, copy=False).astype(str).str.strip())
+    return codigos.astype(np.int32), np.asarray(crms, dtype=object)
+
+
+def codificar_trimestres(serie):
+    codigos, trimestres = pd.factorize(normalizar_trimestres(serie), sort=True)
+    return codigos.astype(np.int16), list(trimestres)
+
+
+def codificar_ufs(crms):
+    """UF de cada CRM do dicionário (prefixo de duas letras, ex.: 'AL1098' -> 'AL').
+
+    Devolve (códigos int8 por CRM, dicionário de UFs); prefixos fora da lista viram 'ND'.
+    """
+    prefixos = pd.Series(np.asarray(crms, dtype=str)).str[:2].str.upper()
+    ufs = [*UFS, UF_DESCONHECIDA]
+    codigos = pd.Categorical(prefixos, categories=ufs).codes
+    codigos = np.where(codigos < 0, len(ufs) - 1, codigos).astype(np.int8)
+    return codigos, ufs
+
+
+def ordem_exibicao(categorias):
+    """Índices das categorias na ordem hierárquica (numéricas primeiro, "SEM CAT" no fim)."""
+    return sorted(range(len(categorias)), key=lambda i: chave_de_ordenacao(categorias[i]))
+
+
+@dataclass
+class TabelaJornada:
+    crm: np.ndarray
+    categoria: np.ndarray
+    trimestre: np.ndarray
+    no_painel: np.ndarray
+    crms: np.ndarray
+    categorias: list
+    trimestres: list
+    uf: np.ndarray = None
+    ufs: list = None
+
+    def __len__(self):
+        return len(self.crm)
+
+    @property
+    def categorias_ordenadas(self):
+        return [self.categorias[i] for i in ordem_exibicao(self.categorias)]
+
+    def dataframe_codificado(self):
+        """DataFrame só com as colunas inteiras (para groupby/merge em chaves inteiras)."""
+        df = pd.DataFrame({'CRM': self.crm, 'CATEGORIA': self.categoria,
+                           'TRIMESTRE': self.trimestre, 'NO_PAINEL': self.no_painel})
+        if self.uf is not None:
+            df['UF'] = self.uf[self.crm]
+        return df
+
+    def para_dataframe(self):
+        """Formato original: CRM LINK, TRIMESTRE, CATEGORIA e NO_PAINEL ('Sim'/'Não')."""
+        return pd.DataFrame({
+            'CRM LINK': self.crms[self.crm],
+            'TRIMESTRE': np.array(self.trimestres, dtype=object)[self.trimestre],
+            'CATEGORIA': np.array(self.categorias, dtype=object)[self.categoria],
+            'NO_PAINEL': np.where(self.no_painel, 'Sim', 'Não'),
+        })
+
+    def filtrar(self, mascara):
+        return TabelaJornada(self.crm[mascara], self.categoria[mascara], self.trimestre[mascara],
+                             self.no_painel[mascara], self.crms, self.categorias, self.trimestres, self.uf, self.ufs)
+
+
+def codificar_jornada(df):
+    """Codifica uma tabela longa (CRM LINK, TRIMESTRE, CATEGORIA, NO_PAINEL) no esquema compacto."""
+    crm, crms = codificar_crm(df['CRM LINK'])
+    categoria, categorias = codificar_categorias(df['CATEGORIA'])
+    trimestre, trimestres = codificar_trimestres(df['TRIMESTRE'])
+    if 'NO_PAINEL' in df:
+        no_painel = (df['NO_PAINEL'] == 'Sim').to_numpy(dtype=bool)
+    else:
+        no_painel = np.zeros(len(df), dtype=bool)
+    # UF derivada uma única vez, sobre o dicionário de CRMs (não por linha)
+    uf, ufs = codificar_ufs(crms)
+    return TabelaJornada(crm, categoria, trimestre, no_painel, crms, categorias, trimestres, uf, ufs)
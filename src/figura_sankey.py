@@ -0,0 +1,163 @@
+import numpy as np
+import plotly.graph_objects as go
+
+CORES_CATEGORIAS = {
+    '1': '#1f77b4', '2': '#2ca02c', '3': '#ff7f0e', '4': '#d62728', '5': '#9467bd',
+    'SEM CAT': '#7f7f7f', 'default': '#cccccc'
+}
+COR_LINK_APAGADO = 'rgba(230, 230, 230, 0.05)'
+
+def hex_para_rgba(cor_hex, alpha=0.6):
+    return f'rgba({int(cor_hex[1:3], 16)}, {int(cor_hex[3:5], 16)}, {int(cor_hex[5:7], 16)}, {alpha})'
+
+def texto_insight(source_cat, target_cat):
+    if source_cat == target_cat:
+        return "<b>Insight:</b> Médicos que <b>mantiveram</b> a categoria."
+    if source_cat == 'SEM CAT': # Qualquer saída de "SEM CAT" é melhora
+        return "<b>Insight:</b> Este fluxo representa uma <b>melhora</b> (entrada em categoria)."
+    if target_cat == 'SEM CAT': # Qualquer entrada em "SEM CAT" é regressão
+        return "<b>Insight:</b> Este fluxo representa uma <b>regressão</b> (saída de categoria)."
+    try:
+        melhora = int(target_cat) < int(source_cat)
+    except ValueError:
+        return ""
+    if melhora:
+        return "<b>Insight:</b> Este fluxo representa uma <b>melhora</b> de categoria."
+    return "<b>Insight:</b> Este fluxo representa uma <b>regressão</b> de categoria."
+
+def figura_vazia(titulo):
+    return go.Figure().update_layout(title_text=titulo)
+
+class ConstrutorSankey:
+    """Monta a figura do Sankey a partir do cubo de transições usando só arrays.
+
+    Tudo que depende apenas de (universo, trimestre, categoria) — valores, rótulos,
+    cores e textos de hover — é calculado uma vez na carga. A cada interação,
+    filtro de categorias e foco viram máscaras booleanas sobre esses arrays.
+    O filtro de UF soma as fatias por estado do cubo; só então os textos de hover
+    dos links restantes são montados na hora.
+    """
+
+    def __init__(self, cubo, cores=CORES_CATEGORIAS):
+        self.trimestres = list(cubo.trimestres)
+        self.categorias = list(cubo.categorias)
+        cats = np.array(self.categorias, dtype=object)
+        tris = np.array(self.trimestres, dtype=object)
+
+        # [par, cat_source, cat_target] por universo
+        self.valores = {
+            'mercado': cubo.valores.sum(axis=3),
+            'painel': cubo.valores[..., 1],
+        }
+        # [uf, par, cat_source, cat_target] por universo, quando o cubo traz a UF
+        self.ufs = cubo.ufs
+        self.valores_uf = None
+        if cubo.valores_uf is not None:
+            self.valores_uf = {'mercado': cubo.valores_uf.sum(axis=4), 'painel': cubo.valores_uf[..., 1]}
+
+        # Nós: um por (trimestre, categoria)
+        self.rotulos_nos = np.array([[f"Cat. {c}<br>({t})" for c in cats] for t in tris], dtype=object).reshape(len(tris), len(cats))
+        self.cores_nos = np.array([cores.get(c, cores['default']) for c in cats], dtype=object)
+        self.cores_links = np.array([hex_para_rgba(cor) for cor in self.cores_nos], dtype=object)
+
+        # Links: texto de hover completo por (universo, par, source, target)
+        self.insights = [[texto_insight(s, t) for t in cats] for s in cats]
+        self.hover_links = {}
+        for universo, valores in self.valores.items():
+            hover = np.empty(valores.shape, dtype=object)
+            par, src, tgt = np.nonzero(valores)
+            hover[par, src, tgt] = self._textos_hover(valores, par, src, tgt)
+            self.hover_links[universo] = hover
+
+    def _textos_hover(self, valores, par, src, tgt):
+        cats, tris = self.categorias, self.trimestres
+        return [f"<b>Movimento:</b> {valores[p, s, t]} médicos<br><b>De:</b> Cat.{cats[s]} ({tris[p]})"
+                f"<br><b>Para:</b> Cat.{cats[t]} ({tris[p + 1]})<br>{self.insights[s][t]}"
+                for p, s, t in zip(par.tolist(), src.tolist(), tgt.tolist())]
+
+    def valores_universo(self, universo, ufs=None):
+        """[par, source, target] do universo; com ``ufs``, a soma das fatias desses estados."""
+        if not ufs:
+            return self.valores[universo]
+        if self.valores_uf is None:
+            raise ValueError("Os dados publicados não trazem a UF dos médicos")
+        codigos = [self.ufs.index(uf) for uf in ufs if uf in self.ufs]
+        return self.valores_uf[universo][codigos].sum(axis=0)
+
+    def totais_nos(self, valores):
+        """Médicos e percentual do trimestre por nó, ambos [trimestre, categoria].
+
+        O total de um nó é o fluxo que sai dele ou, se não sai nenhum (o último
+        período da janela, por exemplo), o que chega; 0 quando o nó não existe.
+        """
+        forma = (len(self.trimestres), len(self.categorias))
+        saida, entrada = np.zeros(forma, dtype=np.int64), np.zeros(forma, dtype=np.int64)
+        saida[:valores.shape[0]] = valores.sum(axis=2)
+        entrada[1:valores.shape[0] + 1] = valores.sum(axis=1)
+        totais = np.where(saida > 0, saida, entrada)
+        total_trimestre = totais.sum(axis=1, keepdims=True)
+        percentuais = np.divide(totais * 100, total_trimestre, out=np.zeros(totais.shape), where=total_trimestre > 0)
+        return totais, percentuais
+
+    def figura(self, universo, categorias_selecionadas, categoria_foco=None, ufs=None):
+        if not categorias_selecionadas:
+            return figura_vazia("Selecione ao menos uma categoria no filtro")
+
+        selecionadas = np.isin(np.array(self.categorias, dtype=object), list(categorias_selecionadas))
+        valores = self.valores_universo(universo, ufs) * (selecionadas[None, :, None] & selecionadas[None, None, :])
+        if not valores.any():
+            return figura_vazia("Nenhuma transição encontrada")
+
+        # Um nó existe quando a categoria é origem ou destino de algum fluxo naquele trimestre
+        totais_nos, percentuais_nos = self.totais_nos(valores)
+        existe = totais_nos > 0
+        indice_no = np.full(existe.shape, -1, dtype=np.int64)
+        indice_no[existe] = np.arange(existe.sum())
+        nos_tri, nos_cat = np.nonzero(existe)
+
+        totais, percentuais = totais_nos[nos_tri, nos_cat], percentuais_nos[nos_tri, nos_cat]
+        node_custom_data = [f"Total: {total} médicos<br>Representatividade: {pct:.1f}% neste trimestre"
+                            for total, pct in zip(totais.tolist(), percentuais.tolist())]
+
+        par, src, tgt = np.nonzero(valores)
+        origem, destino = indice_no[par, src], indice_no[par + 1, tgt]
+        validos = (origem >= 0) & (destino >= 0)
+        par, src, tgt, origem, destino = par[validos], src[validos], tgt[validos], origem[validos], destino[validos]
+
+        cores = self.cores_links[src]
+        if categoria_foco and categoria_foco != 'geral' and categoria_foco in self.categorias:
+            foco = self.categorias.index(categoria_foco)
+            cores = np.where((src == foco) | (tgt == foco), cores, COR_LINK_APAGADO)
+
+        # Sem filtro de UF o hover já está pronto; com filtro os valores mudam e o texto é montado agora
+        hover = self._textos_hover(valores, par, src, tgt) if ufs else self.hover_links[universo][par, src, tgt].tolist()
+
+        fig = go.Figure(go.Sankey(
+            arrangement='snap',
+            node={
+                'pad': 25, 'thickness': 20, 'line': {'color': 'black', 'width': 0.5},
+                'label': self.rotulos_nos[nos_tri, nos_cat].tolist(),
+                'color': self.cores_nos[nos_cat].tolist(),
+                'customdata': node_custom_data,
+                'hovertemplate': '<b>%{label}</b><br>%{customdata}<extra></extra>'
+            },
+            link={
+                'source': origem.tolist(), 'target': destino.tolist(), 'value': valores[par, src, tgt].tolist(),
+                'color': cores.tolist(),
+                'customdata': hover,
+                'hovertemplate': '%{customdata}<extra></extra>'
+            }
+        ))
+        titulo = f"Jornada de Médicos - {universo.replace('_', ' ').title()}"
+        if ufs:
+            titulo += f" ({', '.join(sorted(ufs))})"
+        fig.update_layout(
+            title_text=titulo, transition_duration=250,
+            # Metadados por link para o realce de foco no navegador (assets/foco.js)
+            meta={
+                'categorias': self.categorias,
+                'link_src': src.tolist(), 'link_tgt': tgt.tolist(),
+                'cores_links': self.cores_links.tolist(), 'cor_apagado': COR_LINK_APAGADO,
+            },
+        )
+        return fig
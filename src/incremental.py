@@ -0,0 +1,224 @@
+"""Processamento incremental quando chega uma nova coluna 'TRIM MOV mm/yy'.
+
+Os resultados ficam particionados por trimestre em ``PASTA_RESULTADOS``:
+
+    resultados/longitudinal/2025Q2.parquet        CRM LINK, TRIMESTRE, CATEGORIA, NO_PAINEL
+    resultados/transicoes/2025Q1_2025Q2.parquet   transições do par (formato do dash)
+
+A cada execução só os trimestres que ainda não têm partição são lidos da planilha
+wide, cruzados com o painel e gravados; depois só os pares de trimestres vizinhos
+que faltam (o par de fronteira com o histórico e os pares entre os novos) são
+calculados. A matriz da jornada (``matriz_jornada.npz``) da execução anterior ganha
+só as colunas novas (``MatrizJornada.acrescentar``) e é publicada como nova versão
+de dados para o dash; o painel só é normalizado de novo se os trimestres novos
+precisarem dele ou se o arquivo mudou. O custo não depende de quantos anos de
+histórico existem, e uma execução sem trimestres novos nem painel novo termina
+logo depois de ler o cabeçalho da planilha.
+
+As flags de painel dos trimestres já gravados são consideradas fechadas. Se o
+painel sofrer correções retroativas, rode com ``--completo`` para refazer tudo.
+
+    python -m src.incremental [--completo]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from src.cobertura import CuboCobertura
+from src.dados_compartilhados import publicar_matriz
+from src.esquema import codificar_jornada, padronizar_categorias
+from src.indice_medicos import CAMINHO_EPISODIOS, carregar_episodios, indexar_episodios, salvar_episodios
+from src.jornada_mercado_327 import colunas_de_trimestre, ler_em_blocos, parse_trimestre
+from src.tabelona_cat_trim_inclusao import ler_painel, marcar_presenca_no_painel
+from src.matriz_jornada import CAMINHO_MATRIZ, MatrizJornada
+from src.transicoes import transicoes_do_par
+
+PASTA_RESULTADOS = os.environ.get("JORNADA_RESULTADOS", "resultados")
+ARQUIVO_MERCADO = "evolucao_cat_trimestral.xlsx"
+ARQUIVO_PAINEL = "PAINEL_FV_GERAL.xlsx"
+
+
+def _pasta(nome, pasta=None):
+    return os.path.join(pasta or PASTA_RESULTADOS, nome)
+
+
+def trimestres_gravados(pasta=None):
+    arquivos = glob.glob(os.path.join(_pasta("longitudinal", pasta), "*.parquet"))
+    return sorted(os.path.splitext(os.path.basename(a))[0] for a in arquivos)
+
+
+def pares_gravados(pasta=None):
+    arquivos = glob.glob(os.path.join(_pasta("transicoes", pasta), "*.parquet"))
+    return {tuple(os.path.splitext(os.path.basename(a))[0].split("_")) for a in arquivos}
+
+
+def trimestres_na_planilha(caminho=ARQUIVO_MERCADO):
+    """Lê só o cabeçalho da planilha wide: {coluna: 'YYYYQn'}."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(caminho, read_only=True)
+    try:
+        cabecalho = next(wb.active.iter_rows(max_row=1, values_only=True))
+    finally:
+        wb.close()
+    return {col: str(parse_trimestre(col).to_period("Q")) for col in colunas_de_trimestre(cabecalho)}
+
+
+def _ler_estado(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar_estado(estado, caminho):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2)
+    os.replace(temporario, caminho)
+
+
+def _gravar(df, caminho):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+
+
+def ler_longitudinal(trimestres=None, pasta=None):
+    trimestres = trimestres_gravados(pasta) if trimestres is None else trimestres
+    partes = [pd.read_parquet(os.path.join(_pasta("longitudinal", pasta), f"{t}.parquet")) for t in trimestres]
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+
+def ler_transicoes(pasta=None):
+    arquivos = sorted(glob.glob(os.path.join(_pasta("transicoes", pasta), "*.parquet")))
+    if not arquivos:
+        return None
+    return pd.concat([pd.read_parquet(a) for a in arquivos], ignore_index=True)
+
+
+def _hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _matriz_gravada(caminho, trimestres):
+    """Matriz da última execução, se existir e cobrir exatamente os trimestres gravados."""
+    if not trimestres or not os.path.exists(caminho):
+        return None
+    matriz = MatrizJornada.carregar(caminho)
+    return matriz if matriz.trimestres == trimestres and matriz.crms is not None else None
+
+
+def atualizar(entrada_mercado=ARQUIVO_MERCADO, entrada_painel=ARQUIVO_PAINEL, pasta=None, completo=False,
+              caminho_matriz=CAMINHO_MATRIZ):
+    """Acrescenta aos resultados os trimestres novos da planilha. Devolve os trimestres incluídos."""
+    pasta = pasta or PASTA_RESULTADOS
+    if completo:
+        for arquivo in glob.glob(os.path.join(pasta, "*", "*.parquet")):
+            os.remove(arquivo)
+
+    colunas = trimestres_na_planilha(entrada_mercado)
+    existentes = set(trimestres_gravados(pasta))
+    novas = {col: tri for col, tri in colunas.items() if tri not in existentes}
+
+    caminho_estado = os.path.join(pasta, "estado.json")
+    estado = _ler_estado(caminho_estado)
+    hash_painel = _hash_arquivo(entrada_painel)
+    painel_mudou = estado.get("painel") != hash_painel
+    if (not novas and not painel_mudou and estado.get("trimestres") == sorted(existentes)
+            and os.path.exists(caminho_matriz)):
+        print(" Nada mudou desde a última execução.")
+        return []
+    matriz = _matriz_gravada(caminho_matriz, sorted(existentes))
+    if existentes and estado.get("painel") is not None and painel_mudou:
+        print(" Aviso: o painel mudou desde a última execução; trimestres já gravados mantêm as flags antigas "
+              "(use --completo se houve correção retroativa).")
+
+    # O painel só é normalizado se for usado: marcar os trimestres novos ou reindexar os episódios
+    painel = []
+    def _painel():
+        if not painel:
+            painel.append(ler_painel(entrada_painel))
+        return painel[0]
+
+    if matriz is None and existentes:
+        # Matriz ausente ou de outra execução: remonta uma vez a partir das partições
+        matriz = MatrizJornada.de_tabela(codificar_jornada(ler_longitudinal(sorted(existentes), pasta)))
+        matriz_mudou = True
+    else:
+        matriz_mudou = False
+    if novas:
+        print(f" Trimestres novos: {', '.join(sorted(novas.values()))}")
+        blocos = list(ler_em_blocos(entrada_mercado, colunas=list(novas)))
+        df_novo = pd.concat(blocos, ignore_index=True)
+        df_novo["TRIMESTRE"] = df_novo["TRIMESTRE"].dt.to_period("Q").astype(str)
+        # Categoria como texto padronizado: a planilha mistura números e 'SEM CAT',
+        # que o Parquet não grava numa mesma coluna
+        df_novo["CATEGORIA"] = padronizar_categorias(df_novo["CATEGORIA"])
+        df_novo = marcar_presenca_no_painel(df_novo, _painel())
+        for tri, parte in df_novo.groupby("TRIMESTRE"):
+            _gravar(parte.reset_index(drop=True), os.path.join(pasta, "longitudinal", f"{tri}.parquet"))
+        # Só as colunas novas entram na matriz; as antigas não são relidas
+        nova = MatrizJornada.de_tabela(codificar_jornada(df_novo))
+        matriz = nova if matriz is None else matriz.acrescentar(nova)
+        matriz_mudou = True
+    else:
+        print(" Nenhum trimestre novo na planilha.")
+
+    # Pares de vizinhos que faltam (fronteira + novos); pares que deixaram de ser vizinhos saem
+    todos = trimestres_gravados(pasta)
+    necessarios = set(zip(todos[:-1], todos[1:]))
+    gravados = pares_gravados(pasta)
+    for t1, t2 in gravados - necessarios:
+        os.remove(os.path.join(pasta, "transicoes", f"{t1}_{t2}.parquet"))
+
+    cache = {}
+    def _trimestre(t):
+        if t not in cache:
+            cache[t] = ler_longitudinal([t], pasta)
+        return cache[t]
+
+    for t1, t2 in sorted(necessarios - gravados):
+        transicoes = transicoes_do_par(_trimestre(t1), _trimestre(t2), t1, t2)
+        _gravar(transicoes, os.path.join(pasta, "transicoes", f"{t1}_{t2}.parquet"))
+        print(f" Transições {t1} -> {t2}: {int(transicoes['value'].sum())} médicos.")
+
+    if matriz is not None:
+        if matriz_mudou:
+            matriz.salvar(caminho_matriz)
+        # Episódios reindexados só se o painel ou a lista de médicos mudou
+        caminho_episodios = os.path.join(pasta, CAMINHO_EPISODIOS)
+        if painel_mudou or estado.get("medicos") != matriz.n_medicos or not os.path.exists(caminho_episodios):
+            episodios = indexar_episodios(_painel(), matriz.crms)
+            os.makedirs(pasta, exist_ok=True)
+            salvar_episodios(episodios, caminho_episodios)
+        else:
+            episodios = carregar_episodios(caminho_episodios)
+        versao = publicar_matriz(matriz, episodios, cobertura=CuboCobertura.de_matriz(matriz))
+        print(f" Versão de dados publicada para o dash: {versao}")
+        estado["medicos"] = matriz.n_medicos
+
+    estado.update({"painel": hash_painel, "trimestres": todos})
+    _gravar_estado(estado, caminho_estado)
+    return sorted(novas.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Acrescenta aos resultados apenas os trimestres novos.")
+    parser.add_argument("--completo", action="store_true", help="apaga os resultados e reprocessa tudo")
+    parser.add_argument("--pasta", default=PASTA_RESULTADOS, help="pasta dos resultados persistidos")
+    args = parser.parse_args()
+    atualizar(pasta=args.pasta, completo=args.completo)
+
+
+if __name__ == "__main__":
+    main()
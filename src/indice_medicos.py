@@ -0,0 +1,128 @@
+"""Índices para consultar a jornada de um médico pelo CRM em O(log n).
+
+Montados uma vez na carga dos dados, a partir da matriz da jornada
+(src/matriz_jornada.py) e dos episódios do painel:
+
+    crms_ordenados  CRMs normalizados em ordem lexicográfica, com ``crms_linhas`` (int32)
+                    a linha de cada um na matriz: busca binária com ``np.searchsorted``
+    ep_offsets   int64 [médicos + 1]: episódios do médico ``i`` ficam em
+                 ``ep_offsets[i]:ep_offsets[i + 1]`` (índice por offsets, estilo CSR)
+    ep_inclusao / ep_inativacao   datetime64[D] ordenados por médico e inclusão
+
+Uma consulta é uma busca binária mais fatias dos arrays, sem varrer a tabela
+longa nem a planilha do painel. Um dicionário daria O(1), mas seria um objeto
+Python por médico em cada worker; o array ordenado é mapeado do artefato, e
+~20 comparações por consulta não aparecem no tempo de resposta. Todos os índices vão no artefato compartilhado
+(src/dados_compartilhados.py) e são mapeados em memória: nenhum worker monta
+estruturas Python por médico, então mais workers não multiplicam a memória.
+"""
+import os
+
+import numpy as np
+
+CAMINHO_EPISODIOS = 'episodios_painel.npz'
+COLUNAS_EPISODIOS = ('ep_offsets', 'ep_inclusao', 'ep_inativacao')
+COLUNAS_CRMS = ('crms_ordenados', 'crms_linhas')
+
+
+def normalizar_crm(crm):
+    """CRM como chave de busca: 'al1098 ' e 'AL1098' são o mesmo médico."""
+    return str(crm).strip().upper()
+
+
+def indexar_crms(crms):
+    """CRMs ordenados e a linha de cada um na matriz, para a busca binária."""
+    crms = np.char.upper(np.char.strip(np.asarray(crms, dtype=str)))
+    ordem = np.argsort(crms, kind='stable')
+    return {'crms_ordenados': crms[ordem], 'crms_linhas': ordem.astype(np.int32)}
+
+
+def indexar_episodios(painel, crms):
+    """Arrays de episódios agrupados pela linha do médico na matriz.
+
+    ``painel`` é o DataFrame de ``ler_painel`` (datas já convertidas); episódios de
+    CRMs fora da matriz ou sem data de inclusão ficam de fora.
+    """
+    import pandas as pd  # só na indexação; o dash abre os episódios já indexados
+
+    chaves = np.char.upper(np.char.strip(np.asarray(crms, dtype=str)))
+    linhas = pd.Index(chaves).get_indexer(painel['CRM LINK'].astype(str).str.strip().str.upper())
+    inclusao = painel['DT_INCLUSAO'].to_numpy(dtype='datetime64[D]')
+    inativacao = painel['DT_INATIVACAO'].to_numpy(dtype='datetime64[D]')
+    validos = (linhas >= 0) & ~np.isnat(inclusao)
+    linhas, inclusao, inativacao = linhas[validos], inclusao[validos], inativacao[validos]
+
+    ordem = np.lexsort((inclusao, linhas))
+    offsets = np.zeros(len(crms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(linhas, minlength=len(crms)), out=offsets[1:])
+    return {'ep_offsets': offsets, 'ep_inclusao': inclusao[ordem], 'ep_inativacao': inativacao[ordem]}
+
+
+def salvar_episodios(episodios, caminho=CAMINHO_EPISODIOS):
+    temporario = caminho + '.tmp.npz'
+    np.savez(temporario, **episodios)
+    os.replace(temporario, caminho)
+
+
+def carregar_episodios(caminho=CAMINHO_EPISODIOS):
+    with np.load(caminho) as dados:
+        return {nome: dados[nome] for nome in COLUNAS_EPISODIOS}
+
+
+def _data(valor):
+    return None if np.isnat(valor) else str(valor)
+
+
+class IndiceMedicos:
+    def __init__(self, matriz, episodios=None, crms=None):
+        if matriz.crms is None:
+            raise ValueError("A matriz não traz o dicionário de CRMs; republique os dados")
+        self.matriz = matriz
+        # Artefatos antigos não trazem o índice de CRMs: é montado aqui, uma vez
+        crms = crms if crms is not None else indexar_crms(matriz.crms)
+        self.crms_ordenados, self.crms_linhas = crms['crms_ordenados'], crms['crms_linhas']
+        self.episodios = episodios
+
+    def linha(self, crm):
+        """Linha do médico na matriz (None se o CRM não existir)."""
+        crm = normalizar_crm(crm)
+        k = int(np.searchsorted(self.crms_ordenados, crm))
+        if k < len(self.crms_ordenados) and self.crms_ordenados[k] == crm:
+            return int(self.crms_linhas[k])
+        return None
+
+    def __contains__(self, crm):
+        return self.linha(crm) is not None
+
+    def consultar(self, crm):
+        """Jornada do médico: categoria e flag por trimestre e episódios do painel (None se não existir)."""
+        crm = normalizar_crm(crm)
+        i = self.linha(crm)
+        if i is None:
+            return None
+        matriz = self.matriz
+        linha = matriz.categoria[i]
+        bits = int(matriz.painel[i])
+        trimestres = [
+            {'trimestre': t,
+             'categoria': matriz.categorias[c] if c >= 0 else None,
+             'no_painel': bool(bits >> j & 1)}
+            for j, (t, c) in enumerate(zip(matriz.trimestres, linha.tolist()))
+        ]
+        episodios = []
+        if self.episodios is not None:
+            inicio, fim = self.episodios['ep_offsets'][i:i + 2]
+            episodios = [{'inclusao': _data(a), 'inativacao': _data(b)} for a, b in zip(
+                self.episodios['ep_inclusao'][inicio:fim], self.episodios['ep_inativacao'][inicio:fim])]
+        return {'crm': crm, 'trimestres': trimestres, 'episodios': episodios}
+
+    def consultar_lote(self, crms):
+        """(resultados por CRM, CRMs não encontrados), na ordem recebida e sem repetição."""
+        encontrados, faltando = {}, []
+        for crm in dict.fromkeys(normalizar_crm(c) for c in crms):
+            resultado = self.consultar(crm)
+            if resultado is None:
+                faltando.append(crm)
+            else:
+                encontrados[crm] = resultado
+        return encontrados, faltando
@@ -1,18 +1,16 @@
-import pandas as pd
+import argparse
+import os
+import sys
 
-# Carregar base de categorias trimestrais (formato wide)
-df = pd.read_excel("evolucao_cat_trimestral.xlsx")  # ajuste o nome do arquivo
+import pandas as pd
 
-# Filtrar colunas de trimestre (assumindo que começam com "TRIM MOV")
-col_trimestres = [col for col in df.columns if "TRIM MOV" in col]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.carregador import ler_planilha, linhas_em_blocos, salvar_planilha
+from src.saidas import FORMATOS, caminhos_por_formato, exportar
 
-# Unpivot para formato longitudinal
-df_long = df.melt(
-    id_vars=["CRM LINK"],  # ajuste se o nome da coluna for diferente
-    value_vars=col_trimestres,
-    var_name="TRIMESTRE_RAW",
-    value_name="CATEGORIA"
-)
+ARQUIVO_ENTRADA = "evolucao_cat_trimestral.xlsx"  # ajuste o nome do arquivo
+ARQUIVO_SAIDA = "base_longitudinal_mercado.xlsx"
+COLUNAS_SAIDA = ["CRM LINK", "TRIMESTRE", "CATEGORIA"]
 
 # Converter "TRIM MOV 09/23" em data real (ex: 2023-09-01)
 def parse_trimestre(trim_str):
@@ -22,13 +20,72 @@ def parse_trimestre(trim_str):
     ano = int("20" + ano) if len(ano) == 2 else int(ano)
     return pd.Timestamp(year=ano, month=mes, day=1)
 
-df_long["TRIMESTRE"] = df_long["TRIMESTRE_RAW"].apply(parse_trimestre)
-df_long = df_long.drop(columns=["TRIMESTRE_RAW"])
+# Filtrar colunas de trimestre (assumindo que começam com "TRIM MOV")
+def colunas_de_trimestre(colunas):
+    return [col for col in colunas if isinstance(col, str) and "TRIM MOV" in col]
+
+def para_formato_longo(df):
+    col_trimestres = colunas_de_trimestre(df.columns)
+
+    # Unpivot para formato longitudinal
+    df_long = df.melt(
+        id_vars=["CRM LINK"],  # ajuste se o nome da coluna for diferente
+        value_vars=col_trimestres,
+        var_name="TRIMESTRE_RAW",
+        value_name="CATEGORIA"
+    )
+
+    # Só existem poucos cabeçalhos distintos: converte cada um uma vez e mapeia
+    datas = {col: parse_trimestre(col) for col in col_trimestres}
+    df_long["TRIMESTRE"] = df_long["TRIMESTRE_RAW"].map(datas)
+    df_long = df_long.drop(columns=["TRIMESTRE_RAW"])
+
+    # Reordenar colunas
+    return df_long[COLUNAS_SAIDA]
+
+# Leitura em streaming: percorre a planilha wide em blocos de linhas (carregador.linhas_em_blocos)
+# e devolve cada bloco já no formato longo, sem nunca carregar a planilha inteira.
+# A ordem das linhas é trimestre-a-trimestre dentro de cada bloco. Com `colunas`,
+# só os trimestres indicados são emitidos (usado pelo modo incremental).
+def ler_em_blocos(caminho, tamanho_bloco=20000, colunas=None):
+    trimestres = None
+    for cabecalho, linhas in linhas_em_blocos(caminho, tamanho_bloco):
+        if trimestres is None:
+            idx_crm = cabecalho.index("CRM LINK")
+            selecionadas = [col for col in colunas_de_trimestre(cabecalho) if colunas is None or col in colunas]
+            trimestres = [(cabecalho.index(col), parse_trimestre(col)) for col in selecionadas]
+        yield _bloco_para_longo(linhas, idx_crm, trimestres)
+
+def _bloco_para_longo(bloco, idx_crm, trimestres):
+    crms = [linha[idx_crm] for linha in bloco]
+    partes = [
+        pd.DataFrame({"CRM LINK": crms, "TRIMESTRE": data, "CATEGORIA": [linha[idx] for linha in bloco]})
+        for idx, data in trimestres
+    ]
+    return pd.concat(partes, ignore_index=True)[COLUNAS_SAIDA]
+
+# `formatos` acrescenta cópias para consumo por máquina ('parquet', 'csv.gz') ao lado do XLSX,
+# gravadas na mesma passada pelos escritores em blocos (src/saidas.py)
+def gerar_base_longitudinal(entrada=ARQUIVO_ENTRADA, saida=ARQUIVO_SAIDA, streaming=False, tamanho_bloco=20000,
+                            formatos=()):
+    extras = caminhos_por_formato(saida, formatos)
+    if streaming:
+        # Blocos da leitura vão direto para os escritores: a tabela longa nunca existe inteira
+        return exportar(ler_em_blocos(entrada, tamanho_bloco), [saida, *extras])
 
-# Reordenar colunas
-df_long = df_long[["CRM LINK", "TRIMESTRE", "CATEGORIA"]]
+    # Carregar base de categorias trimestrais (formato wide)
+    df_long = para_formato_longo(ler_planilha(entrada))
+    # Exportar para Excel (e formatos extras)
+    salvar_planilha(df_long, saida, extras)
+    return len(df_long)
 
-# Exportar para Excel
-df_long.to_excel("base_longitudinal_mercado.xlsx", index=False)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte a base wide de categorias para o formato longitudinal.")
+    parser.add_argument("--streaming", action="store_true", help="lê e grava em blocos, com memória constante")
+    parser.add_argument("--bloco", type=int, default=20000, help="linhas da planilha por bloco no modo streaming")
+    parser.add_argument("--formatos", nargs="*", default=[], choices=[f for f in FORMATOS if f != "xlsx"],
+                        help="cópias extras da saída além do XLSX")
+    args = parser.parse_args()
 
-print("Arquivo 'base_longitudinal_mercado.xlsx' exportado com sucesso!")
+    linhas = gerar_base_longitudinal(streaming=args.streaming, tamanho_bloco=args.bloco, formatos=args.formatos)
+    print(f"Arquivo '{ARQUIVO_SAIDA}' exportado com sucesso! ({linhas} linhas)")
@@ -0,0 +1,297 @@
+"""Matriz densa da jornada: médicos x trimestres.
+
+Toda análise da jornada (transições do Sankey, cobertura do painel, contagens de
+mercado x painel) é respondida a partir de duas estruturas:
+
+    categoria  int8   [médicos, trimestres]  índice em ``categorias`` (-1 = fora do mercado)
+    painel     uint64 [médicos]              bit ``t`` ligado = no painel no trimestre ``t``
+    uf         int8   [médicos]              índice em ``ufs`` (UF emissora do CRM)
+
+As categorias ficam na ordem hierárquica de exibição (numéricas primeiro, "SEM CAT"
+no fim). Consultas sobre janelas de trimestres viram fatias da matriz, máscaras
+NumPy e operações bit a bit sobre o painel, sem filtros nem merges em formato longo.
+Com ``por_uf=True`` os agregados ganham um eixo inicial de UF: as fatias por estado
+saem da mesma passada e um recorte regional é só a soma das fatias escolhidas.
+As transições também podem ser contadas numa granularidade mais grossa
+(``semestre`` ou ``ano``): cada período é representado pelo seu último trimestre
+dentro da janela, e os pares passam a ligar períodos vizinhos.
+
+    matriz = MatrizJornada.de_tabela(codificar_jornada(df))
+    matriz.contagens('2023Q1', '2024Q4', universo='painel')
+    matriz.coorte('2023Q3', categorias=['4']) & matriz.sempre_no_painel('2023Q3', '2024Q2')
+"""
+import os
+
+import numpy as np
+
+CAMINHO_MATRIZ = 'matriz_jornada.npz'
+AUSENTE = -1
+MAX_TRIMESTRES = 64
+UNIVERSOS = ('mercado', 'painel')
+GRANULARIDADES = ('trimestre', 'semestre', 'ano')
+
+
+class MatrizJornada:
+    def __init__(self, categoria, painel, trimestres, categorias, crms=None, uf=None, ufs=None):
+        if len(trimestres) > MAX_TRIMESTRES:
+            raise ValueError(f"O bitset do painel comporta até {MAX_TRIMESTRES} trimestres (recebidos {len(trimestres)})")
+        self.categoria = categoria
+        self.painel = painel
+        self.trimestres = list(trimestres)
+        self.categorias = list(categorias)
+        self.crms = crms
+        self.uf = uf
+        self.ufs = list(ufs) if ufs is not None else None
+
+    @classmethod
+    def de_tabela(cls, tabela):
+        """Monta a matriz a partir de uma ``TabelaJornada`` (src/esquema.py)."""
+        # Importação adiada: o esquema traz o pandas, que a matriz lida do artefato não usa
+        from src.esquema import ordem_exibicao
+
+        # Eixo de categorias: só as presentes, na ordem hierárquica de exibição
+        presentes = np.zeros(len(tabela.categorias), dtype=bool)
+        presentes[tabela.categoria] = True
+        ordem = [i for i in ordem_exibicao(tabela.categorias) if presentes[i]]
+        posicao = np.full(len(tabela.categorias), AUSENTE, dtype=np.int8)
+        posicao[ordem] = np.arange(len(ordem))
+
+        n_medicos, n_tri = len(tabela.crms), len(tabela.trimestres)
+        categoria = np.full((n_medicos, n_tri), AUSENTE, dtype=np.int8)
+        categoria[tabela.crm, tabela.trimestre] = posicao[tabela.categoria]
+
+        painel = np.zeros(n_medicos, dtype=np.uint64)
+        bits = np.left_shift(np.uint64(1), tabela.trimestre[tabela.no_painel].astype(np.uint64))
+        np.bitwise_or.at(painel, tabela.crm[tabela.no_painel], bits)
+        return cls(categoria, painel, tabela.trimestres, [tabela.categorias[i] for i in ordem], tabela.crms,
+                   tabela.uf, tabela.ufs)
+
+    @property
+    def n_medicos(self):
+        return self.categoria.shape[0]
+
+    # --- Janelas de trimestres ---
+
+    def indice_trimestre(self, trimestre):
+        """Posição do trimestre ('YYYYQn' ou índice inteiro, negativos contam do fim)."""
+        if isinstance(trimestre, (int, np.integer)):
+            return range(len(self.trimestres))[trimestre]
+        try:
+            return self.trimestres.index(str(trimestre))
+        except ValueError:
+            raise KeyError(f"Trimestre desconhecido: {trimestre!r}") from None
+
+    def janela(self, inicio=None, fim=None):
+        """Fatia [inicio, fim] (inclusiva) sobre o eixo de trimestres."""
+        if not self.trimestres:
+            return slice(0, 0)
+        i = 0 if inicio is None else self.indice_trimestre(inicio)
+        f = len(self.trimestres) - 1 if fim is None else self.indice_trimestre(fim)
+        if f < i:
+            raise ValueError(f"Janela vazia: {self.trimestres[i]} > {self.trimestres[f]}")
+        return slice(i, f + 1)
+
+    def trimestres_janela(self, inicio=None, fim=None):
+        return self.trimestres[self.janela(inicio, fim)]
+
+    def periodos(self, inicio=None, fim=None, granularidade='trimestre'):
+        """(índices dos trimestres que fecham cada período da janela, rótulos dos períodos).
+
+        Rótulos: 'YYYYQn' por trimestre, 'YYYYS1'/'YYYYS2' por semestre e 'YYYY' por ano.
+        """
+        if granularidade not in GRANULARIDADES:
+            raise ValueError(f"Granularidade inválida: {granularidade!r} (use {', '.join(GRANULARIDADES)})")
+        j = self.janela(inicio, fim)
+        indices = np.arange(j.start, j.stop)
+        if granularidade == 'trimestre':
+            return indices, self.trimestres[j]
+        rotulos = [t[:4] if granularidade == 'ano' else f"{t[:4]}S{1 if int(t[-1]) <= 2 else 2}"
+                   for t in self.trimestres[j]]
+        # Trimestres em ordem: cada período é um bloco contíguo, fechado pelo último trimestre
+        ultimo = [i for i in range(len(rotulos)) if i == len(rotulos) - 1 or rotulos[i + 1] != rotulos[i]]
+        return indices[ultimo], [rotulos[i] for i in ultimo]
+
+    def bits_janela(self, inicio=None, fim=None):
+        """Máscara uint64 com um bit por trimestre da janela."""
+        j = self.janela(inicio, fim)
+        largura = j.stop - j.start
+        return np.uint64(((1 << largura) - 1) << j.start)
+
+    def _grupos(self, por_uf, forma):
+        """(código do grupo por célula, número de grupos): UF do médico ou grupo único."""
+        if not por_uf:
+            return None, 1
+        if self.uf is None:
+            raise ValueError("A matriz não traz a UF dos médicos; republique os dados")
+        return np.broadcast_to(self.uf.astype(np.int64)[:, None], forma), len(self.ufs)
+
+    def codigos_categorias(self, categorias):
+        return np.array([self.categorias.index(c) for c in categorias if c in self.categorias], dtype=np.int8)
+
+    # --- Máscaras por médico ---
+
+    def no_painel(self, trimestre):
+        t = self.indice_trimestre(trimestre)
+        return (self.painel >> np.uint64(t)) & np.uint64(1) == 1
+
+    def no_mercado(self, trimestre):
+        return self.categoria[:, self.indice_trimestre(trimestre)] != AUSENTE
+
+    def painel_janela(self, inicio=None, fim=None):
+        """Bits do painel como matriz bool [médicos, trimestres da janela]."""
+        j = self.janela(inicio, fim)
+        return self._painel_colunas(np.arange(j.start, j.stop))
+
+    def _painel_colunas(self, colunas):
+        deslocamentos = np.asarray(colunas, dtype=np.uint64)
+        return (self.painel[:, None] >> deslocamentos[None, :]) & np.uint64(1) == 1
+
+    def sempre_no_painel(self, inicio=None, fim=None):
+        bits = self.bits_janela(inicio, fim)
+        return (self.painel & bits) == bits
+
+    def alguma_vez_no_painel(self, inicio=None, fim=None):
+        return (self.painel & self.bits_janela(inicio, fim)) != 0
+
+    def coorte(self, trimestre, categorias=None, no_painel=None):
+        """Médicos em ``categorias`` (todas, se None) no trimestre; ``no_painel`` filtra a flag."""
+        coluna = self.categoria[:, self.indice_trimestre(trimestre)]
+        if categorias is None:
+            mascara = coluna != AUSENTE
+        else:
+            mascara = np.isin(coluna, self.codigos_categorias(categorias))
+        if no_painel is not None:
+            mascara &= self.no_painel(trimestre) == bool(no_painel)
+        return mascara
+
+    # --- Agregados ---
+
+    def contagens(self, inicio=None, fim=None, universo='mercado', selecao=None, por_uf=False):
+        """Médicos por [categoria, trimestre da janela]; ``selecao`` restringe a uma coorte.
+
+        Com ``por_uf`` o resultado é [uf, categoria, trimestre].
+        """
+        if universo not in UNIVERSOS:
+            raise ValueError(f"Universo inválido: {universo!r} (use {', '.join(UNIVERSOS)})")
+        j = self.janela(inicio, fim)
+        bloco = self.categoria[:, j]
+        validos = bloco != AUSENTE
+        if universo == 'painel':
+            validos &= self.painel_janela(inicio, fim)
+        if selecao is not None:
+            validos &= selecao[:, None]
+        n_cat, largura = len(self.categorias), j.stop - j.start
+        grupo, n_grupos = self._grupos(por_uf, bloco.shape)
+        coluna = np.broadcast_to(np.arange(largura), bloco.shape)
+        chave = bloco[validos].astype(np.int64) * largura + coluna[validos]
+        if grupo is not None:
+            chave += grupo[validos] * (n_cat * largura)
+        contagens = np.bincount(chave, minlength=n_grupos * n_cat * largura).reshape(n_grupos, n_cat, largura)
+        return contagens if por_uf else contagens[0]
+
+    def cobertura(self, inicio=None, fim=None, selecao=None):
+        """Percentual de médicos no painel por [categoria, trimestre da janela]."""
+        mercado = self.contagens(inicio, fim, 'mercado', selecao)
+        painel = self.contagens(inicio, fim, 'painel', selecao)
+        return np.divide(painel * 100, mercado, out=np.zeros(mercado.shape), where=mercado > 0)
+
+    def transicoes(self, inicio=None, fim=None, selecao=None, por_uf=False, granularidade='trimestre'):
+        """Contagem [par, cat_source, cat_target, painel] entre períodos vizinhos da janela.
+
+        ``painel`` (0 = Não, 1 = Sim) é a flag no trimestre de destino, como no cubo do dash.
+        Com ``por_uf`` o resultado é [uf, par, cat_source, cat_target, painel]; com
+        ``granularidade`` 'semestre' ou 'ano' os pares ligam os períodos de ``periodos()``.
+        """
+        colunas, _ = self.periodos(inicio, fim, granularidade)
+        bloco = self.categoria[:, colunas]
+        n_cat, n_pares = len(self.categorias), max(len(colunas) - 1, 0)
+        src, tgt = bloco[:, :-1], bloco[:, 1:]
+        painel = self._painel_colunas(colunas[1:])
+        validos = (src != AUSENTE) & (tgt != AUSENTE)
+        if selecao is not None:
+            validos &= selecao[:, None]
+        grupo, n_grupos = self._grupos(por_uf, src.shape)
+        par = np.broadcast_to(np.arange(n_pares), src.shape)
+        chave = ((par.astype(np.int64) * n_cat + src) * n_cat + tgt) * 2 + painel
+        if grupo is not None:
+            chave = chave + grupo * (n_pares * n_cat * n_cat * 2)
+        valores = np.bincount(chave[validos], minlength=n_grupos * n_pares * n_cat * n_cat * 2)
+        valores = valores.reshape(n_grupos, n_pares, n_cat, n_cat, 2).astype(np.int32)
+        return valores if por_uf else valores[0]
+
+    def acrescentar(self, outra):
+        """Matriz com os trimestres de ``outra`` somados aos desta (modo incremental).
+
+        Os médicos são a união dos dois lados (os desta matriz primeiro, os novos no
+        fim); quem só aparece de um lado fica AUSENTE nos trimestres do outro.
+        """
+        from src.esquema import codificar_ufs, ordem_exibicao
+
+        repetidos = sorted(set(self.trimestres) & set(outra.trimestres))
+        if repetidos:
+            raise ValueError(f"Trimestres já presentes na matriz: {', '.join(repetidos)}")
+        trimestres = sorted(self.trimestres + outra.trimestres)
+        todas = self.categorias + [c for c in outra.categorias if c not in self.categorias]
+        categorias = [todas[i] for i in ordem_exibicao(todas)]
+
+        nossos, deles = np.asarray(self.crms, dtype=str), np.asarray(outra.crms, dtype=str)
+        crms = np.concatenate([nossos, deles[~np.isin(deles, nossos)]])
+        ordem = np.argsort(crms, kind='stable')
+        categoria = np.full((len(crms), len(trimestres)), AUSENTE, dtype=np.int8)
+        painel = np.zeros(len(crms), dtype=np.uint64)
+        for lado, crms_lado in ((self, nossos), (outra, deles)):
+            linhas = ordem[np.searchsorted(crms[ordem], crms_lado)]
+            colunas = [trimestres.index(t) for t in lado.trimestres]
+            posicao = np.array([categorias.index(c) for c in lado.categorias] + [AUSENTE], dtype=np.int8)
+            categoria[np.ix_(linhas, colunas)] = posicao[lado.categoria]  # AUSENTE (-1) cai no fim
+            for t, coluna in enumerate(colunas):
+                bit = (lado.painel >> np.uint64(t)) & np.uint64(1)
+                painel[linhas] |= bit << np.uint64(coluna)
+        uf, ufs = codificar_ufs(crms)
+        return MatrizJornada(categoria, painel, trimestres, categorias, crms.astype(object), uf, ufs)
+
+    def filtrar(self, mascara):
+        crms = self.crms[mascara] if self.crms is not None else None
+        uf = self.uf[mascara] if self.uf is not None else None
+        return MatrizJornada(self.categoria[mascara], self.painel[mascara], self.trimestres, self.categorias, crms,
+                             uf, self.ufs)
+
+    # --- Persistência ---
+
+    def arrays(self):
+        """Arrays para o artefato compartilhado (src/dados_compartilhados.py)."""
+        arrays = {'categoria': self.categoria, 'painel': self.painel}
+        if self.crms is not None:
+            arrays['crms'] = np.asarray(self.crms, dtype=str)
+        if self.uf is not None:
+            arrays['uf'] = self.uf
+        return arrays
+
+    def meta(self):
+        meta = {'trimestres': self.trimestres, 'categorias': self.categorias}
+        if self.ufs is not None:
+            meta['ufs'] = self.ufs
+        return meta
+
+    @classmethod
+    def de_artefato(cls, arrays, meta):
+        return cls(arrays['categoria'], arrays['painel'], meta['trimestres'], meta['categorias'], arrays.get('crms'),
+                   arrays.get('uf'), meta.get('ufs'))
+
+    def salvar(self, caminho=CAMINHO_MATRIZ):
+        temporario = caminho + '.tmp.npz'
+        extras = {'crms': np.asarray(self.crms, dtype=str)} if self.crms is not None else {}
+        if self.uf is not None:
+            extras.update(uf=self.uf, ufs=np.array(self.ufs, dtype=str))
+        np.savez(temporario, categoria=self.categoria, painel=self.painel,
+                 trimestres=np.array(self.trimestres, dtype=str), categorias=np.array(self.categorias, dtype=str),
+                 **extras)
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho=CAMINHO_MATRIZ):
+        with np.load(caminho) as dados:
+            crms = dados['crms'].astype(object) if 'crms' in dados.files else None
+            uf, ufs = (dados['uf'], dados['ufs'].tolist()) if 'uf' in dados.files else (None, None)
+            return cls(dados['categoria'], dados['painel'], dados['trimestres'].tolist(),
+                       dados['categorias'].tolist(), crms, uf, ufs)
@@ -0,0 +1,183 @@
+"""Instrumentação do servidor do dash: métricas no formato do Prometheus e perfis por amostragem.
+
+Sem dependências externas: um registro em memória (por processo) com gauges e
+histogramas, renderizado no formato texto do Prometheus pela rota
+``/metrics``. Cada worker do gunicorn tem o seu registro; as séries levam o rótulo
+``worker`` (pid) para que o Prometheus some ou compare os processos.
+
+O ``Amostrador`` é um profiler por amostragem opt-in: enquanto uma requisição
+marcada roda, uma thread lê a pilha da thread da requisição a cada poucos
+milissegundos (``sys._current_frames``) e acumula as pilhas no formato "folded"
+(uma linha ``f1;f2;f3 contagem``), que o flamegraph.pl e o speedscope abrem direto.
+"""
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_BYTES = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+PASTA_PERFIS = os.environ.get("JORNADA_PERFIS", "perfis")
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(pares):
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._trava = threading.Lock()
+
+    def linhas(self, fixos=()):
+        raise NotImplementedError
+
+    def renderizar(self, fixos=()):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}", *self.linhas(fixos)]
+
+
+class Gauge(Metrica):
+    """Valor instantâneo; ``funcao`` (opcional) devolve ``{rótulos: valor}`` no momento da coleta."""
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, funcao=None):
+        super().__init__(nome, ajuda)
+        self.valores = {}
+        self.funcao = funcao
+
+    def definir(self, valor, **rotulos):
+        with self._trava:
+            self.valores[tuple(sorted(rotulos.items()))] = valor
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        """Guarda a duração (s) da última execução do bloco."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.definir(time.perf_counter() - inicio, **rotulos)
+
+    def linhas(self, fixos=()):
+        valores = dict(self.valores)
+        if self.funcao is not None:
+            valores.update(self.funcao())
+        return [f"{self.nome}{_rotulos(fixos + r)} {v}" for r, v in sorted(valores.items())]
+
+
+class Histograma(Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, buckets=BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(sorted(rotulos.items()))
+        with self._trava:
+            contagens, soma, total = self.series.get(chave, ([0] * len(self.buckets), 0.0, 0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[i] += 1
+            self.series[chave] = (contagens, soma + valor, total + 1)
+
+    @contextmanager
+    def cronometrar(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def linhas(self, fixos=()):
+        linhas = []
+        for chave, (contagens, soma, total) in sorted(self.series.items()):
+            chave = fixos + chave
+            for limite, n in zip(self.buckets, contagens):
+                linhas.append(f"{self.nome}_bucket{_rotulos(chave + (('le', f'{limite:g}'),))} {n}")
+            linhas.append(f"{self.nome}_bucket{_rotulos(chave + (('le', '+Inf'),))} {total}")
+            linhas.append(f"{self.nome}_sum{_rotulos(chave)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(chave)} {total}")
+        return linhas
+
+
+class Registro:
+    def __init__(self, rotulos_fixos=None):
+        self.metricas = {}
+        self.rotulos_fixos = dict(rotulos_fixos or {})
+
+    def _registrar(self, metrica):
+        return self.metricas.setdefault(metrica.nome, metrica)
+
+    def gauge(self, nome, ajuda, funcao=None):
+        return self._registrar(Gauge(nome, ajuda, funcao))
+
+    def histograma(self, nome, ajuda, buckets=BUCKETS_LATENCIA):
+        return self._registrar(Histograma(nome, ajuda, buckets))
+
+    def renderizar(self):
+        fixos = tuple(sorted(self.rotulos_fixos.items()))
+        linhas = [linha for metrica in self.metricas.values() for linha in metrica.renderizar(fixos)]
+        return "\n".join(linhas) + "\n"
+
+
+def memoria_residente():
+    """RSS do processo em bytes (``/proc/self/statm``; pico do getrusage fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Amostrador:
+    """Amostra a pilha de uma thread em intervalos fixos até ``parar()``."""
+
+    def __init__(self, id_thread=None, intervalo=0.005):
+        self.id_thread = id_thread or threading.get_ident()
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+        return self.pilhas
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            if pilha:
+                self.pilhas[";".join(reversed(pilha))] += 1
+
+    def salvar(self, nome, pasta=PASTA_PERFIS):
+        """Grava as pilhas no formato folded e devolve o caminho."""
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{nome}.folded")
+        with open(caminho, "w", encoding="utf-8") as f:
+            for pilha, n in self.pilhas.most_common():
+                f.write(f"{pilha} {n}\n")
+        return caminho
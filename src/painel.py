@@ -0,0 +1,216 @@
+"""Normalização dos episódios do painel (PAINEL_FV_GERAL) e relatório de validação.
+
+A planilha do painel tem várias linhas por ``CRM LINK``, com episódios de
+inclusão/inativação repetidos, sobrepostos, fora de ordem e datas que não são
+datas. ``normalizar_painel`` resolve tudo numa passada vetorizada:
+
+1. datas convertidas em lote: cada valor distinto é interpretado uma vez
+   ('dd/mm/aaaa', 'aaaa-mm-dd', datas do Excel, números seriais) e o
+   resultado é espalhado pelos códigos do ``factorize``;
+2. episódios sem CRM, sem inclusão válida ou com inativação anterior à inclusão
+   são descartados;
+3. por médico, episódios repetidos, sobrepostos ou encostados (um dia de
+   diferença) viram um único intervalo.
+
+O resultado é a tabela mínima de intervalos ordenada por CRM e inclusão
+(``DT_INATIVACAO`` NaT = em aberto), e o ``RelatorioPainel`` conta o que foi
+corrigido ou descartado, com exemplos. Uma inativação preenchida mas ilegível
+continua tratada como episódio em aberto, como antes, e aparece no relatório.
+
+    python -m src.painel PAINEL_FV_GERAL.xlsx --mercado evolucao_cat_trimestral.xlsx
+"""
+import argparse
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+import pandas as pd
+
+CAMINHO_RELATORIO = 'relatorio_painel.json'
+COLUNAS_PAINEL = ['CRM LINK', 'DT_INCLUSAO', 'DT_INATIVACAO']
+ORIGEM_EXCEL = pd.Timestamp('1899-12-30')  # dia zero das datas seriais do Excel
+SERIAL_MAXIMO = (pd.Timestamp.max.date() - ORIGEM_EXCEL.date()).days - 1  # último serial que cabe em datetime64[ns]
+MAX_EXEMPLOS = 10
+PADRAO_ISO = re.compile(r'^\s*\d{4}-')  # '2023-03-01', '2023-03-01 10:00:00'
+
+
+@dataclass
+class RelatorioPainel:
+    linhas: int = 0
+    crm_vazio: int = 0
+    inclusao_ausente: int = 0
+    inclusao_invalida: int = 0
+    inativacao_invalida: int = 0
+    invertidos: int = 0
+    duplicados: int = 0
+    sobrepostos: int = 0
+    orfaos: int = 0
+    medicos: int = 0
+    intervalos: int = 0
+    exemplos: dict = field(default_factory=dict)
+
+    def resumo(self):
+        linhas = [f" {self.linhas} linhas no painel -> {self.intervalos} intervalos de {self.medicos} médicos."]
+        for campo, descricao in (
+            ('crm_vazio', 'sem CRM (descartadas)'),
+            ('inclusao_ausente', 'sem data de inclusão (descartadas)'),
+            ('inclusao_invalida', 'com inclusão ilegível (descartadas)'),
+            ('inativacao_invalida', 'com inativação ilegível (tratadas como em aberto)'),
+            ('invertidos', 'com inativação antes da inclusão (descartadas)'),
+            ('duplicados', 'episódios repetidos'),
+            ('sobrepostos', 'episódios sobrepostos ou contíguos unidos'),
+            ('orfaos', 'CRMs do painel fora da base de mercado'),
+        ):
+            valor = getattr(self, campo)
+            if valor:
+                exemplos = self.exemplos.get(campo)
+                sufixo = f" (ex.: {', '.join(map(str, exemplos))})" if exemplos else ""
+                linhas.append(f"   {valor} {descricao}{sufixo}")
+        return "\n".join(linhas)
+
+    def salvar(self, caminho=CAMINHO_RELATORIO):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(asdict(self), f, indent=2, ensure_ascii=False, default=str)
+        os.replace(temporario, caminho)
+
+
+def _converter_valor(valor):
+    if isinstance(valor, (int, float, np.integer, np.floating)) and not isinstance(valor, bool):
+        # Número serial do Excel; fora da faixa (ou NaN/inf) é data ilegível, não erro
+        if not 0 <= valor <= SERIAL_MAXIMO:
+            return pd.NaT
+        try:
+            return ORIGEM_EXCEL + pd.Timedelta(days=float(valor))
+        except (OverflowError, ValueError):
+            return pd.NaT
+    if isinstance(valor, str) and PADRAO_ISO.match(valor):
+        # ISO vem ano-mês-dia; com dayfirst, '2023-03-01' viraria 3 de janeiro
+        return pd.to_datetime(valor, yearfirst=True, dayfirst=False, errors='coerce')
+    return pd.to_datetime(valor, dayfirst=True, errors='coerce')
+
+
+def converter_datas(serie):
+    """(datetime64[ns] normalizado ao dia, máscara de valores preenchidos e ilegíveis).
+
+    Cada valor distinto é convertido uma única vez; datas distintas são poucas
+    perto do número de linhas, então o custo é linear no tamanho do painel.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        datas = serie.dt.normalize().to_numpy(dtype='datetime64[ns]')
+        return datas, np.zeros(len(serie), dtype=bool)
+    codigos, unicos = pd.factorize(serie)
+    convertidos = pd.to_datetime(pd.Series(unicos, dtype=object), format='%d/%m/%Y', errors='coerce')
+    faltam = convertidos.isna().to_numpy()
+    if faltam.any():
+        convertidos[faltam] = [_converter_valor(v) for v in unicos[faltam]]
+    tabela = np.append(pd.to_datetime(convertidos).dt.normalize().to_numpy(dtype='datetime64[ns]'),
+                       np.datetime64('NaT', 'ns'))
+    datas = tabela[codigos]  # código -1 (vazio) cai no NaT do fim
+    return datas, (codigos >= 0) & np.isnat(datas)
+
+
+def _exemplos(valores, mascara):
+    return pd.unique(np.asarray(valores, dtype=object)[mascara])[:MAX_EXEMPLOS].tolist()
+
+
+def _unir_episodios(crm, inclusao, inativacao, relatorio):
+    """Ordena por médico e inclusão e une episódios repetidos, sobrepostos ou contíguos."""
+    if not len(crm):
+        return pd.DataFrame({'CRM LINK': pd.Series(dtype=object), 'DT_INCLUSAO': pd.Series(dtype='datetime64[ns]'),
+                             'DT_INATIVACAO': pd.Series(dtype='datetime64[ns]')})
+    # Dias inteiros; episódio em aberto ganha um fim depois de qualquer data real
+    codigo_crm, crms = pd.factorize(crm, sort=True)
+    crms = np.asarray(crms, dtype=object)
+    dias_ini = inclusao.astype('datetime64[D]').astype(np.int64)
+    aberto = np.isnat(inativacao)
+    dias_fim = inativacao.astype('datetime64[D]').astype(np.int64)
+    sentinela = max(dias_ini.max(), dias_fim[~aberto].max(initial=dias_ini.max())) + 2
+    dias_fim = np.where(aberto, sentinela, dias_fim)
+    ordem = np.lexsort((dias_fim, dias_ini, codigo_crm))
+    codigo_crm, dias_ini, dias_fim = codigo_crm[ordem], dias_ini[ordem], dias_fim[ordem]
+
+    mesmo_medico = np.r_[False, codigo_crm[1:] == codigo_crm[:-1]]
+    repetido = mesmo_medico & np.r_[False, (dias_ini[1:] == dias_ini[:-1]) & (dias_fim[1:] == dias_fim[:-1])]
+    relatorio.duplicados = int(repetido.sum())
+    relatorio.exemplos['duplicados'] = _exemplos(crms[codigo_crm], repetido)
+
+    # Fim máximo acumulado dentro de cada médico: um degrau por médico maior que toda
+    # a faixa de datas isola os grupos num único maximum.accumulate
+    piso = dias_ini.min()
+    degrau = np.cumsum(~mesmo_medico) * (sentinela - piso + 2)
+    fim_acumulado = np.maximum.accumulate(degrau + dias_fim - piso) - degrau + piso
+    anterior = np.r_[piso - 2, fim_acumulado[:-1]]
+    # Novo intervalo quando muda o médico ou há pelo menos um dia de folga
+    novo = ~mesmo_medico | (dias_ini > anterior + 1)
+    inicios = np.flatnonzero(novo)
+    fins = np.maximum.reduceat(dias_fim, inicios)
+    relatorio.sobrepostos = len(dias_ini) - len(inicios) - relatorio.duplicados
+
+    return pd.DataFrame({
+        'CRM LINK': crms[codigo_crm[inicios]],
+        'DT_INCLUSAO': dias_ini[inicios].astype('datetime64[D]').astype('datetime64[ns]'),
+        'DT_INATIVACAO': np.where(fins == sentinela, np.datetime64('NaT', 'D'),
+                                  fins.astype('datetime64[D]')).astype('datetime64[ns]'),
+    }, columns=COLUNAS_PAINEL)
+
+
+def normalizar_painel(painel, crms_mercado=None):
+    """Intervalos mínimos do painel e o relatório de validação.
+
+    ``crms_mercado`` (opcional) identifica os CRMs órfãos, que saem da tabela.
+    """
+    relatorio = RelatorioPainel(linhas=len(painel))
+    exemplos = relatorio.exemplos
+
+    crm_bruto = painel['CRM LINK']
+    crm = crm_bruto.astype(str).str.strip().to_numpy(dtype=object)
+    crm_vazio = crm_bruto.isna().to_numpy() | (crm == '')
+    inclusao, inclusao_invalida = converter_datas(painel['DT_INCLUSAO'])
+    inativacao, inativacao_invalida = converter_datas(painel['DT_INATIVACAO'])
+
+    relatorio.crm_vazio = int(crm_vazio.sum())
+    relatorio.inclusao_invalida = int(inclusao_invalida.sum())
+    relatorio.inclusao_ausente = int((np.isnat(inclusao) & ~inclusao_invalida).sum())
+    relatorio.inativacao_invalida = int(inativacao_invalida.sum())
+    exemplos['inclusao_invalida'] = _exemplos(painel['DT_INCLUSAO'], inclusao_invalida)
+    exemplos['inativacao_invalida'] = _exemplos(painel['DT_INATIVACAO'], inativacao_invalida)
+
+    invertidos = inativacao < inclusao  # comparações com NaT dão False
+    relatorio.invertidos = int(invertidos.sum())
+    exemplos['invertidos'] = _exemplos(crm, invertidos)
+
+    validos = ~crm_vazio & ~np.isnat(inclusao) & ~invertidos
+    if crms_mercado is not None:
+        conhecidos = pd.Index(np.asarray(crms_mercado, dtype=str)).str.strip()
+        orfaos = validos & ~pd.Index(crm).isin(conhecidos)
+        relatorio.orfaos = len(pd.unique(crm[orfaos]))
+        exemplos['orfaos'] = _exemplos(crm, orfaos)
+        validos &= ~orfaos
+    intervalos = _unir_episodios(crm[validos], inclusao[validos], inativacao[validos], relatorio)
+    relatorio.intervalos = len(intervalos)
+    relatorio.medicos = int(intervalos['CRM LINK'].nunique())
+    relatorio.exemplos = {campo: valores for campo, valores in exemplos.items() if valores}
+    return intervalos, relatorio
+
+
+def main():
+    from src.carregador import ler_planilha
+
+    parser = argparse.ArgumentParser(description="Normaliza os episódios do painel e mostra o relatório de validação.")
+    parser.add_argument("painel", nargs="?", default="PAINEL_FV_GERAL.xlsx")
+    parser.add_argument("--mercado", help="planilha wide do mercado, para apontar CRMs órfãos")
+    parser.add_argument("--relatorio", default=CAMINHO_RELATORIO, help="onde gravar o relatório em JSON")
+    args = parser.parse_args()
+
+    crms_mercado = ler_planilha(args.mercado)['CRM LINK'].dropna().astype(str) if args.mercado else None
+    _, relatorio = normalizar_painel(ler_planilha(args.painel), crms_mercado)
+    relatorio.salvar(args.relatorio)
+    print(relatorio.resumo())
+    print(f" Relatório gravado em '{args.relatorio}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Ponto de entrada único do pipeline da jornada médica.
+
+Os estágios são declarados como um DAG (entradas -> saídas). Antes de rodar cada
+estágio calculamos uma impressão digital com o conteúdo das entradas, do código
+e dos parâmetros; se ela for igual à da última execução e as saídas existirem,
+o estágio é pulado. Assim, atualizar só o painel reprocessa só o que depende dele.
+
+    python -m src.pipeline                 # roda o que estiver desatualizado
+    python -m src.pipeline --forcar        # ignora o estado e roda tudo
+    python -m src.pipeline --ate painel    # para depois do estágio 'painel'
+    python -m src.pipeline --listar        # mostra os estágios e se estão em dia
+    python -m src.pipeline --streaming --formatos parquet csv.gz   # blocos + cópias para máquinas
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from graphlib import TopologicalSorter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARQUIVO_ESTADO = os.environ.get("JORNADA_ESTADO_PIPELINE", ".pipeline_estado.json")
+TAMANHO_BLOCO = 50000  # linhas por bloco do estágio 'painel' com --streaming
+
+
+@dataclass
+class Estagio:
+    nome: str
+    funcao: object
+    entradas: list
+    saidas: list
+    codigo: list = field(default_factory=list)
+    parametros: dict = field(default_factory=dict)
+
+
+# --- Funções dos estágios (importações adiadas para o --listar ser instantâneo) ---
+
+def _estagio_mercado(entradas, saidas, streaming=False, formatos=()):
+    from src.jornada_mercado_327 import gerar_base_longitudinal
+    return gerar_base_longitudinal(entradas[0], saidas[0], streaming=streaming, formatos=formatos)
+
+
+def _estagio_painel(entradas, saidas, streaming=False, formatos=()):
+    from src.tabelona_cat_trim_inclusao import gerar_tabela_final
+    return gerar_tabela_final(entradas[0], entradas[1], saidas[0], tamanho_bloco=TAMANHO_BLOCO if streaming else None,
+                              formatos=formatos)
+
+
+def _estagio_validacao(entradas, saidas):
+    # Relatório das datas ilegíveis, episódios repetidos/sobrepostos e CRMs órfãos do painel
+    from src.carregador import ler_planilha
+    from src.painel import normalizar_painel
+    crms_mercado = ler_planilha(entradas[1])["CRM LINK"].dropna().astype(str)
+    _, relatorio = normalizar_painel(ler_planilha(entradas[0]), crms_mercado)
+    relatorio.salvar(saidas[0])
+    print(relatorio.resumo())
+    return relatorio.linhas
+
+
+def _estagio_publicar(entradas, saidas):
+    # Cópia atômica (o dash nunca enxerga um arquivo pela metade) que leva junto o
+    # cache da tabela: o estágio 'matriz' não relê o XLSX que acabou de ser gravado
+    from src.carregador import copiar_planilha
+    copiar_planilha(entradas[0], saidas[0])
+
+
+def _estagio_matriz(entradas, saidas):
+    from src.carregador import ler_planilha
+    from src.esquema import codificar_jornada
+    from src.indice_medicos import indexar_episodios, salvar_episodios
+    from src.matriz_jornada import MatrizJornada
+    from src.tabelona_cat_trim_inclusao import ler_painel
+    matriz = MatrizJornada.de_tabela(codificar_jornada(ler_planilha(entradas[0])))
+    matriz.salvar(saidas[0])
+    salvar_episodios(indexar_episodios(ler_painel(entradas[1]), matriz.crms), saidas[1])
+    return matriz.n_medicos
+
+
+def _estagio_cobertura(entradas, saidas):
+    from src.carregador import ler_planilha
+    from src.cobertura import CuboCobertura
+    from src.esquema import codificar_jornada
+    cubo = CuboCobertura.de_tabela(codificar_jornada(ler_planilha(entradas[0])))
+    cubo.salvar(saidas[0])
+    return int(cubo.linhas.sum())
+
+
+def _estagio_artefato(entradas, saidas):
+    # Nova versão mapeada em memória; os workers do dash trocam sozinhos
+    from src.cobertura import CuboCobertura
+    from src.dados_compartilhados import publicar_matriz
+    from src.indice_medicos import carregar_episodios
+    from src.matriz_jornada import MatrizJornada
+    versao = publicar_matriz(MatrizJornada.carregar(entradas[0]), carregar_episodios(entradas[1]),
+                             pasta=os.path.dirname(saidas[0]), cobertura=CuboCobertura.carregar(entradas[2]))
+    print(f" [artefato] versão publicada: {versao}")
+
+
+def _com_formatos(caminho, formatos):
+    # Cópias extras declaradas como saídas: o estágio volta a rodar se alguma faltar
+    from src.saidas import caminhos_por_formato
+    return [caminho, *caminhos_por_formato(caminho, formatos)]
+
+
+def estagios_padrao(streaming=False, formatos=()):
+    formatos = list(formatos)
+    return [
+        Estagio("mercado", _estagio_mercado,
+                entradas=["evolucao_cat_trimestral.xlsx"],
+                saidas=_com_formatos("base_longitudinal_mercado.xlsx", formatos),
+                codigo=["src/jornada_mercado_327.py", "src/saidas.py"],
+                parametros={"streaming": streaming, "formatos": formatos}),
+        Estagio("painel", _estagio_painel,
+                entradas=["base_longitudinal_mercado.xlsx", "PAINEL_FV_GERAL.xlsx"],
+                saidas=_com_formatos("tabela_longitudinal_final.xlsx", formatos),
+                codigo=["src/tabelona_cat_trim_inclusao.py", "src/painel.py", "src/saidas.py"],
+                parametros={"streaming": streaming, "formatos": formatos}),
+        Estagio("validacao", _estagio_validacao,
+                entradas=["PAINEL_FV_GERAL.xlsx", "evolucao_cat_trimestral.xlsx"],
+                saidas=["relatorio_painel.json"],
+                codigo=["src/painel.py"]),
+        Estagio("publicar", _estagio_publicar,
+                entradas=["tabela_longitudinal_final.xlsx"],
+                saidas=["jornada_medicos_trimestral.xlsx"]),
+        Estagio("matriz", _estagio_matriz,
+                entradas=["jornada_medicos_trimestral.xlsx", "PAINEL_FV_GERAL.xlsx"],
+                saidas=["matriz_jornada.npz", "episodios_painel.npz"],
+                codigo=["src/esquema.py", "src/matriz_jornada.py", "src/indice_medicos.py", "src/painel.py"]),
+        Estagio("cobertura", _estagio_cobertura,
+                entradas=["jornada_medicos_trimestral.xlsx"],
+                saidas=["cobertura_cubo.npz"],
+                codigo=["src/esquema.py", "src/cobertura.py"]),
+        Estagio("artefato", _estagio_artefato,
+                entradas=["matriz_jornada.npz", "episodios_painel.npz", "cobertura_cubo.npz"],
+                saidas=[os.path.join(os.environ.get("JORNADA_ARTEFATOS", "artefatos"), "ATUAL")],
+                codigo=["src/dados_compartilhados.py", "src/matriz_jornada.py", "src/indice_medicos.py",
+                        "src/cobertura.py", "src/transicoes.py"]),
+    ]
+
+
+# --- Impressão digital e estado ---
+
+def _hash_arquivo(caminho, h):
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+
+
+def impressao_digital(estagio):
+    h = hashlib.sha256()
+    for caminho in estagio.entradas:
+        h.update(caminho.encode("utf-8"))
+        _hash_arquivo(caminho, h)
+    for caminho in ["src/carregador.py", *estagio.codigo]:
+        h.update(caminho.encode("utf-8"))
+        _hash_arquivo(os.path.join(RAIZ, caminho), h)
+    h.update(json.dumps(estagio.parametros, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def ler_estado(caminho=ARQUIVO_ESTADO):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def gravar_estado(estado, caminho=ARQUIVO_ESTADO):
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def ordenar(estagios):
+    """Ordem topológica a partir das entradas/saídas declaradas."""
+    produtor = {saida: e.nome for e in estagios for saida in e.saidas}
+    grafo = {e.nome: {produtor[x] for x in e.entradas if x in produtor} for e in estagios}
+    por_nome = {e.nome: e for e in estagios}
+    return [por_nome[nome] for nome in TopologicalSorter(grafo).static_order()]
+
+
+def esta_em_dia(estagio, estado):
+    if not all(os.path.exists(s) for s in estagio.saidas):
+        return False
+    anterior = estado.get(estagio.nome, {})
+    return anterior.get("impressao") == impressao_digital(estagio)
+
+
+def executar(estagios=None, forcar=False, ate=None, caminho_estado=ARQUIVO_ESTADO, progresso=None):
+    """Roda os estágios desatualizados, em ordem. Devolve o resumo de cada um.
+
+    ``progresso`` é um callback opcional chamado como ``progresso(nome, situacao)``.
+    """
+    estagios = ordenar(estagios or estagios_padrao())
+    estado = ler_estado(caminho_estado)
+    resumo = []
+
+    for estagio in estagios:
+        faltando = [x for x in estagio.entradas if not os.path.exists(x)]
+        if faltando:
+            raise FileNotFoundError(f"Estágio '{estagio.nome}': entrada(s) ausente(s): {', '.join(faltando)}")
+
+        if not forcar and esta_em_dia(estagio, estado):
+            print(f" [{estagio.nome}] em dia, pulando.")
+            resumo.append({"estagio": estagio.nome, "situacao": "pulado"})
+            if progresso:
+                progresso(estagio.nome, "pulado")
+        else:
+            if progresso:
+                progresso(estagio.nome, "rodando")
+            inicio = time.perf_counter()
+            linhas = estagio.funcao(estagio.entradas, estagio.saidas, **estagio.parametros)
+            duracao = time.perf_counter() - inicio
+            sufixo = f", {linhas} linhas" if linhas is not None else ""
+            print(f" [{estagio.nome}] concluído em {duracao:.1f}s{sufixo}.")
+
+            estado[estagio.nome] = {
+                "impressao": impressao_digital(estagio),
+                "duracao_s": round(duracao, 3),
+                "linhas": linhas,
+                "concluido_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            gravar_estado(estado, caminho_estado)
+            resumo.append({"estagio": estagio.nome, "situacao": "executado", "duracao_s": duracao, "linhas": linhas})
+            if progresso:
+                progresso(estagio.nome, "executado")
+
+        if estagio.nome == ate:
+            break
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roda o pipeline da jornada médica pulando estágios em dia.")
+    parser.add_argument("--forcar", action="store_true", help="reexecuta todos os estágios")
+    parser.add_argument("--ate", metavar="ESTAGIO", help="para depois deste estágio")
+    parser.add_argument("--streaming", action="store_true", help="ingestão, marcação do painel e gravação em blocos")
+    parser.add_argument("--formatos", nargs="*", default=[], choices=["parquet", "csv.gz"],
+                        help="cópias extras das tabelas longas além do XLSX")
+    parser.add_argument("--listar", action="store_true", help="lista os estágios e se estão em dia")
+    args = parser.parse_args()
+
+    estagios = estagios_padrao(streaming=args.streaming, formatos=args.formatos)
+    if args.listar:
+        estado = ler_estado()
+        for estagio in ordenar(estagios):
+            pronto = all(os.path.exists(x) for x in estagio.entradas) and esta_em_dia(estagio, estado)
+            print(f" {estagio.nome:<10} {'em dia' if pronto else 'desatualizado'}  -> {', '.join(estagio.saidas)}")
+        return
+
+    inicio = time.perf_counter()
+    executar(estagios, forcar=args.forcar, ate=args.ate)
+    print(f" Pipeline finalizado em {time.perf_counter() - inicio:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Renderização em lote dos gráficos de cobertura, em paralelo e incremental.
+
+Cada gráfico é um ``Trabalho``: os dados já agregados (poucas dezenas de números),
+o título e o nome do arquivo. A impressão digital de um trabalho combina esses
+dados, os parâmetros de saída (formato, dpi) e a versão do desenho
+(``VERSAO_DESENHO``); se ela bater com a registrada no manifesto da pasta e o
+arquivo existir, o gráfico é pulado. Os que faltam são distribuídos num pool de
+processos (o matplotlib não é thread-safe e cada gráfico é CPU puro).
+
+Formatos: ``png`` (um arquivo por dpi), ``svg`` e ``html`` (plotly interativo).
+
+Os recortes geram os trabalhos a partir do cubo de cobertura (src/cobertura.py):
+``por_categoria`` reproduz os gráficos de ``analise/barra_por_categoria.py``,
+``por_janela`` faz o mesmo restrito a uma janela de trimestres e ``por_uf`` repete
+os gráficos por categoria para cada estado (fatias por UF do cubo).
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+FORMATOS = ('png', 'svg', 'html')
+ARQUIVO_MANIFESTO = '.manifesto.json'
+VERSAO_DESENHO = 1  # incremente ao mudar o desenho: força a regeração de tudo
+CORES = {'Total na Categoria': '#a1c9f4', 'No Painel FV': '#2e7d32'}
+
+
+@dataclass
+class Trabalho:
+    nome: str
+    titulo: str
+    trimestres: list
+    total: list
+    painel: list
+    percentual: list
+    rotulo_total: str = 'Total na Categoria'
+    extras: dict = field(default_factory=dict)
+
+    def dados(self):
+        return {'titulo': self.titulo, 'trimestres': self.trimestres, 'total': self.total,
+                'painel': self.painel, 'percentual': [round(p, 4) for p in self.percentual],
+                'rotulo_total': self.rotulo_total, **self.extras}
+
+
+def saidas(formatos, dpis):
+    """Pares (extensão, dpi) pedidos; dpi só importa no PNG."""
+    for formato in formatos:
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato!r} (use {', '.join(FORMATOS)})")
+        if formato == 'png':
+            yield from (('png', dpi) for dpi in dpis)
+        else:
+            yield formato, None
+
+
+def nome_arquivo(trabalho, formato, dpi, varios_dpis):
+    sufixo = f"_{dpi}dpi" if formato == 'png' and varios_dpis else ""
+    return f"{trabalho.nome}{sufixo}.{formato}"
+
+
+def impressao_digital(trabalho, formato, dpi):
+    conteudo = json.dumps([VERSAO_DESENHO, formato, dpi, trabalho.dados()], sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def _desenhar_matplotlib(dados, caminho, formato, dpi):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    x = np.arange(len(dados['trimestres']))
+    largura = 0.4
+    fig, ax = plt.subplots(figsize=(15, 8))
+    for deslocamento, valores, rotulo in ((-largura / 2, dados['total'], dados['rotulo_total']),
+                                          (largura / 2, dados['painel'], 'No Painel FV')):
+        barras = ax.bar(x + deslocamento, valores, largura, label=rotulo,
+                        color=CORES.get(rotulo, CORES['Total na Categoria']))
+        ax.bar_label(barras, fmt='%.0f', fontsize=10, weight='bold', padding=3)
+    for i, (total, percentual) in enumerate(zip(dados['total'], dados['percentual'])):
+        ax.text(x=i, y=total * 1.05, s=f'{percentual:.1f}%', ha='center', fontsize=12, fontweight='bold', color='#c92a2a')
+
+    ax.set_title(dados['titulo'], fontsize=18, pad=20)
+    ax.set_xlabel('Trimestre', fontsize=12)
+    ax.set_ylabel('Número de Médicos', fontsize=12)
+    ax.set_xticks(x, dados['trimestres'], rotation=45, ha='right')
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda v, p: format(int(v), ',')))
+    ax.legend(title='Legenda', fontsize=11)
+    fig.tight_layout()
+    fig.savefig(caminho, dpi=dpi or 'figure', format=formato)
+    plt.close(fig)
+
+
+def _desenhar_html(dados, caminho):
+    import plotly.graph_objects as go
+
+    fig = go.Figure([
+        go.Bar(x=dados['trimestres'], y=dados['total'], name=dados['rotulo_total'],
+               marker_color=CORES['Total na Categoria'], text=dados['total'], textposition='outside'),
+        go.Bar(x=dados['trimestres'], y=dados['painel'], name='No Painel FV',
+               marker_color=CORES['No Painel FV'], text=dados['painel'], textposition='outside',
+               customdata=dados['percentual'], hovertemplate='%{y} médicos (%{customdata:.1f}%)<extra></extra>'),
+    ])
+    fig.update_layout(title_text=dados['titulo'], barmode='group', xaxis_title='Trimestre',
+                      yaxis_title='Número de Médicos', legend_title_text='Legenda')
+    fig.write_html(caminho, include_plotlyjs='cdn')
+
+
+def _renderizar(dados, caminho, formato, dpi):
+    """Executado nos processos do pool: grava num temporário e troca atomicamente."""
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    if formato == 'html':
+        _desenhar_html(dados, temporario)
+    else:
+        _desenhar_matplotlib(dados, temporario, formato, dpi)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _ler_manifesto(pasta):
+    try:
+        with open(os.path.join(pasta, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _gravar_manifesto(pasta, manifesto):
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def renderizar(trabalhos, pasta, formatos=('png',), dpis=(300,), processos=None, forcar=False):
+    """Gera os arquivos que faltam ou mudaram. Devolve ``(gerados, pulados)``."""
+    os.makedirs(pasta, exist_ok=True)
+    manifesto = {} if forcar else _ler_manifesto(pasta)
+    pendentes, pulados = [], []
+    for trabalho in trabalhos:
+        for formato, dpi in saidas(formatos, dpis):
+            arquivo = nome_arquivo(trabalho, formato, dpi, len(dpis) > 1)
+            impressao = impressao_digital(trabalho, formato, dpi)
+            if manifesto.get(arquivo) == impressao and os.path.exists(os.path.join(pasta, arquivo)):
+                pulados.append(arquivo)
+            else:
+                pendentes.append((arquivo, impressao, trabalho.dados(), formato, dpi))
+
+    gerados = []
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            futuros = {pool.submit(_renderizar, dados, os.path.join(pasta, arquivo), formato, dpi): (arquivo, impressao)
+                       for arquivo, impressao, dados, formato, dpi in pendentes}
+            for futuro in as_completed(futuros):
+                arquivo, impressao = futuros[futuro]
+                futuro.result()
+                manifesto[arquivo] = impressao
+                gerados.append(arquivo)
+                print(f" Gráfico salvo: '{os.path.join(pasta, arquivo)}'")
+    _gravar_manifesto(pasta, manifesto)
+    return sorted(gerados), sorted(pulados)
+
+
+# --- Recortes: trabalhos a partir do cubo de cobertura ---
+
+def por_categoria(cubo, prefixo='grafico_cobertura_categoria', janela=None):
+    """Um gráfico por categoria; ``janela`` = (inicio, fim) restringe os trimestres."""
+    indices = range(len(cubo.trimestres))
+    if janela is not None:
+        inicio, fim = (cubo.trimestres.index(t) if t else None for t in janela)
+        indices = indices[slice(inicio, None if fim is None else fim + 1)]
+    indices = list(indices)
+    for codigo, categoria in enumerate(cubo.categorias):
+        presentes = [i for i in indices if cubo.linhas[codigo][i] > 0]
+        if not presentes:
+            continue
+        yield Trabalho(
+            nome=f"{prefixo}_{categoria}",
+            titulo=f'Cobertura do Painel FV na Categoria {categoria}',
+            trimestres=[cubo.trimestres[i] for i in presentes],
+            total=[int(cubo.linhas[codigo][i]) for i in presentes],
+            painel=[int(cubo.linhas_painel[codigo][i]) for i in presentes],
+            percentual=[float(cubo.percentual[codigo][i]) for i in presentes],
+        )
+
+
+def por_janela(cubo, inicio, fim):
+    """Os mesmos gráficos por categoria, só com os trimestres de [inicio, fim]."""
+    for trabalho in por_categoria(cubo, prefixo=f'grafico_cobertura_{inicio}_{fim}_categoria', janela=(inicio, fim)):
+        trabalho.titulo += f' ({inicio} a {fim})'
+        yield trabalho
+
+
+def por_uf(cubo, ufs=None):
+    """Os gráficos por categoria de cada UF com médicos (ou só das ``ufs`` pedidas)."""
+    if cubo.linhas_uf is None:
+        raise ValueError("O cubo de cobertura não traz a dimensão de UF")
+    for codigo, uf in enumerate(cubo.ufs):
+        if (ufs and uf not in ufs) or not cubo.linhas_uf[codigo].any():
+            continue
+        for trabalho in por_categoria(cubo.recorte_uf([uf]), prefixo=f'grafico_cobertura_{uf}_categoria'):
+            trabalho.titulo += f' - {uf}'
+            yield trabalho
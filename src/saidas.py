@@ -0,0 +1,232 @@
+"""Gravação das tabelas do pipeline em blocos, com memória constante.
+
+Os estágios entregam a tabela em blocos (DataFrames) e cada bloco vai direto
+para um ou mais destinos, escolhidos pela extensão do arquivo:
+
+    .xlsx     openpyxl write-only (para quem abre no Excel)
+    .parquet  pyarrow ParquetWriter, um row group por bloco (opcional: precisa do pyarrow)
+    .csv.gz   CSV comprimido, acrescentado bloco a bloco
+
+Nenhum destino monta a tabela inteira na memória. Cada arquivo é gravado num
+temporário e trocado com ``os.replace`` só no fim, então quem lê nunca vê uma
+exportação pela metade; se o estágio falhar no meio, o temporário é descartado.
+``exportar`` só troca os destinos depois que todos os temporários fecharam bem,
+e sem nenhum bloco ainda grava arquivos vazios (o Parquet com esquema vazio).
+
+    with abrir('saida.parquet') as escritor:
+        for bloco in blocos:
+            escritor.escrever(bloco)
+
+    exportar(blocos, ['tabela.xlsx', 'tabela.parquet', 'tabela.csv.gz'])
+"""
+import gzip
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIVEL = True
+except ImportError:
+    PARQUET_DISPONIVEL = False
+
+TAMANHO_BLOCO = 50000
+# Sempre texto no Parquet: a categoria mistura 1..5 e "SEM CAT", e o primeiro bloco
+# (que fixa o esquema do arquivo) pode ter só números
+COLUNAS_TEXTO = ('CRM LINK', 'CATEGORIA', 'NO_PAINEL')
+
+
+class Escritor:
+    extensao = None
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.temporario = f"{caminho}.tmp{os.getpid()}{self.extensao}"
+        self.linhas = 0
+        self.iniciado = False
+
+    def escrever(self, bloco):
+        # Blocos vazios só contam para o cabeçalho/esquema, se vierem primeiro
+        if len(bloco) or not self.iniciado:
+            self._escrever(bloco)
+            self.iniciado = True
+        self.linhas += len(bloco)
+
+    def _escrever(self, bloco):
+        raise NotImplementedError
+
+    def _fechar(self):
+        raise NotImplementedError
+
+    def _vazio(self):
+        """Conteúdo do arquivo quando nenhum bloco chegou."""
+
+    def fechar(self):
+        """Termina o temporário, sem ainda trocar o destino."""
+        if not self.iniciado:
+            self._vazio()
+            self.iniciado = True
+        self._fechar()
+
+    def instalar(self):
+        os.replace(self.temporario, self.caminho)
+        return self.linhas
+
+    def concluir(self):
+        self.fechar()
+        return self.instalar()
+
+    def cancelar(self):
+        try:
+            self._fechar()
+        finally:
+            if os.path.exists(self.temporario):
+                os.remove(self.temporario)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastro):
+        if tipo is None:
+            self.concluir()
+        else:
+            self.cancelar()
+        return False
+
+
+class EscritorXlsx(Escritor):
+    extensao = '.xlsx'
+
+    def __init__(self, caminho):
+        import openpyxl
+
+        super().__init__(caminho)
+        self.livro = openpyxl.Workbook(write_only=True)
+        self.planilha = self.livro.create_sheet()
+
+    def _escrever(self, bloco):
+        if not self.iniciado:
+            self.planilha.append(list(bloco.columns))
+        bloco = bloco.astype(object).where(bloco.notna(), None)
+        for linha in bloco.itertuples(index=False, name=None):
+            self.planilha.append(linha)
+
+    def _fechar(self):
+        if self.livro is not None:
+            self.livro.save(self.temporario)
+            self.livro = None
+
+
+def _como_texto(serie):
+    """Coluna como texto; números inteiros viram '1' (não '1.0') e vazios continuam vazios."""
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(serie):
+        numeros = serie
+    else:
+        numeros = pd.to_numeric(serie.mask(serie.map(type) == str), errors='coerce')
+    inteiros = (numeros.notna() & (numeros % 1 == 0)).to_numpy(dtype=bool)
+    texto = serie.astype('string')
+    texto[inteiros] = numeros[inteiros].astype('int64').astype('string')
+    return texto
+
+
+class EscritorParquet(Escritor):
+    extensao = '.parquet'
+
+    def __init__(self, caminho):
+        if not PARQUET_DISPONIVEL:
+            raise RuntimeError("Exportar Parquet requer o pacote 'pyarrow'")
+        super().__init__(caminho)
+        self.escritor = None
+        self.colunas_texto = None
+
+    def _escrever(self, bloco):
+        if self.escritor is None:
+            # Esquema definido uma vez: COLUNAS_TEXTO e colunas de tipos misturados viram texto
+            self.colunas_texto = [c for c in bloco.columns if c in COLUNAS_TEXTO or bloco[c].dtype == object]
+        bloco = bloco.assign(**{coluna: _como_texto(bloco[coluna]) for coluna in self.colunas_texto})
+        if self.escritor is None:
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            self.escritor = pq.ParquetWriter(self.temporario, tabela.schema)
+        else:
+            # Todo bloco seguinte é convertido para o esquema do primeiro
+            tabela = pa.Table.from_pandas(bloco, schema=self.escritor.schema, preserve_index=False)
+        self.escritor.write_table(tabela)
+
+    def _vazio(self):
+        pq.write_table(pa.table({}), self.temporario)
+
+    def _fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+            self.escritor = None
+
+
+class EscritorCsvGz(Escritor):
+    extensao = '.csv.gz'
+
+    def __init__(self, caminho):
+        super().__init__(caminho)
+        self.arquivo = gzip.open(self.temporario, 'wt', encoding='utf-8', newline='')
+
+    def _escrever(self, bloco):
+        bloco.to_csv(self.arquivo, header=not self.iniciado, index=False)
+
+    def _fechar(self):
+        if not self.arquivo.closed:
+            self.arquivo.close()
+
+
+ESCRITORES = (EscritorCsvGz, EscritorParquet, EscritorXlsx)
+FORMATOS = tuple(e.extensao.lstrip('.') for e in ESCRITORES)
+
+
+def abrir(caminho):
+    """Escritor adequado à extensão do arquivo."""
+    for classe in ESCRITORES:
+        if caminho.endswith(classe.extensao):
+            return classe(caminho)
+    raise ValueError(f"Formato de saída não suportado: {caminho!r} (use {', '.join(FORMATOS)})")
+
+
+def caminhos_por_formato(caminho, formatos):
+    """``base.xlsx`` + formatos ('parquet', 'csv.gz') -> ``[base.parquet, base.csv.gz]``."""
+    base = os.path.splitext(caminho)[0]
+    for formato in formatos:
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de saída inválido: {formato!r} (use {', '.join(FORMATOS)})")
+    return [f"{base}.{formato}" for formato in formatos]
+
+
+def em_blocos(df, tamanho=TAMANHO_BLOCO):
+    """Fatias consecutivas de um DataFrame já em memória (views, sem cópia)."""
+    for inicio in range(0, max(len(df), 1), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
+
+
+def exportar(blocos, caminhos):
+    """Grava cada bloco em todos os destinos; devolve o total de linhas.
+
+    Os destinos só são trocados depois que todos os temporários fecharam sem erro.
+    """
+    escritores = []
+    try:
+        for caminho in caminhos:
+            escritores.append(abrir(caminho))
+        for bloco in blocos:
+            for escritor in escritores:
+                escritor.escrever(bloco)
+        for escritor in escritores:
+            escritor.fechar()
+    except BaseException:
+        for escritor in escritores:
+            escritor.cancelar()
+        raise
+    for posicao, escritor in enumerate(escritores):
+        try:
+            escritor.instalar()
+        except BaseException:
+            for restante in escritores[posicao:]:
+                restante.cancelar()
+            raise
+    return escritores[0].linhas if escritores else 0
@@ -0,0 +1,147 @@
+"""Gerador determinístico de dados sintéticos no formato das planilhas reais.
+
+As planilhas verdadeiras não podem sair da rede, então benchmarks e testes
+manuais usam dados gerados aqui, com o mesmo formato:
+
+    mercado (wide)  CRM LINK, 'TRIM MOV 03/23', 'TRIM MOV 06/23', ...   (= evolucao_cat_trimestral)
+    painel          CRM LINK, DT_INCLUSAO, DT_INATIVACAO                 (= PAINEL_FV_GERAL)
+
+A categoria de cada médico evolui por uma cadeia de Markov (a maioria mantém a
+categoria, alguns sobem ou descem, alguns entram e saem do mercado). Médicos de
+categorias melhores têm mais chance de estar no painel, e cada um pode ter vários
+episódios de inclusão/inativação, o último possivelmente em aberto. Uma fração
+``anomalias`` dos episódios vem com os defeitos da planilha real (repetidos,
+sobrepostos, inativação antes da inclusão, data ilegível), para a normalização
+do painel passar por todos os caminhos. A mesma semente gera sempre os mesmos dados.
+
+    python -m src.sintetico --medicos 100000 --trimestres 12 --pasta dados_sinteticos
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.esquema import UFS
+from src.jornada_mercado_327 import colunas_de_trimestre, parse_trimestre
+
+CATEGORIAS = np.array([1, 2, 3, 4, 5])
+# Probabilidade de entrar no painel por categoria (1 é a melhor)
+PROB_PAINEL = np.array([0.6, 0.45, 0.3, 0.2, 0.1])
+PROB_SEM_CAT = 0.03
+PROB_SAIR = 0.02
+PROB_MUDAR = 0.12
+TAXA_ANOMALIAS = 0.02  # fração dos episódios com algum defeito
+DATA_ILEGIVEL = '31/02/2023'
+
+
+def colunas_trimestres(n_trimestres, inicio='2019Q1'):
+    """Cabeçalhos 'TRIM MOV mm/yy' (mês final de cada trimestre) e os períodos correspondentes."""
+    periodos = pd.period_range(inicio, periods=n_trimestres, freq='Q')
+    return [f"TRIM MOV {p.end_time.month:02d}/{p.year % 100:02d}" for p in periodos], periodos
+
+
+def gerar_mercado(n_medicos, n_trimestres, semente=0, inicio='2019Q1'):
+    """Planilha wide: uma linha por médico, uma coluna de categoria por trimestre."""
+    rng = np.random.default_rng(semente)
+    colunas, _ = colunas_trimestres(n_trimestres, inicio)
+    # Código 0 = fora do mercado; 1..5 = categoria
+    atual = rng.choice(len(CATEGORIAS), size=n_medicos, p=[0.1, 0.15, 0.25, 0.25, 0.25]) + 1
+    atual[rng.random(n_medicos) < 0.1] = 0
+    # CRM LINK como nas planilhas reais: UF emissora + número (ex.: 'AL1098')
+    ufs = np.array(UFS)[rng.integers(0, len(UFS), n_medicos)]
+    dados = {'CRM LINK': np.char.add(ufs, np.arange(n_medicos).astype(str))}
+    for coluna in colunas:
+        sorteio = rng.random(n_medicos)
+        passo = rng.choice([-1, 1], size=n_medicos)
+        muda = (atual > 0) & (sorteio < PROB_MUDAR)
+        atual = np.where(muda, np.clip(atual + passo, 1, len(CATEGORIAS)), atual)
+        atual = np.where((atual > 0) & (sorteio > 1 - PROB_SAIR), 0, atual)
+        atual = np.where((atual == 0) & (sorteio < 0.05), rng.integers(3, len(CATEGORIAS) + 1, n_medicos), atual)
+        valores = atual.astype(object)
+        valores[atual == 0] = np.nan
+        valores[(atual > 0) & (rng.random(n_medicos) < PROB_SEM_CAT)] = 'SEM CAT'
+        dados[coluna] = valores
+    return pd.DataFrame(dados)
+
+
+def gerar_painel(mercado, semente=0, max_episodios=3, anomalias=TAXA_ANOMALIAS):
+    """Episódios de painel coerentes com as categorias da planilha wide."""
+    rng = np.random.default_rng(semente + 1)
+    colunas = colunas_de_trimestre(mercado.columns)
+    periodos = sorted(parse_trimestre(c).to_period('Q') for c in colunas)
+    inicio, fim = periodos[0].start_time, periodos[-1].end_time
+
+    # Melhor categoria já atingida define a chance de entrar no painel
+    numericas = mercado[colunas].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    melhor = np.where(np.isnan(numericas), len(CATEGORIAS), numericas).min(axis=1).astype(int)
+    prob = PROB_PAINEL[melhor - 1]
+    n_episodios = np.where(rng.random(len(mercado)) < prob, rng.integers(1, max_episodios + 1, len(mercado)), 0)
+
+    # Uma linha por episódio; ``ordem`` é a posição do episódio na história do médico
+    medicos = np.repeat(np.arange(len(mercado)), n_episodios)
+    primeiros = np.repeat(np.cumsum(n_episodios) - n_episodios, n_episodios)
+    ordem = np.arange(len(medicos)) - primeiros
+    dias_total = (fim - inicio).days
+    # Episódios em fatias sucessivas do período, sem sobreposição entre si
+    fatia = dias_total / np.repeat(n_episodios, n_episodios)
+    inclusao = inicio + pd.to_timedelta((ordem + rng.random(len(medicos)) * 0.5) * fatia, unit='D')
+    duracao = pd.to_timedelta(rng.random(len(medicos)) * 0.5 * fatia, unit='D')
+    ultimo = ordem == np.repeat(n_episodios, n_episodios) - 1
+    inativacao = pd.Series(inclusao + duracao).dt.normalize()
+    inativacao[ultimo & (rng.random(len(medicos)) < 0.6)] = pd.NaT
+
+    painel = pd.DataFrame({
+        'CRM LINK': mercado['CRM LINK'].to_numpy()[medicos],
+        'DT_INCLUSAO': pd.Series(inclusao).dt.normalize(),
+        'DT_INATIVACAO': inativacao,
+    })
+    return _com_anomalias(painel, anomalias, rng)
+
+
+def _com_anomalias(painel, taxa, rng):
+    # Cada episódio sorteado recebe um dos quatro defeitos, em partes iguais
+    tipo = np.where(rng.random(len(painel)) < taxa, rng.integers(0, 4, len(painel)), -1)
+    if not (tipo >= 0).any():
+        return painel
+    repetidos = painel[tipo == 0]
+    sobrepostos = painel[tipo == 1].assign(DT_INCLUSAO=lambda d: d['DT_INCLUSAO'] + pd.Timedelta(days=1),
+                                           DT_INATIVACAO=lambda d: d['DT_INATIVACAO'] + pd.Timedelta(days=30))
+    painel = painel.copy()
+    painel.loc[tipo == 2, 'DT_INATIVACAO'] = painel.loc[tipo == 2, 'DT_INCLUSAO'] - pd.Timedelta(days=30)
+    painel['DT_INCLUSAO'] = painel['DT_INCLUSAO'].astype(object)
+    painel.loc[tipo == 3, 'DT_INCLUSAO'] = DATA_ILEGIVEL
+    # As cópias ficam logo depois do episódio original, como na planilha
+    return pd.concat([painel, repetidos, sobrepostos]).sort_index(kind='stable').reset_index(drop=True)
+
+
+def gravar(mercado, painel, pasta):
+    """Grava as duas planilhas com os nomes esperados pelo pipeline."""
+    from src.carregador import salvar_planilha
+
+    os.makedirs(pasta, exist_ok=True)
+    # Datas como texto 'dd/mm/aaaa'; as ilegíveis já são texto e passam como estão
+    formatar = lambda v: v.strftime('%d/%m/%Y') if isinstance(v, pd.Timestamp) else v
+    painel = painel.assign(DT_INCLUSAO=painel['DT_INCLUSAO'].map(formatar),
+                           DT_INATIVACAO=painel['DT_INATIVACAO'].map(formatar))
+    salvar_planilha(mercado, os.path.join(pasta, 'evolucao_cat_trimestral.xlsx'))
+    salvar_planilha(painel, os.path.join(pasta, 'PAINEL_FV_GERAL.xlsx'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera planilhas sintéticas de mercado e painel.")
+    parser.add_argument("--medicos", type=int, default=10000)
+    parser.add_argument("--trimestres", type=int, default=8)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--anomalias", type=float, default=TAXA_ANOMALIAS, help="fração de episódios com defeito")
+    parser.add_argument("--pasta", default="dados_sinteticos")
+    args = parser.parse_args()
+
+    mercado = gerar_mercado(args.medicos, args.trimestres, args.semente)
+    painel = gerar_painel(mercado, args.semente, anomalias=args.anomalias)
+    gravar(mercado, painel, args.pasta)
+    print(f" {len(mercado)} médicos x {args.trimestres} trimestres e {len(painel)} episódios em '{args.pasta}'.")
+
+
+if __name__ == "__main__":
+    main()
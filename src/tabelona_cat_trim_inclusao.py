@@ -1,63 +1,94 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
-
-# Função robusta que converte trimestre (string ou Timestamp) para intervalo de datas
-def trimestre_para_intervalo(trimestre):
-    if isinstance(trimestre, pd.Timestamp) or isinstance(trimestre, datetime):
-        ano = trimestre.year
-        mes = trimestre.month
-        tri = (mes - 1) // 3 + 1
-    elif isinstance(trimestre, str):
-        try:
-            ano, tri = trimestre.split("-T")
-            ano = int(ano)
-            tri = int(tri)
-        except:
-            raise ValueError(f"Formato inválido de trimestre: {trimestre}")
-    else:
-        raise ValueError(f"Tipo de dado inesperado: {type(trimestre)}")
-
-    mes_inicio = 1 + (tri - 1) * 3
-    mes_fim = mes_inicio + 2
-    data_inicio = pd.Timestamp(ano, mes_inicio, 1)
-    if mes_fim == 12:
-        data_fim = pd.Timestamp(ano, mes_fim, 31)
-    else:
-        data_fim = pd.Timestamp(ano, mes_fim + 1, 1) - pd.Timedelta(days=1)
-    return data_inicio, data_fim
-
-# Leitura dos arquivos
-base_mercado = pd.read_excel("base_longitudinal_mercado.xlsx")
-painel = pd.read_excel("PAINEL_FV_GERAL.xlsx")
-
-# Conversão de datas
-painel["DT_INCLUSAO"] = pd.to_datetime(painel["DT_INCLUSAO"], dayfirst=True, errors='coerce')
-painel["DT_INATIVACAO"] = pd.to_datetime(painel["DT_INATIVACAO"], dayfirst=True, errors='coerce')
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.carregador import ler_planilha, ler_planilha_em_blocos, salvar_planilha
+from src.painel import normalizar_painel
+from src.saidas import caminhos_por_formato, exportar
+
+# Marca, para cada par (médico, trimestre), se havia algum episódio de painel ativo no trimestre.
+# Em vez de filtrar o painel linha a linha, junta todos os pares com os episódios do mesmo
+# CRM de uma só vez e testa a sobreposição dos intervalos de forma vetorizada.
+def marcar_presenca_no_painel(base_mercado, painel, hoje=None):
+    if hoje is None:
+        hoje = pd.Timestamp.today()
+
+    # Episódios normalizados uma única vez: inativação em aberto significa "hoje"
+    episodios = painel[["CRM LINK", "DT_INCLUSAO", "DT_INATIVACAO"]].copy()
+    episodios["DT_INATIVACAO"] = episodios["DT_INATIVACAO"].fillna(hoje)
+    # Inclusão sem data nunca satisfaz a comparação (mesmo resultado "Não" de antes)
+    episodios = episodios.dropna(subset=["DT_INCLUSAO"])
+    episodios = episodios.sort_values(["CRM LINK", "DT_INCLUSAO"])
+
+    # Intervalo [início, fim] de cada trimestre distinto: o texto é interpretado uma vez
+    # por trimestre (são poucos) e levado aos pares (médico, trimestre) pela junção
+    pares = base_mercado[["CRM LINK", "TRIMESTRE"]].drop_duplicates()
+    trimestres = pd.Series(pares["TRIMESTRE"].unique())
+    periodos = pd.PeriodIndex(trimestres, freq="Q")
+    limites = pd.DataFrame({
+        "TRIMESTRE": trimestres,
+        "INICIO_TRIM": periodos.start_time,
+        "FIM_TRIM": periodos.end_time.normalize(),
+    })
+    pares = pares.merge(limites, on="TRIMESTRE", how="left")
+
+    cruzado = pares.merge(episodios, on="CRM LINK", how="inner")
+    sobrepoe = (cruzado["DT_INCLUSAO"] <= cruzado["FIM_TRIM"]) & (cruzado["DT_INATIVACAO"] >= cruzado["INICIO_TRIM"])
+    presentes = cruzado.loc[sobrepoe, ["CRM LINK", "TRIMESTRE"]].drop_duplicates()
+    presentes["NO_PAINEL"] = "Sim"
+
+    resultado = base_mercado.drop(columns=["NO_PAINEL"], errors="ignore").merge(
+        presentes, on=["CRM LINK", "TRIMESTRE"], how="left"
+    )
+    resultado["NO_PAINEL"] = resultado["NO_PAINEL"].fillna("Não")
+    resultado.index = base_mercado.index
+    return resultado
+
+ARQUIVO_MERCADO = "base_longitudinal_mercado.xlsx"
+ARQUIVO_PAINEL = "PAINEL_FV_GERAL.xlsx"
+ARQUIVO_SAIDA = "tabela_longitudinal_final.xlsx"
+
+# Leitura do painel já normalizado (src/painel.py): datas convertidas em lote e um
+# intervalo por episódio distinto de cada médico, sem repetidos nem sobreposições
+def ler_painel(caminho=ARQUIVO_PAINEL):
+    intervalos, _ = normalizar_painel(ler_planilha(caminho))
+    return intervalos
 
 # ✅ Converter coluna TRIMESTRE para formato YYYYQn
-base_mercado["TRIMESTRE"] = pd.to_datetime(base_mercado["TRIMESTRE"], errors='coerce')
-base_mercado["TRIMESTRE"] = base_mercado["TRIMESTRE"].dt.to_period("Q").astype(str)
-
-# Função para verificar se o médico estava no painel no trimestre
-def verificar_presenca_no_painel(crm, trimestre):
-    inicio_trim, fim_trim = trimestre_para_intervalo(trimestre)
-    entradas_medico = painel[painel["CRM LINK"] == crm]
-    for _, row in entradas_medico.iterrows():
-        dt_in = row["DT_INCLUSAO"]
-        dt_out = row["DT_INATIVACAO"]
-        if pd.isnull(dt_out):
-            dt_out = pd.Timestamp.today()
-        if dt_in <= fim_trim and dt_out >= inicio_trim:
-            return "Sim"
-    return "Não"
-
-# Aplicar a lógica à base de mercado
-base_mercado["NO_PAINEL"] = base_mercado.apply(
-    lambda row: verificar_presenca_no_painel(row["CRM LINK"], row["TRIMESTRE"]), axis=1
-)
-
-# Exportar
-base_mercado.to_excel("tabela_longitudinal_final.xlsx", index=False)
-
-print(" Arquivo gerado com sucesso: tabela_longitudinal_final.xlsx")
+def padronizar_trimestre(base_mercado):
+    base_mercado["TRIMESTRE"] = pd.to_datetime(base_mercado["TRIMESTRE"], errors='coerce')
+    base_mercado["TRIMESTRE"] = base_mercado["TRIMESTRE"].dt.to_period("Q").astype(str)
+    return base_mercado
+
+# Com `tamanho_bloco`, leitura, marcação e gravação andam bloco a bloco: cada fatia da base
+# de mercado sai do XLSX (ler_planilha_em_blocos), é cruzada com o painel e vai direto para
+# os escritores (src/saidas.py). Só o painel normalizado fica inteiro em memória — ele é
+# necessário em todo bloco e cresce com os episódios, não com a base de mercado.
+# `formatos` acrescenta cópias 'parquet'/'csv.gz' ao lado do XLSX.
+def gerar_tabela_final(entrada_mercado=ARQUIVO_MERCADO, entrada_painel=ARQUIVO_PAINEL, saida=ARQUIVO_SAIDA,
+                       tamanho_bloco=None, formatos=()):
+    painel = ler_painel(entrada_painel)
+    extras = caminhos_por_formato(saida, formatos)
+
+    if tamanho_bloco:
+        hoje = pd.Timestamp.today()  # a mesma data para todos os blocos
+        blocos = (
+            marcar_presenca_no_painel(padronizar_trimestre(bloco), painel, hoje)
+            for bloco in ler_planilha_em_blocos(entrada_mercado, tamanho_bloco)
+        )
+        return exportar(blocos, [saida, *extras])
+
+    base_mercado = padronizar_trimestre(ler_planilha(entrada_mercado))
+
+    # Aplicar a lógica à base de mercado (uma única junção em lote)
+    base_mercado = marcar_presenca_no_painel(base_mercado, painel)
+
+    # Exportar
+    salvar_planilha(base_mercado, saida, extras)
+    return len(base_mercado)
+
+if __name__ == "__main__":
+    gerar_tabela_final()
+    print(f" Arquivo gerado com sucesso: {ARQUIVO_SAIDA}")
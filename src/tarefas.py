@@ -0,0 +1,302 @@
+"""Fila local de tarefas de reprocessamento, em disco e em processos separados.
+
+Quando planilhas novas chegam pelo dash, o worker web só grava os arquivos numa
+pasta da tarefa e dispara um processo ``python -m src.tarefas executar <id>``; ele
+nunca espera o reprocessamento. Cada tarefa vive em ``PASTA_TAREFAS/<id>/``:
+
+    estado.json   situação, estágios do pipeline, erro, horários e pid do executor
+    entradas/     planilhas recebidas (evolucao_cat_trimestral.xlsx, PAINEL_FV_GERAL.xlsx)
+    preparo/      cópia de trabalho onde o pipeline roda (apagada ao final)
+    saida.log     saída do pipeline
+
+O executor pega uma trava de arquivo (``.trava``) antes de começar: com vários
+workers do gunicorn enfileirando ao mesmo tempo, as tarefas rodam uma de cada vez,
+na ordem em que conseguem a trava. O pipeline (src/pipeline.py) roda primeiro em
+``preparo/``, sobre as planilhas recebidas, as atuais que não foram substituídas,
+as saídas atuais e o estado do pipeline: só os estágios afetados pelas planilhas
+novas rodam. Só se todos passarem as planilhas e as saídas refeitas vão para o
+lugar com ``os.replace``, e o estágio ``artefato`` publica a nova versão de dados;
+os workers do dash trocam de versão sozinhos. Uma planilha que falhe na validação
+nunca substitui as entradas em uso.
+
+Situações: ``na_fila`` -> ``rodando`` -> ``concluida`` | ``erro``. Uma tarefa
+"rodando" cujo processo morreu (inclusive um zumbi ainda não colhido) é marcada
+como erro na próxima leitura.
+
+Uma tarefa de republicação (``enfileirar_republicacao``, usada pelo gatilho
+administrativo do dash) não traz planilhas: roda no lugar os estágios
+desatualizados e publica uma nova versão mesmo que o ``artefato`` estivesse em dia.
+
+    python -m src.tarefas listar
+    python -m src.tarefas executar <id>
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+
+PASTA_TAREFAS = os.environ.get("JORNADA_TAREFAS", "tarefas")
+ARQUIVO_TRAVA = ".trava"
+ENTRADAS_ACEITAS = ("evolucao_cat_trimestral.xlsx", "PAINEL_FV_GERAL.xlsx")
+FINAIS = ("concluida", "erro")
+
+# Executores disparados por este processo (para colher os que terminaram)
+_processos = []
+
+
+def _caminho(id_tarefa, *partes, pasta=PASTA_TAREFAS):
+    return os.path.join(pasta, id_tarefa, *partes)
+
+
+def ler(id_tarefa, pasta=PASTA_TAREFAS):
+    with open(_caminho(id_tarefa, "estado.json", pasta=pasta), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _gravar(estado, pasta=PASTA_TAREFAS):
+    caminho = _caminho(estado["id"], "estado.json", pasta=pasta)
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(estado, f, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def _atualizar(id_tarefa, pasta=PASTA_TAREFAS, **campos):
+    estado = ler(id_tarefa, pasta)
+    estado.update(campos)
+    _gravar(estado, pasta)
+    return estado
+
+
+def _colher():
+    # Executores deste processo que já terminaram deixam de ser zumbis
+    global _processos
+    _processos = [p for p in _processos if p.poll() is None]
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # Morto (SIGKILL, OOM) mas ainda não colhido pelo pai: zumbi não conta como vivo
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True  # sem /proc: fica o resultado do kill
+
+
+def _criar(arquivos, pasta, **campos):
+    id_tarefa = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(_caminho(id_tarefa, "entradas", pasta=pasta))
+    for nome, conteudo in arquivos.items():
+        with open(_caminho(id_tarefa, "entradas", nome, pasta=pasta), "wb") as f:
+            f.write(conteudo)
+    _gravar({"id": id_tarefa, "situacao": "na_fila", "arquivos": sorted(arquivos), "estagios": {},
+             "erro": None, "criada_em": time.strftime("%Y-%m-%d %H:%M:%S"), "pid": None, **campos}, pasta)
+    return id_tarefa
+
+
+def enfileirar(arquivos, pasta=PASTA_TAREFAS, iniciar=True):
+    """Cria uma tarefa com ``{nome da planilha: bytes}`` e dispara o executor. Devolve o id."""
+    desconhecidos = sorted(set(arquivos) - set(ENTRADAS_ACEITAS))
+    if desconhecidos or not arquivos:
+        raise ValueError(f"Envie {' e/ou '.join(ENTRADAS_ACEITAS)} (recebido: {', '.join(desconhecidos) or 'nada'})")
+    id_tarefa = _criar(arquivos, pasta)
+    if iniciar:
+        disparar(id_tarefa, pasta)
+    return id_tarefa
+
+
+def enfileirar_republicacao(pasta=PASTA_TAREFAS, iniciar=True):
+    """Tarefa sem planilhas: atualiza o que estiver desatualizado e publica de novo."""
+    id_tarefa = _criar({}, pasta, tipo="republicar")
+    if iniciar:
+        disparar(id_tarefa, pasta)
+    return id_tarefa
+
+
+def disparar(id_tarefa, pasta=PASTA_TAREFAS):
+    """Sobe o executor num processo à parte, sem esperar por ele."""
+    _colher()
+    with open(_caminho(id_tarefa, "saida.log", pasta=pasta), "ab") as log:
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "src.tarefas", "executar", id_tarefa, "--pasta", pasta],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    _processos.append(processo)
+    _atualizar(id_tarefa, pasta, pid=processo.pid)
+    return processo.pid
+
+
+def listar(pasta=PASTA_TAREFAS, limite=10):
+    """Tarefas mais recentes primeiro; "rodando"/"na fila" sem processo vivo viram erro."""
+    if not os.path.isdir(pasta):
+        return []
+    _colher()
+    tarefas = []
+    for id_tarefa in sorted(os.listdir(pasta), reverse=True)[:limite]:
+        try:
+            estado = ler(id_tarefa, pasta)
+        except (FileNotFoundError, json.JSONDecodeError, NotADirectoryError):
+            continue
+        if estado["situacao"] not in FINAIS and estado.get("pid") and not _processo_vivo(estado["pid"]):
+            estado = _atualizar(id_tarefa, pasta, situacao="erro", erro="o processo executor foi interrompido")
+        tarefas.append(estado)
+    return tarefas
+
+
+def progresso(estado, total):
+    """Fração de estágios do pipeline já resolvidos (executados ou pulados)."""
+    if estado["situacao"] == "concluida":
+        return 1.0
+    feitos = sum(1 for s in estado["estagios"].values() if s in ("executado", "pulado"))
+    return feitos / total if total else 0.0
+
+
+def _preparar(id_tarefa, arquivos, preparo, estagios, pasta=PASTA_TAREFAS):
+    """Cópia de trabalho: planilhas recebidas, as atuais não substituídas e o estado do pipeline.
+
+    As saídas atuais dos estágios e o ``.pipeline_estado.json`` vão junto, então na
+    cópia só rodam os estágios que dependem das planilhas novas.
+    """
+    from src.carregador import copiar_planilha
+    from src.pipeline import ARQUIVO_ESTADO
+
+    shutil.rmtree(preparo, ignore_errors=True)
+    os.makedirs(preparo)
+    atuais = [nome for nome in ENTRADAS_ACEITAS if nome not in arquivos]
+    atuais += [ARQUIVO_ESTADO, *(saida for estagio in estagios for saida in estagio.saidas)]
+    for nome in atuais:
+        if os.path.exists(nome):
+            destino = os.path.join(preparo, nome)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            # Planilhas levam junto o cache (src/carregador.py) para um estágio refeito não reler o XLSX
+            if nome.endswith(".xlsx"):
+                copiar_planilha(nome, destino)
+            else:
+                shutil.copyfile(nome, destino)
+    for nome in arquivos:
+        shutil.copyfile(_caminho(id_tarefa, "entradas", nome, pasta=pasta), os.path.join(preparo, nome))
+
+
+def _descartar(preparo):
+    from src.carregador import invalidar_cache
+
+    if os.path.isdir(preparo):
+        invalidar_cache([os.path.join(base, nome) for base, _, nomes in os.walk(preparo) for nome in nomes])
+    shutil.rmtree(preparo, ignore_errors=True)
+
+
+def _promover(preparo, arquivos, estagios):
+    """Leva as planilhas e as saídas refeitas para o lugar e registra os estágios como em dia."""
+    from src.carregador import mover_planilha
+    from src.pipeline import ARQUIVO_ESTADO, gravar_estado, ler_estado
+
+    for nome in [*arquivos, *(saida for estagio in estagios for saida in estagio.saidas)]:
+        destino = os.path.dirname(nome)
+        if destino:
+            os.makedirs(destino, exist_ok=True)
+        mover_planilha(os.path.join(preparo, nome), nome)
+    estado = ler_estado(ARQUIVO_ESTADO)
+    estado.update(ler_estado(os.path.join(preparo, ARQUIVO_ESTADO)))
+    gravar_estado(estado, ARQUIVO_ESTADO)
+
+
+def _concluir(id_tarefa, pasta, erro=None):
+    agora = time.strftime("%Y-%m-%d %H:%M:%S")
+    if erro is None:
+        _atualizar(id_tarefa, pasta, situacao="concluida", terminada_em=agora)
+        return True
+    traceback.print_exc()
+    _atualizar(id_tarefa, pasta, situacao="erro", erro=str(erro) or type(erro).__name__, terminada_em=agora)
+    return False
+
+
+def _republicar(id_tarefa, pasta, registrar):
+    """Roda no lugar os estágios desatualizados e, se o 'artefato' estava em dia, força a publicação."""
+    from src.pipeline import estagios_padrao
+    from src.pipeline import executar as executar_pipeline
+
+    try:
+        resumo = {r["estagio"]: r["situacao"] for r in executar_pipeline(progresso=registrar)}
+        if resumo.get("artefato") != "executado":
+            executar_pipeline([e for e in estagios_padrao() if e.nome == "artefato"], forcar=True, progresso=registrar)
+    except Exception as erro:
+        return _concluir(id_tarefa, pasta, erro)
+    return _concluir(id_tarefa, pasta)
+
+
+def executar(id_tarefa, pasta=PASTA_TAREFAS):
+    """Roda a tarefa: espera a vez, valida as planilhas numa cópia, instala e publica."""
+    from src.pipeline import ARQUIVO_ESTADO, estagios_padrao
+    from src.pipeline import executar as executar_pipeline
+
+    pasta = os.path.abspath(pasta)  # o pipeline roda com outra pasta corrente
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, ARQUIVO_TRAVA), "w") as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        estagios = {}
+
+        def registrar(nome, situacao):
+            # Na passada final os estágios validados na cópia aparecem como pulados
+            if situacao == "pulado" and estagios.get(nome) == "executado":
+                return
+            estagios[nome] = situacao
+            _atualizar(id_tarefa, pasta, estagios=dict(estagios))
+
+        estado = _atualizar(id_tarefa, pasta, situacao="rodando", iniciada_em=time.strftime("%Y-%m-%d %H:%M:%S"))
+        if estado.get("tipo") == "republicar":
+            return _republicar(id_tarefa, pasta, registrar)
+        preparo = os.path.abspath(_caminho(id_tarefa, "preparo", pasta=pasta))
+        raiz = os.getcwd()
+        try:
+            arquivos = estado["arquivos"]
+            # Tudo menos a publicação roda na cópia; os caminhos do pipeline são relativos
+            validados = [e for e in estagios_padrao() if e.nome != "artefato"]
+            _preparar(id_tarefa, arquivos, preparo, validados, pasta)
+            os.chdir(preparo)
+            try:
+                resumo = executar_pipeline(validados, caminho_estado=ARQUIVO_ESTADO, progresso=registrar)
+            finally:
+                os.chdir(raiz)
+            # Só as saídas refeitas: as dos estágios pulados são cópias das que já estão no lugar
+            refeitos = {r["estagio"] for r in resumo if r["situacao"] == "executado"}
+            _promover(preparo, arquivos, [e for e in validados if e.nome in refeitos])
+            # No lugar, só o estágio 'artefato' está desatualizado: publica a nova versão
+            executar_pipeline(progresso=registrar)
+        except Exception as erro:
+            return _concluir(id_tarefa, pasta, erro)
+        finally:
+            _descartar(preparo)
+        return _concluir(id_tarefa, pasta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fila local de reprocessamento do pipeline.")
+    parser.add_argument("--pasta", default=PASTA_TAREFAS)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("listar", help="mostra as tarefas mais recentes")
+    executar_parser = sub.add_parser("executar", help="roda uma tarefa (usado pelo dash)")
+    executar_parser.add_argument("id")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        for estado in listar(args.pasta):
+            print(f" {estado['id']}  {estado['situacao']:<10} {', '.join(estado['arquivos']) or 'republicação'}"
+                  f"{'  ' + estado['erro'] if estado['erro'] else ''}")
+    elif not executar(args.id, args.pasta):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
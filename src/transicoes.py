@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from src.esquema import codificar_jornada
+from src.matriz_jornada import MatrizJornada
+
+COLUNAS_TRANSICOES = ['cat_source', 'cat_target', 'no_painel', 'value', 'trimestre_source', 'trimestre_target']
+ROTULOS_PAINEL = np.array(['Não', 'Sim'])
+
+class CuboTransicoes:
+    """Contagem densa de transições entre trimestres consecutivos.
+
+    ``valores[par, cat_source, cat_target, painel]`` é o número de médicos que
+    estavam em ``cat_source`` no trimestre ``par`` e em ``cat_target`` no trimestre
+    ``par + 1``; ``painel`` (0 = Não, 1 = Sim) é a flag NO_PAINEL no trimestre de destino.
+
+    Quando a UF dos médicos é conhecida, ``valores_uf[uf, par, ...]`` guarda as
+    fatias por estado (``valores`` é a soma delas) e ``recorte_uf`` combina as
+    fatias escolhidas sem voltar aos médicos.
+
+    O cubo completo é publicado no artefato junto com a matriz (``arrays`` /
+    ``de_artefato``): cada worker do dash só mapeia os arrays, sem recontar.
+    """
+
+    def __init__(self, valores, trimestres, categorias, valores_uf=None, ufs=None):
+        self.valores = valores
+        self.trimestres = list(trimestres)
+        self.categorias = list(categorias)
+        self.valores_uf = valores_uf
+        self.ufs = list(ufs) if ufs is not None else None
+
+    def recortar(self, inicio, fim):
+        """Cubo só com os trimestres de índices [inicio, fim]: fatia dos pares, sem recontar."""
+        valores_uf = self.valores_uf[:, inicio:fim] if self.valores_uf is not None else None
+        return CuboTransicoes(self.valores[inicio:fim], self.trimestres[inicio:fim + 1], self.categorias,
+                              valores_uf, self.ufs)
+
+    def recorte_uf(self, ufs):
+        """Soma das fatias das UFs pedidas; ``ufs`` vazio ou None devolve o total."""
+        if not ufs:
+            return self.valores
+        if self.valores_uf is None:
+            raise ValueError("O cubo não traz a dimensão de UF")
+        codigos = [self.ufs.index(uf) for uf in ufs if uf in self.ufs]
+        return self.valores_uf[codigos].sum(axis=0, dtype=np.int32)
+
+    def arrays(self):
+        """Arrays para o artefato compartilhado (src/dados_compartilhados.py)."""
+        arrays = {'cubo_valores': self.valores}
+        if self.valores_uf is not None:
+            arrays['cubo_valores_uf'] = self.valores_uf
+        return arrays
+
+    @classmethod
+    def de_artefato(cls, arrays, meta):
+        """Cubo completo publicado junto com a matriz (mesmos trimestres, categorias e UFs)."""
+        valores_uf = arrays.get('cubo_valores_uf')
+        return cls(arrays['cubo_valores'], meta['trimestres'], meta['categorias'], valores_uf,
+                   meta.get('ufs') if valores_uf is not None else None)
+
+    def para_dataframe(self):
+        """Formato longo usado pelo dash (apenas combinações com médicos)."""
+        par, src, tgt, painel = np.nonzero(self.valores)
+        categorias = np.array(self.categorias, dtype=object)
+        trimestres = np.array(self.trimestres, dtype=object)
+        return pd.DataFrame({
+            'cat_source': categorias[src],
+            'cat_target': categorias[tgt],
+            'no_painel': ROTULOS_PAINEL[painel],
+            'value': self.valores[par, src, tgt, painel].astype('int64'),
+            'trimestre_source': trimestres[par],
+            'trimestre_target': trimestres[par + 1],
+        }, columns=COLUNAS_TRANSICOES)
+
+# Monta o cubo em uma única passada a partir da matriz médicos x trimestres
+# (src/matriz_jornada.py). Aceita a matriz, a tabela codificada (src/esquema.py)
+# ou o DataFrame longo, que é codificado antes. Com a UF na matriz, a mesma
+# passada já sai fatiada por estado e o total é a soma das fatias. ``inicio``,
+# ``fim`` e ``granularidade`` restringem o cubo a uma janela, trimestral ou
+# agregada por semestre/ano (os "trimestres" do cubo passam a ser os períodos).
+def construir_cubo(dados, inicio=None, fim=None, granularidade='trimestre'):
+    if isinstance(dados, pd.DataFrame):
+        dados = codificar_jornada(dados)
+    if not isinstance(dados, MatrizJornada):
+        dados = MatrizJornada.de_tabela(dados)
+    _, periodos = dados.periodos(inicio, fim, granularidade)
+    if dados.uf is None:
+        return CuboTransicoes(dados.transicoes(inicio, fim, granularidade=granularidade), periodos, dados.categorias)
+    valores_uf = dados.transicoes(inicio, fim, por_uf=True, granularidade=granularidade)
+    return CuboTransicoes(valores_uf.sum(axis=0, dtype=np.int32), periodos, dados.categorias, valores_uf, dados.ufs)
+
+# Transições t1 -> t2: a janela fixa o par, e um trimestre sem linhas é erro, não par vazio
+def transicoes_do_par(df_t1, df_t2, t1, t2):
+    cubo = construir_cubo(pd.concat([df_t1, df_t2], ignore_index=True), inicio=t1, fim=t2)
+    return cubo.para_dataframe()
+
+# Transições entre cada par de trimestres consecutivos presentes em df
+def calcular_transicoes(df):
+    cubo = construir_cubo(df)
+    return cubo.para_dataframe(), cubo.trimestres
@@ -0,0 +1,39 @@
+import json
+import sys
+
+import pytest
+
+from src import benchmark
+
+ESCALA = {'medicos': 10, 'trimestres': 4, 'semente': 0, 'anomalias': 0.0, 'episodios': 5}
+
+
+def _resultado(tempo, pico=10.0, commit='abc1234'):
+    return {'commit': commit, 'escala': ESCALA, 'estagios': {'melt': {'tempo_s': tempo, 'pico_mb': pico}}}
+
+
+def test_comparar_aponta_so_o_que_passa_do_limite():
+    base = _resultado(1.0)
+    assert benchmark.comparar(_resultado(1.2), base, limite_tempo=1.25) == []
+    assert benchmark.comparar(_resultado(1.5), base, limite_tempo=1.25) == [('melt', 'tempo_s', 1.5)]
+    assert benchmark.comparar(_resultado(1.0, pico=30.0), base)[0][1] == 'pico_mb'
+
+
+def test_comparar_recusa_escalas_diferentes():
+    outra = {**_resultado(1.0), 'escala': {**ESCALA, 'medicos': 20}}
+    with pytest.raises(ValueError):
+        benchmark.comparar(_resultado(1.0), outra)
+
+
+def test_resultado_nao_sobrescreve_a_base(tmp_path, monkeypatch):
+    base = tmp_path / 'abc1234.json'
+    base.write_text(json.dumps(_resultado(1.0)))
+    monkeypatch.setattr(benchmark, 'PASTA_BENCHMARKS', str(tmp_path))
+    monkeypatch.setattr(benchmark, 'executar', lambda *args: _resultado(2.0))
+    monkeypatch.setattr(sys, 'argv', ['benchmark', '--base', str(base)])
+
+    with pytest.raises(SystemExit):
+        benchmark.main()
+
+    assert json.loads(base.read_text())['estagios']['melt']['tempo_s'] == 1.0
+    assert len(list(tmp_path.glob('abc1234-*.json'))) == 1
@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src import carregador
+from src.carregador import copiar_planilha, ler_planilha, salvar_planilha
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    pasta = tmp_path / 'cache'
+    monkeypatch.setattr(carregador, 'PASTA_CACHE', str(pasta))
+    return pasta
+
+
+def _sem_excel(monkeypatch):
+    def falhar(*args, **kwargs):
+        raise AssertionError('leu o XLSX em vez do cache')
+    monkeypatch.setattr(pd, 'read_excel', falhar)
+
+
+def test_alteracao_no_arquivo_invalida_o_cache(tmp_path, cache):
+    caminho = str(tmp_path / 'p.xlsx')
+    pd.DataFrame({'CRM LINK': ['SP1']}).to_excel(caminho, index=False)
+    assert ler_planilha(caminho)['CRM LINK'].tolist() == ['SP1']
+
+    pd.DataFrame({'CRM LINK': ['SP1', 'SP2']}).to_excel(caminho, index=False)
+    os.utime(caminho, ns=(os.stat(caminho).st_atime_ns, os.stat(caminho).st_mtime_ns + 10**9))
+
+    assert ler_planilha(caminho)['CRM LINK'].tolist() == ['SP1', 'SP2']
+    assert len(os.listdir(cache)) == 1  # a versão antiga foi removida
+
+
+def test_tipos_misturados_caem_no_pickle(tmp_path, cache, monkeypatch):
+    caminho = str(tmp_path / 'misto.xlsx')
+    pd.DataFrame({'CATEGORIA': [1, 'SEM CAT', 3]}).to_excel(caminho, index=False)
+    frio = ler_planilha(caminho)
+
+    _sem_excel(monkeypatch)
+    assert [f.endswith('.pkl') for f in os.listdir(cache)] == [True]
+    assert ler_planilha(caminho).equals(frio)
+
+
+def test_salvar_planilha_deixa_no_cache_o_que_a_leitura_devolveria(tmp_path, cache, monkeypatch):
+    caminho = str(tmp_path / 's.xlsx')
+    # Int64 com vazio e datas: em memória diferem do que volta do XLSX
+    df = pd.DataFrame({'CRM LINK': ['SP1', 'SP2'], 'CATEGORIA': pd.array([1, None], dtype='Int64'),
+                       'DT': pd.to_datetime(['2023-01-02', None])})
+    salvar_planilha(df, caminho)
+    frio = pd.read_excel(caminho)
+
+    _sem_excel(monkeypatch)
+    cacheado = ler_planilha(caminho)
+    assert cacheado.equals(frio)
+    assert cacheado.dtypes.to_dict() == frio.dtypes.to_dict()
+
+
+def test_copia_leva_a_entrada_do_cache(tmp_path, cache, monkeypatch):
+    origem, destino = str(tmp_path / 'a.xlsx'), str(tmp_path / 'b.xlsx')
+    salvar_planilha(pd.DataFrame({'CRM LINK': ['SP1'], 'CATEGORIA': [2]}), origem)
+    copiar_planilha(origem, destino)
+
+    _sem_excel(monkeypatch)
+    assert ler_planilha(destino).equals(ler_planilha(origem))
@@ -0,0 +1,24 @@
+import threading
+
+import numpy as np
+
+from src.dados_compartilhados import RepositorioDados, publicar_artefato
+
+
+def test_requisicao_durante_a_carga_espera_pelos_dados(tmp_path):
+    liberar = threading.Event()
+
+    def inicializar():
+        liberar.wait(5)
+        return publicar_artefato({'x': np.arange(3)}, {'nome': 'teste'}, str(tmp_path))
+
+    repositorio = RepositorioDados(lambda arrays, meta: meta['versao'], inicializar, pasta=str(tmp_path), intervalo=60)
+    assert repositorio.meta_atual() is None
+
+    repositorio.carregar_em_segundo_plano()
+    assert repositorio.estado()['estado'] == 'carregando'
+    threading.Timer(0.2, liberar.set).start()
+
+    assert repositorio.atual() is not None
+    assert repositorio.estado()['estado'] == 'pronto'
+    assert repositorio.meta_atual()['nome'] == 'teste'
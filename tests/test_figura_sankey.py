@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.figura_sankey import ConstrutorSankey
+from src.matriz_jornada import MatrizJornada
+from src.transicoes import construir_cubo
+
+
+def _matriz():
+    # 3 médicos em 8 trimestres (2023Q1..2024Q4), categorias '1' e '2'
+    trimestres = [f'{ano}Q{q}' for ano in (2023, 2024) for q in range(1, 5)]
+    categoria = np.array([
+        [0, 0, 0, 0, 0, 0, 0, 1],
+        [1, 1, 1, 1, 1, 1, 1, 1],
+        [0, 1, 0, 1, 0, 1, 0, 0],
+    ], dtype=np.int8)
+    return MatrizJornada(categoria, np.zeros(3, dtype=np.uint64), trimestres, ['1', '2'])
+
+
+def _sankey(matriz, inicio=None, fim=None, granularidade='trimestre'):
+    sankey = ConstrutorSankey(construir_cubo(matriz, inicio, fim, granularidade))
+    return sankey, sankey.figura('mercado', sankey.categorias).data[0]
+
+
+def test_ultimo_periodo_da_janela_tem_nos_e_links():
+    _, figura = _sankey(_matriz(), 6, 7)
+    rotulos = figura.node.label
+    assert {'Cat. 1<br>(2024Q3)', 'Cat. 2<br>(2024Q3)', 'Cat. 1<br>(2024Q4)', 'Cat. 2<br>(2024Q4)'} == set(rotulos)
+    assert sum(figura.link.value) == 3
+    destinos = {rotulos[t] for t in figura.link.target}
+    assert destinos == {'Cat. 1<br>(2024Q4)', 'Cat. 2<br>(2024Q4)'}
+
+
+def test_ultimo_periodo_com_granularidade_ano():
+    sankey, figura = _sankey(_matriz(), granularidade='ano')
+    assert sankey.trimestres == ['2023', '2024']
+    rotulos = figura.node.label
+    assert {rotulos[t] for t in figura.link.target} == {'Cat. 1<br>(2024)', 'Cat. 2<br>(2024)'}
+    assert sum(figura.link.value) == 3
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from src import carregador
+from src.incremental import atualizar
+from src.matriz_jornada import MatrizJornada
+from src.sintetico import gerar_mercado, gerar_painel, gravar
+
+
+@pytest.fixture
+def local(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(carregador, 'PASTA_CACHE', str(tmp_path / '.cache_planilhas'))
+    mercado = gerar_mercado(300, 5, semente=1)
+    return mercado, gerar_painel(mercado, semente=1)
+
+
+def _atualizar(pasta, **kwargs):
+    return atualizar('evolucao_cat_trimestral.xlsx', 'PAINEL_FV_GERAL.xlsx', pasta=pasta,
+                     caminho_matriz=os.path.join(pasta, 'matriz_jornada.npz'), **kwargs)
+
+
+def _assert_matrizes_iguais(a, b):
+    assert a.trimestres == b.trimestres and list(a.crms) == list(b.crms)
+    for nome, valores in a.arrays().items():
+        np.testing.assert_array_equal(valores, b.arrays()[nome])
+
+
+def test_trimestre_novo_acrescenta_o_mesmo_que_reprocessar_tudo(local):
+    mercado, painel = local
+    gravar(mercado.iloc[:, :-1], painel, '.')
+    assert len(_atualizar('incremental')) == 4
+
+    gravar(mercado, painel, '.')
+    assert _atualizar('incremental') == ['2020Q1']
+    assert _atualizar('incremental') == []
+
+    _atualizar('completo', completo=True)
+    _assert_matrizes_iguais(MatrizJornada.carregar('incremental/matriz_jornada.npz'),
+                            MatrizJornada.carregar('completo/matriz_jornada.npz'))
+    assert sorted(os.listdir('incremental/transicoes')) == sorted(os.listdir('completo/transicoes'))
+
+
+def test_matriz_remontada_das_particoes_e_gravada(local, capsys):
+    mercado, painel = local
+    gravar(mercado, painel, '.')
+    _atualizar('resultados')
+    os.remove('resultados/matriz_jornada.npz')
+
+    assert _atualizar('resultados') == []
+    assert os.path.exists('resultados/matriz_jornada.npz')
+    capsys.readouterr()
+    _atualizar('resultados')
+    assert 'Nada mudou' in capsys.readouterr().out
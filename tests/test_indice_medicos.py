@@ -0,0 +1,37 @@
+import pandas as pd
+
+from src.esquema import codificar_jornada
+from src.indice_medicos import IndiceMedicos, indexar_episodios
+from src.matriz_jornada import MatrizJornada
+
+
+def _indice():
+    jornada = pd.DataFrame({
+        'CRM LINK': ['AL1098', 'AL1098', 'SP7'],
+        'TRIMESTRE': ['2023Q1', '2023Q2', '2023Q2'],
+        'CATEGORIA': ['1', '2', '3'],
+        'NO_PAINEL': ['Sim', 'Não', 'Sim'],
+    })
+    matriz = MatrizJornada.de_tabela(codificar_jornada(jornada))
+    painel = pd.DataFrame({
+        'CRM LINK': [' al1098', 'SP7'],
+        'DT_INCLUSAO': pd.to_datetime(['2023-01-10', '2023-04-01']),
+        'DT_INATIVACAO': pd.to_datetime(['2023-03-01', None]),
+    })
+    return IndiceMedicos(matriz, indexar_episodios(painel, matriz.crms))
+
+
+def test_crm_e_encontrado_sem_diferenciar_caixa_nem_espacos():
+    indice = _indice()
+
+    resultado = indice.consultar(' al1098 ')
+    assert resultado['crm'] == 'AL1098'
+    assert [t['categoria'] for t in resultado['trimestres']] == ['1', '2']
+    assert resultado['episodios'] == [{'inclusao': '2023-01-10', 'inativacao': '2023-03-01'}]
+    assert 'sp7' in indice and 'SP8' not in indice
+
+
+def test_lote_sem_repeticao_e_com_faltantes():
+    encontrados, faltando = _indice().consultar_lote(['sp7', 'SP7 ', 'xx1'])
+
+    assert list(encontrados) == ['SP7'] and faltando == ['XX1']
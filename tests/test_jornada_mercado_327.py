@@ -0,0 +1,23 @@
+import openpyxl
+import pandas as pd
+
+from src.jornada_mercado_327 import ler_em_blocos
+
+
+def test_ler_em_blocos_planilha_write_only_com_linhas_curtas(tmp_path):
+    # Planilhas gravadas em modo write-only não guardam a dimensão e omitem as
+    # células vazias do fim da linha
+    caminho = tmp_path / 'mercado.xlsx'
+    livro = openpyxl.Workbook(write_only=True)
+    planilha = livro.create_sheet()
+    planilha.append(['CRM LINK', 'TRIM MOV 03/23', 'TRIM MOV 06/23'])
+    planilha.append(['SP1', 1, 2])
+    planilha.append(['SP2', 3])
+    livro.save(caminho)
+
+    longo = pd.concat(ler_em_blocos(str(caminho), tamanho_bloco=1), ignore_index=True)
+
+    assert len(longo) == 4
+    sp2 = longo[longo['CRM LINK'] == 'SP2'].set_index('TRIMESTRE')['CATEGORIA']
+    assert sp2[pd.Timestamp('2023-03-01')] == 3
+    assert pd.isna(sp2[pd.Timestamp('2023-06-01')])
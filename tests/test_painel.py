@@ -0,0 +1,30 @@
+import pandas as pd
+
+from src.painel import normalizar_painel
+
+
+def test_serial_fora_da_faixa_vira_inclusao_invalida():
+    painel = pd.DataFrame({
+        'CRM LINK': ['SP1', 'SP2', 'SP3'],
+        'DT_INCLUSAO': [1e12, -5, 45000],
+        'DT_INATIVACAO': [None, None, None],
+    }, dtype=object)
+
+    intervalos, relatorio = normalizar_painel(painel)
+
+    assert relatorio.inclusao_invalida == 2
+    assert intervalos['CRM LINK'].tolist() == ['SP3']
+    assert intervalos['DT_INCLUSAO'].iloc[0] == pd.Timestamp('2023-03-15')
+
+
+def test_datas_iso_nao_trocam_dia_e_mes():
+    painel = pd.DataFrame({
+        'CRM LINK': ['SP1', 'SP2'],
+        'DT_INCLUSAO': ['2023-03-01', '01/03/2023'],
+        'DT_INATIVACAO': ['2023-03-20 00:00:00', '02-04-2023'],
+    })
+
+    intervalos, _ = normalizar_painel(painel)
+
+    assert intervalos['DT_INCLUSAO'].tolist() == [pd.Timestamp('2023-03-01')] * 2
+    assert intervalos['DT_INATIVACAO'].tolist() == [pd.Timestamp('2023-03-20'), pd.Timestamp('2023-04-02')]
@@ -0,0 +1,46 @@
+import pytest
+
+from src.pipeline import Estagio, executar, ordenar
+
+
+def _copiar(entradas, saidas, sufixo=''):
+    with open(entradas[0], encoding='utf-8') as f:
+        texto = f.read()
+    with open(saidas[0], 'w', encoding='utf-8') as f:
+        f.write(texto + sufixo)
+    return 1
+
+
+@pytest.fixture
+def estagios(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'a.txt').write_text('a', encoding='utf-8')
+    return [
+        Estagio('c', _copiar, entradas=['b.txt'], saidas=['c.txt']),
+        Estagio('b', _copiar, entradas=['a.txt'], saidas=['b.txt'], parametros={'sufixo': 'b'}),
+    ]
+
+
+def _situacoes(resumo):
+    return {item['estagio']: item['situacao'] for item in resumo}
+
+
+def test_ordem_segue_entradas_e_saidas(estagios):
+    assert [e.nome for e in ordenar(estagios)] == ['b', 'c']
+
+
+def test_estagio_em_dia_e_pulado(estagios, tmp_path):
+    estado = str(tmp_path / 'estado.json')
+    assert _situacoes(executar(estagios, caminho_estado=estado)) == {'b': 'executado', 'c': 'executado'}
+    assert _situacoes(executar(estagios, caminho_estado=estado)) == {'b': 'pulado', 'c': 'pulado'}
+
+    # Mudar a saída de 'b' sem mudar a entrada dele só reexecuta quem a consome
+    (tmp_path / 'b.txt').write_text('outro', encoding='utf-8')
+    assert _situacoes(executar(estagios, caminho_estado=estado)) == {'b': 'pulado', 'c': 'executado'}
+
+    estagios[1].parametros = {'sufixo': 'x'}
+    assert _situacoes(executar(estagios, caminho_estado=estado)) == {'b': 'executado', 'c': 'executado'}
+    assert (tmp_path / 'c.txt').read_text(encoding='utf-8') == 'ax'
+
+    (tmp_path / 'c.txt').unlink()
+    assert _situacoes(executar(estagios, caminho_estado=estado)) == {'b': 'pulado', 'c': 'executado'}
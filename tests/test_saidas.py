@@ -0,0 +1,59 @@
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from src import saidas
+from src.carregador import ler_planilha_em_blocos
+from src.saidas import exportar
+
+
+def test_sem_blocos_grava_destinos_vazios(tmp_path):
+    caminhos = [str(tmp_path / f'vazio.{formato}') for formato in ('xlsx', 'parquet', 'csv.gz')]
+
+    assert exportar(iter([]), caminhos) == 0
+
+    assert all(os.path.exists(caminho) for caminho in caminhos)
+    assert len(pd.read_parquet(caminhos[1])) == 0
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(c) for c in caminhos)
+
+
+def test_planilha_so_com_cabecalho_mantem_as_colunas(tmp_path):
+    entrada = tmp_path / 'cabecalho.xlsx'
+    livro = openpyxl.Workbook(write_only=True)
+    livro.create_sheet().append(['CRM LINK', 'TRIMESTRE', 'CATEGORIA'])
+    livro.save(entrada)
+
+    destino = str(tmp_path / 'saida.parquet')
+    assert exportar(ler_planilha_em_blocos(str(entrada)), [destino]) == 0
+    assert list(pd.read_parquet(destino).columns) == ['CRM LINK', 'TRIMESTRE', 'CATEGORIA']
+
+
+def test_parquet_com_categoria_mista_entre_blocos(tmp_path):
+    # O primeiro bloco só tem números; o segundo traz 'SEM CAT'
+    blocos = [pd.DataFrame({'CRM LINK': ['SP1', 'SP2'], 'CATEGORIA': [1, 2]}),
+              pd.DataFrame({'CRM LINK': ['SP3', 'SP4'], 'CATEGORIA': ['SEM CAT', None]})]
+    destino = str(tmp_path / 'mista.parquet')
+
+    assert exportar(iter(blocos), [destino]) == 4
+    categorias = pd.read_parquet(destino)['CATEGORIA']
+    assert categorias[:3].tolist() == ['1', '2', 'SEM CAT']
+    assert categorias.isna().tolist() == [False, False, False, True]
+
+
+def test_falha_ao_fechar_um_destino_nao_troca_nenhum(tmp_path, monkeypatch):
+    xlsx, parquet = str(tmp_path / 't.xlsx'), str(tmp_path / 't.parquet')
+    with open(xlsx, 'w') as f:
+        f.write('versão anterior')
+
+    def falhar(self):
+        raise OSError('disco cheio')
+    monkeypatch.setattr(saidas.EscritorParquet, '_fechar', falhar)
+
+    with pytest.raises(OSError):
+        exportar(iter([pd.DataFrame({'CRM LINK': ['SP1']})]), [xlsx, parquet])
+
+    with open(xlsx) as f:
+        assert f.read() == 'versão anterior'
+    assert os.listdir(tmp_path) == ['t.xlsx']
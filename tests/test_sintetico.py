@@ -0,0 +1,22 @@
+import pandas as pd
+
+from src.painel import normalizar_painel
+from src.sintetico import gerar_mercado, gerar_painel
+
+
+def test_mesma_semente_gera_os_mesmos_dados():
+    mercado = gerar_mercado(500, 6, semente=3)
+    pd.testing.assert_frame_equal(mercado, gerar_mercado(500, 6, semente=3))
+    pd.testing.assert_frame_equal(gerar_painel(mercado, 3), gerar_painel(mercado, 3))
+    assert not mercado.equals(gerar_mercado(500, 6, semente=4))
+
+
+def test_anomalias_passam_por_todos_os_caminhos_da_normalizacao():
+    mercado = gerar_mercado(2000, 8)
+
+    _, relatorio = normalizar_painel(gerar_painel(mercado, anomalias=0.2))
+    assert relatorio.duplicados and relatorio.sobrepostos
+    assert relatorio.invertidos and relatorio.inclusao_invalida
+
+    _, limpo = normalizar_painel(gerar_painel(mercado, anomalias=0))
+    assert limpo.intervalos == limpo.linhas
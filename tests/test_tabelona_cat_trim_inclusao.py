@@ -0,0 +1,35 @@
+import pandas as pd
+
+from src.tabelona_cat_trim_inclusao import marcar_presenca_no_painel
+
+HOJE = pd.Timestamp('2023-08-15')
+
+
+def _marcar(episodios, trimestres):
+    painel = pd.DataFrame(episodios, columns=['CRM LINK', 'DT_INCLUSAO', 'DT_INATIVACAO'])
+    for coluna in ('DT_INCLUSAO', 'DT_INATIVACAO'):
+        painel[coluna] = pd.to_datetime(painel[coluna])
+    crm = painel['CRM LINK'].iloc[0]
+    base = pd.DataFrame({'CRM LINK': crm, 'TRIMESTRE': trimestres, 'CATEGORIA': 1})
+    return marcar_presenca_no_painel(base, painel, HOJE).set_index('TRIMESTRE')['NO_PAINEL'].to_dict()
+
+
+def test_dias_de_fronteira_do_trimestre_contam():
+    # Inclusão no último dia do 1º trimestre e inativação no primeiro dia do 3º
+    marcado = _marcar([('SP1', '2023-03-31', '2023-07-01')], ['2022Q4', '2023Q1', '2023Q2', '2023Q3', '2023Q4'])
+    assert marcado == {'2022Q4': 'Não', '2023Q1': 'Sim', '2023Q2': 'Sim', '2023Q3': 'Sim', '2023Q4': 'Não'}
+
+
+def test_inativacao_na_vespera_do_trimestre_nao_conta():
+    marcado = _marcar([('SP1', '2023-01-10', '2023-03-31')], ['2023Q1', '2023Q2'])
+    assert marcado == {'2023Q1': 'Sim', '2023Q2': 'Não'}
+
+
+def test_inativacao_em_aberto_vale_ate_hoje():
+    marcado = _marcar([('SP1', '2023-05-01', None)], ['2023Q1', '2023Q2', '2023Q3', '2023Q4'])
+    assert marcado == {'2023Q1': 'Não', '2023Q2': 'Sim', '2023Q3': 'Sim', '2023Q4': 'Não'}
+
+
+def test_inclusao_ausente_nunca_marca():
+    marcado = _marcar([('SP1', None, '2023-12-31')], ['2023Q1', '2023Q2'])
+    assert marcado == {'2023Q1': 'Não', '2023Q2': 'Não'}
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src import carregador, tarefas
+from src.pipeline import executar as executar_pipeline
+from src.sintetico import gerar_mercado, gerar_painel, gravar
+
+PAINEL = 'PAINEL_FV_GERAL.xlsx'
+
+
+@pytest.fixture
+def local(tmp_path, monkeypatch):
+    # Pipeline em dia numa pasta com dados sintéticos pequenos
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(carregador, 'PASTA_CACHE', str(tmp_path / '.cache_planilhas'))
+    mercado = gerar_mercado(300, 4)
+    gravar(mercado, gerar_painel(mercado), str(tmp_path))
+    executar_pipeline()
+    return tmp_path
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read()
+
+
+def _painel_novo(tmp_path):
+    mercado = gerar_mercado(300, 4)
+    gravar(mercado, gerar_painel(mercado, semente=7), str(tmp_path / 'novo'))
+    return _ler(tmp_path / 'novo' / PAINEL)
+
+
+def test_enfileirar_recusa_planilhas_desconhecidas(tmp_path):
+    with pytest.raises(ValueError):
+        tarefas.enfileirar({'outra.xlsx': b''}, pasta=str(tmp_path), iniciar=False)
+    id_tarefa = tarefas.enfileirar({PAINEL: b'x'}, pasta=str(tmp_path), iniciar=False)
+    estado = tarefas.ler(id_tarefa, str(tmp_path))
+    assert (estado['situacao'], estado['arquivos']) == ('na_fila', [PAINEL])
+
+
+def test_painel_identico_nao_refaz_nenhum_estagio(local):
+    id_tarefa = tarefas.enfileirar({PAINEL: _ler(PAINEL)}, iniciar=False)
+
+    assert tarefas.executar(id_tarefa)
+    assert set(tarefas.ler(id_tarefa)['estagios'].values()) == {'pulado'}
+
+
+def test_painel_novo_refaz_so_o_que_depende_dele(local):
+    novo = _painel_novo(local)
+    versao = _ler('artefatos/ATUAL')
+    id_tarefa = tarefas.enfileirar({PAINEL: novo}, iniciar=False)
+
+    assert tarefas.executar(id_tarefa)
+    estagios = tarefas.ler(id_tarefa)['estagios']
+    assert estagios['mercado'] == 'pulado'
+    assert estagios['painel'] == estagios['artefato'] == 'executado'
+    assert _ler(PAINEL) == novo
+    assert _ler('artefatos/ATUAL') != versao
+    assert not os.path.exists(tarefas._caminho(id_tarefa, 'preparo'))
+
+
+def test_planilha_invalida_nao_substitui_as_entradas(local):
+    antes = {nome: _ler(nome) for nome in (PAINEL, 'jornada_medicos_trimestral.xlsx', 'artefatos/ATUAL')}
+    id_tarefa = tarefas.enfileirar({PAINEL: b'isto nao e um xlsx'}, iniciar=False)
+
+    assert not tarefas.executar(id_tarefa)
+    assert tarefas.ler(id_tarefa)['situacao'] == 'erro'
+    assert {nome: _ler(nome) for nome in antes} == antes
+    assert not os.path.exists(tarefas._caminho(id_tarefa, 'preparo'))
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/stat'), reason='precisa do /proc')
+def test_executor_zumbi_nao_conta_como_vivo():
+    processo = subprocess.Popen([sys.executable, '-c', 'pass'])
+    try:
+        for _ in range(100):
+            if not tarefas._processo_vivo(processo.pid):
+                break
+            time.sleep(0.05)
+        assert not tarefas._processo_vivo(processo.pid)
+    finally:
+        processo.wait()